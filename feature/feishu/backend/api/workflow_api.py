@@ -5,17 +5,31 @@ Workflow API
 处理workflow文件上传和解析
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from pathlib import Path
 import sys
 import json
 import csv
 import logging
 from datetime import datetime
+from urllib.parse import quote
 
-from feature.workflow import WorkflowParser
 from feature.workflow.docx_reader import DocxReader
 from feature.workflow.split_comparator import SplitComparator
+from feature.workflow.parse_cache import parse_cache, STREAMING_THRESHOLD_BYTES
+from feature.workflow.response_stream import iter_json_chunks
+from feature.workflow.batch_parse import parse_batch, iter_merged_csv_rows, resolve_workflow_file
+from feature.workflow.decision_table import decision_tables
+from feature.workflow.workflow_diff import diff_workflows, split_context_from_parsed, workflow_hashes
+from feature.workflow.workflow_repository import workflow_repository
+from feature.workflow.workflow_layout import workflow_layouts
+from feature.workflow.workflow_search import search_index, TERM_FIELDS
+from feature.workflow.workflow_mmap import mapped_workflows
+from feature.workflow.table_export import EXPORT_FORMATS, iter_table_export
+from feature.workflow.parse_session import (
+    parse_sessions, slim_split, parse_fields, paginate,
+    NODE_FIELDS, DEFAULT_NODE_FIELDS, CONNECTION_FIELDS, DEFAULT_CONNECTION_FIELDS, DEFAULT_PAGE_SIZE,
+)
 from feature.feishu.backend.api.feishu_syncer import (
     sync_currency_maintenance_to_feishu,
     get_tenant_access_token as fetch_feishu_tenant_access_token,
@@ -35,6 +49,15 @@ FEISHU_APP_SECRET = "Yog0pVLeTiyjsfxtga7ltbxgd3uVbg0j"
 CURRENCY_MAINTENANCE_DIR = str(current_dir / "currency_maintenance")
 UPDATE_LOG_DIR = str(current_dir / "update log")
 
+# 决策表批量查询单次最多条数
+MAX_LOOKUP_QUERIES = 10000
+
+# block检索单页最多条数
+MAX_SEARCH_RESULTS = 1000
+
+# workflow仓库加载或重新加载文件时增量更新检索索引
+search_index.attach(workflow_repository)
+
 
 def _sync_currency_maintenance(logger, csv_file: str = None) -> None:
     try:
@@ -821,72 +844,435 @@ def compare_csv_configs(old_config: dict, new_config: dict) -> list:
     
     return changes
 
+def _request_flag(name: str):
+    """读取表单或查询参数中的开关（1/true/yes），未提供时返回None"""
+    value = request.form.get(name, request.args.get(name))
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _json_response(payload: dict, stream: bool):
+    """返回JSON响应；stream为True时分块编码输出（chunked），JSON结构与jsonify一致"""
+    if not stream:
+        return jsonify(payload)
+    return Response(stream_with_context(iter_json_chunks(payload)), mimetype='application/json')
+
+
+def _should_stream_response(content_size: int) -> bool:
+    """是否分块输出响应：请求参数stream优先，未指定时上传文件较大则启用"""
+    stream = _request_flag('stream')
+    if stream is None:
+        return content_size > STREAMING_THRESHOLD_BYTES
+    return stream
+
+
+def _request_workflow_items(names=None):
+    """
+    读取请求中的workflow：上传的文件（files/file）和服务端workflow文件名（names）
+    
+    Returns:
+        [(名称, 文件内容)]
+    
+    Raises:
+        ValueError: 上传的文件不是JSON格式
+        FileNotFoundError: 服务端workflow文件不存在
+    """
+    items = []
+    for file in request.files.getlist('files') + request.files.getlist('file'):
+        if not file.filename:
+            continue
+        if not file.filename.endswith('.json'):
+            raise ValueError(f"请上传JSON格式文件: {file.filename}")
+        items.append((file.filename, file.read()))
+    
+    if names is None:
+        names = request.form.getlist('names') or request.args.getlist('names')
+    elif isinstance(names, str):
+        names = [names]
+    for name in [n.strip() for value in names for n in str(value).split(',') if n.strip()]:
+        entry = workflow_repository.get(name)
+        items.append((entry.path.name, entry.path.read_bytes()))
+    return items
+
+
+def _stored_workflow(name: str):
+    """
+    获取服务端workflow仓库中的workflow
+    
+    Returns:
+        (WorkflowEntry, None) 或 (None, 错误响应)
+    """
+    try:
+        return workflow_repository.get(name), None
+    except FileNotFoundError as e:
+        return None, (jsonify({"error": str(e)}), 404)
+    except json.JSONDecodeError as e:
+        return None, (jsonify({"error": f"JSON解析失败: {str(e)}"}), 400)
+
+
 @workflow_api.route('/parse', methods=['POST'])
 def parse_workflow():
-    """解析workflow文件"""
+    """解析workflow文件（上传file，或通过name引用服务端workflow仓库中的文件）"""
     try:
-        # 检查是否有文件
-        if 'file' not in request.files:
-            return jsonify({"error": "没有上传文件"}), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({"error": "文件名为空"}), 400
-        
-        if not file.filename.endswith('.json'):
-            return jsonify({"error": "请上传JSON格式文件"}), 400
+        name = request.form.get('name') or request.args.get('name')
+        # 流式读取模式：逐个解码block，只保留解析所需字段（未指定时大文件自动启用）
+        streaming = _request_flag('streaming')
+        
+        if name and 'file' not in request.files:
+            # 服务端workflow已在仓库中解析，直接使用（要求流式读取的精简结果时另行解析并缓存）
+            entry, error = _stored_workflow(name)
+            if error:
+                return error
+            content_size = entry.size
+            if streaming:
+                result = parse_cache.get_or_parse(entry.path.read_bytes(), streaming=True)
+            else:
+                result = entry.result
+        else:
+            # 检查是否有文件
+            if 'file' not in request.files:
+                return jsonify({"error": "没有上传文件"}), 400
+            
+            file = request.files['file']
+            
+            if file.filename == '':
+                return jsonify({"error": "文件名为空"}), 400
+            
+            if not file.filename.endswith('.json'):
+                return jsonify({"error": "请上传JSON格式文件"}), 400
+            
+            # 读取文件内容
+            file_content = file.read()
+            content_size = len(file_content)
+            
+            # 解析workflow（相同内容重复上传时直接命中缓存）
+            try:
+                result = parse_cache.get_or_parse(file_content, streaming=streaming)
+            except json.JSONDecodeError as e:
+                return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+        
+        # 会话模式：解析结果保存在服务端，只返回摘要、splits和CSV行，节点和连接通过分页接口获取
+        if _request_flag('session'):
+            session = parse_sessions.create(result)
+            return jsonify({
+                "success": True,
+                "session_id": session.session_id,
+                "expires_in": parse_sessions.ttl_seconds,
+                "data": {
+                    "splits": [slim_split(split) for split in result["splits"]],
+                    "csv_format": result["csv_format"],
+                    "counts": {
+                        "nodes": len(result["nodes"]),
+                        "conditions": len(result["conditions"]),
+                        "connections": len(result["connections"])
+                    }
+                },
+                "summary": result["summary"]
+            })
         
-        # 读取文件内容
-        file_content = file.read()
+        # 大型结果分块编码输出，避免一次性拼出完整JSON字符串
+        return _json_response({
+            "success": True,
+            "data": {
+                "nodes": result["nodes"],
+                "conditions": result["conditions"],
+                "connections": result["connections"],
+                "splits": result["splits"],  # 添加splits数据
+                "csv_format": result["csv_format"]  # 添加CSV格式数据
+            },
+            "summary": result["summary"]
+        }, _should_stream_response(content_size))
         
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"解析失败: {str(e)}"}), 500
+
+
+@workflow_api.route('/parse-batch', methods=['POST'])
+def parse_workflow_batch():
+    """
+    批量解析多个workflow（如Apple、Google、Card），在进程池中并行解析，合并所有支付方式的CSV行
+    
+    参数:
+        files: 上传的workflow JSON文件（可多个）
+        names: 服务端workflow文件名（可多个或逗号分隔，对应 feature/workflow/workflow json/ 下的文件）
+    """
+    try:
         try:
-            json_data = json.loads(file_content.decode('utf-8'))
-        except json.JSONDecodeError as e:
-            return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+            items = _request_workflow_items()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
         
-        # 解析workflow
-        parser = WorkflowParser()
-        result = parser.parse_json(json_data)
+        if not items:
+            return jsonify({"error": "没有上传文件或指定workflow文件名"}), 400
         
-        # 获取摘要
-        summary = parser.get_summary()
+        result = parse_batch(items, streaming=_request_flag('streaming'))
+        
+        return jsonify({
+            "success": result["errors"] == 0,
+            "data": {
+                "workflows": result["workflows"],
+                "csv_format": result["csv_format"]
+            },
+            "errors": result["errors"]
+        })
         
-        # 获取CSV格式数据
-        csv_format_data = parser.get_csv_format_data()
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"批量解析失败: {str(e)}"}), 500
+
+
+@workflow_api.route('/decision-table/lookup', methods=['POST'])
+def decision_table_lookup():
+    """
+    查询路由决策表：给定(支付方式, 币种, Network, Network Tokenized, Adaptive 3DS)，返回命中的ROUTE_SPLITTER及各渠道分量
+    
+    参数（JSON请求体或表单字段）:
+        session_id: 解析会话id（使用该会话的解析结果）
+        files / file: 上传的workflow JSON文件（可多个，合并为一张决策表）
+        names: 服务端workflow文件名（可多个或逗号分隔）
+        query: 单个查询 {payment_method, currency, network, network_tokenized, adaptive_3ds}
+        queries: 批量查询列表（表单中为JSON字符串）
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        
+        queries = body.get('queries')
+        if queries is None and body.get('query') is not None:
+            queries = [body['query']]
+        if queries is None:
+            raw = request.form.get('queries') or request.form.get('query')
+            if raw:
+                try:
+                    queries = json.loads(raw)
+                except json.JSONDecodeError as e:
+                    return jsonify({"error": f"queries不是有效的JSON: {str(e)}"}), 400
+                if isinstance(queries, dict):
+                    queries = [queries]
+        if not isinstance(queries, list) or not queries:
+            return jsonify({"error": "缺少查询（query或queries）"}), 400
+        if len(queries) > MAX_LOOKUP_QUERIES:
+            return jsonify({"error": f"单次最多查询{MAX_LOOKUP_QUERIES}条"}), 400
+        
+        session_id = body.get('session_id') or request.form.get('session_id') or request.args.get('session_id')
+        if session_id:
+            session = parse_sessions.get(session_id)
+            if session is None:
+                return jsonify({"error": "解析会话不存在或已过期"}), 404
+            table = decision_tables.get_or_build(f"session:{session_id}", session.result["decision_table"])
+        else:
+            try:
+                items = _request_workflow_items(body.get('names'))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except FileNotFoundError as e:
+                return jsonify({"error": str(e)}), 404
+            if not items:
+                return jsonify({"error": "没有指定解析会话、上传文件或workflow文件名"}), 400
+            
+            keys = []
+            entries = []
+            for _, content in items:
+                key, streaming = parse_cache.content_key(content)
+                try:
+                    result = parse_cache.get_or_parse(content, streaming=streaming)
+                except json.JSONDecodeError as e:
+                    return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+                keys.append(key)
+                entries.extend(result["decision_table"])
+            table = decision_tables.get_or_build("|".join(keys), entries)
         
         return jsonify({
             "success": True,
             "data": {
-                "nodes": result["nodes"],
-                "conditions": result["conditions"],
-                "connections": result["connections"],
-                "splits": result["splits"],  # 添加splits数据
-                "csv_format": csv_format_data  # 添加CSV格式数据
-            },
-            "summary": summary
+                "results": table.lookup_many(queries),
+                "table_size": len(table)
+            }
         })
         
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({"error": f"解析失败: {str(e)}"}), 500
+        return jsonify({"error": f"决策表查询失败: {str(e)}"}), 500
+
+
+def _request_workflow_revision(side: str, body: dict):
+    """
+    读取workflow对比的一侧：上传的文件（{side}_file）或服务端workflow文件名（{side}_name）
+    
+    Returns:
+        (名称, 文件内容)，未提供时返回None
+    
+    Raises:
+        ValueError: 上传的文件不是JSON格式
+        FileNotFoundError: 服务端workflow文件不存在
+    """
+    file = request.files.get(f'{side}_file')
+    if file is not None and file.filename:
+        if not file.filename.endswith('.json'):
+            raise ValueError(f"请上传JSON格式文件: {file.filename}")
+        return file.filename, file.read()
+    
+    name = body.get(f'{side}_name') or request.form.get(f'{side}_name') or request.args.get(f'{side}_name')
+    if name:
+        entry = workflow_repository.get(str(name).strip())
+        return entry.path.name, entry.path.read_bytes()
+    return None
+
+
+@workflow_api.route('/workflow-diff', methods=['POST'])
+def workflow_diff():
+    """
+    结构化对比两个workflow revision：新增/删除/修改的block、条件变化、split比例变化
+    
+    两侧各自计算Merkle子树哈希（按文件内容缓存），只在哈希不同的子树内逐个对比block
+    
+    参数（表单字段或JSON请求体）:
+        old_file / new_file: 上传的旧/新workflow JSON文件
+        old_name / new_name: 服务端workflow文件名（对应 feature/workflow/workflow json/ 下的文件）
+    """
+    try:
+        body = request.get_json(silent=True) or {}
+        
+        try:
+            old_item = _request_workflow_revision('old', body)
+            new_item = _request_workflow_revision('new', body)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        
+        if old_item is None or new_item is None:
+            return jsonify({"error": "需要提供旧版本和新版本（old_file/old_name 与 new_file/new_name）"}), 400
+        
+        hashes = []
+        split_context = {}
+        previous = None
+        for _, content in (old_item, new_item):
+            try:
+                previous = workflow_hashes.get_or_build(
+                    parse_cache.make_key(content),
+                    lambda: json.loads(content.decode('utf-8')),
+                    previous
+                )
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+            hashes.append(previous)
+            # 已解析过的revision补充split所在的支付方式和币种（新版本覆盖旧版本）
+            split_context.update(split_context_from_parsed(parse_cache.peek(parse_cache.content_key(content)[0])))
+        
+        # 只对比同一workflow的不同revision
+        old_id, new_id = hashes[0].source.get("id"), hashes[1].source.get("id")
+        if old_id != new_id:
+            return jsonify({"error": f"两个文件不是同一个workflow（workflow id: {old_id} / {new_id}）"}), 400
+        
+        diff = diff_workflows(hashes[0], hashes[1], split_context)
+        diff["workflow"]["old_file"] = old_item[0]
+        diff["workflow"]["new_file"] = new_item[0]
+        
+        return jsonify({"success": True, "data": diff})
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"workflow对比失败: {str(e)}"}), 500
+
+
+def _get_parse_session(session_id: str):
+    """获取解析会话，不存在或已过期时返回(None, 错误响应)"""
+    session = parse_sessions.get(session_id)
+    if session is None:
+        return None, (jsonify({"error": "解析会话不存在或已过期，请重新上传文件"}), 404)
+    return session, None
+
+
+def _paginate_session_items(session_id: str, collection: str, allowed_fields, default_fields):
+    session, error = _get_parse_session(session_id)
+    if error:
+        return error
+    
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        fields = parse_fields(request.args.get('fields'), allowed_fields, default_fields)
+        page = paginate(session.result[collection], offset, limit, fields)
+    except ValueError as e:
+        return jsonify({"error": f"参数错误: {str(e)}"}), 400
+    
+    return jsonify({"success": True, "data": page})
+
+
+@workflow_api.route('/parse-sessions/<session_id>/nodes', methods=['GET'])
+def parse_session_nodes(session_id):
+    """分页获取解析会话的节点（参数: offset、limit、fields，fields为逗号分隔的字段列表）"""
+    return _paginate_session_items(session_id, "nodes", NODE_FIELDS, DEFAULT_NODE_FIELDS)
+
+
+@workflow_api.route('/parse-sessions/<session_id>/connections', methods=['GET'])
+def parse_session_connections(session_id):
+    """分页获取解析会话的连接（参数: offset、limit、fields，fields为逗号分隔的字段列表）"""
+    return _paginate_session_items(session_id, "connections", CONNECTION_FIELDS, DEFAULT_CONNECTION_FIELDS)
+
+
+@workflow_api.route('/parse-sessions/<session_id>/blocks/<block_id>', methods=['GET'])
+def parse_session_block(session_id, block_id):
+    """获取解析会话中单个block的节点信息和原始数据"""
+    session, error = _get_parse_session(session_id)
+    if error:
+        return error
+    
+    node = session.find_node(block_id)
+    if node is None:
+        return jsonify({"error": f"block不存在: {block_id}"}), 404
+    
+    return jsonify({"success": True, "data": node})
+
+
+@workflow_api.route('/parse-sessions/<session_id>/layout', methods=['GET'])
+def parse_session_layout(session_id):
+    """获取解析会话的分层布局坐标（按图结构缓存，前端只负责绘制）"""
+    session, error = _get_parse_session(session_id)
+    if error:
+        return error
+    
+    layout = workflow_layouts.get_or_compute(session.result["nodes"], session.result["connections"])
+    return _json_response({"success": True, "data": layout}, bool(_request_flag('stream')))
+
+
+@workflow_api.route('/parse-sessions/<session_id>', methods=['DELETE'])
+def delete_parse_session(session_id):
+    """释放解析会话"""
+    if not parse_sessions.delete(session_id):
+        return jsonify({"error": "解析会话不存在或已过期"}), 404
+    return jsonify({"success": True})
+
+
+@workflow_api.route('/parse-sessions/stats', methods=['GET'])
+def parse_session_stats():
+    """获取解析会话统计信息"""
+    return jsonify({"success": True, "data": parse_sessions.stats()})
 
 
 @workflow_api.route('/compare-split', methods=['POST'])
 def compare_split():
-    """对比split配置并生成修改建议"""
+    """对比split配置并生成修改建议（上传file，或通过name引用服务端workflow仓库中的文件）"""
     try:
+        name = request.form.get('name') or request.args.get('name')
         # 检查是否有文件
-        if 'file' not in request.files:
+        if 'file' not in request.files and not name:
             return jsonify({"error": "没有上传文件"}), 400
         
-        file = request.files['file']
+        file = request.files.get('file')
         
-        if file.filename == '':
+        if file is not None and file.filename == '':
             return jsonify({"error": "文件名为空"}), 400
         
-        if not file.filename.endswith('.json'):
+        if file is not None and not file.filename.endswith('.json'):
             return jsonify({"error": "请上传JSON格式文件"}), 400
         
         # 获取调整方案文本
@@ -899,22 +1285,30 @@ def compare_split():
         if adjustment_mode not in ['update', 'override']:
             adjustment_mode = 'update'
         
-        # 读取文件内容
-        file_content = file.read()
-        
-        try:
-            json_data = json.loads(file_content.decode('utf-8'))
-        except json.JSONDecodeError as e:
-            return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+        if file is None:
+            entry, error = _stored_workflow(name)
+            if error:
+                return error
+            content_size = entry.size
+            parsed = entry.result
+        else:
+            # 读取文件内容
+            file_content = file.read()
+            content_size = len(file_content)
+            
+            try:
+                parsed = parse_cache.get_or_parse(file_content)
+            except json.JSONDecodeError as e:
+                return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
         
-        # 对比配置
+        # 对比配置（复用缓存中的解析结果）
         comparator = SplitComparator()
-        result = comparator.compare_configurations(json_data, adjustment_text, adjustment_mode)
+        result = comparator.compare_configurations(None, adjustment_text, adjustment_mode, parsed=parsed)
         
-        return jsonify({
+        return _json_response({
             "success": True,
             "data": result
-        })
+        }, _should_stream_response(content_size))
         
     except Exception as e:
         import traceback
@@ -943,20 +1337,10 @@ def compare_doc_split():
         if not docx_path.exists():
             return jsonify({"error": "找不到Primer Workflow文档文件"}), 404
         
-        # 读取docx文件
+        # 读取docx文件（文件未变化时直接使用缓存的解析结果），并转换为split_comparator需要的格式
+        # 缓存的配置在各请求间共享，只读使用
         reader = DocxReader()
-        current_config = reader.read_docx(str(docx_path))
-        
-        # 将配置转换为split_comparator需要的格式
-        formatted_current_config = {}
-        for payment_method, currencies in current_config.items():
-            formatted_current_config[payment_method] = {}
-            for currency, percentages in currencies.items():
-                formatted_current_config[payment_method][currency] = {
-                    "percentages": percentages,
-                    "routes": ["Adyen", "Stripe", "AWX"],
-                    "split_id": None
-                }
+        formatted_current_config = reader.read_docx_cached(str(docx_path)).formatted
         
         # 解析调整方案
         comparator = SplitComparator()
@@ -1560,6 +1944,199 @@ def feishu_webhook():
         return jsonify({"success": False, "error": f"处理失败: {error_msg}"}), 500
 
 
+@workflow_api.route('/export', methods=['GET', 'POST'])
+def export_split_table():
+    """
+    导出解析后的split行（csv_format）为CSV或XLSX文件，边生成边输出
+    
+    参数:
+        format: csv（默认）或 xlsx
+        files / file: 上传的workflow JSON文件（可多个）
+        names: 服务端workflow文件名（可多个或逗号分隔）
+        未指定文件和文件名时导出workflow仓库中所有workflow；多个workflow的行按顺序合并并去除完全相同的行
+    """
+    try:
+        export_format = (request.form.get('format') or request.args.get('format') or 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"不支持的导出格式: {export_format}（可选: {', '.join(EXPORT_FORMATS)}）"}), 400
+        
+        try:
+            items = _request_workflow_items()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        
+        if items:
+            try:
+                results = [parse_cache.get_or_parse(content) for _, content in items]
+            except json.JSONDecodeError as e:
+                return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+            names = [Path(name).stem for name, _ in items]
+        else:
+            entries = workflow_repository.entries()
+            if not entries:
+                return jsonify({"error": "没有上传文件或指定workflow文件名，且workflow仓库为空"}), 400
+            results = [entry.result for entry in entries]
+            names = ["workflows"]
+        
+        rows = results[0]["csv_format"] if len(results) == 1 else iter_merged_csv_rows(results)
+        try:
+            chunks = iter_table_export(rows, export_format)
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 501
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        file_name = f"{names[0] if len(names) == 1 else 'workflows'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(file_name)}"
+        })
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"导出失败: {str(e)}"}), 500
+
+
+@workflow_api.route('/parse-cache/stats', methods=['GET'])
+def parse_cache_stats():
+    """获取解析缓存统计信息（命中/未命中次数等）"""
+    return jsonify({"success": True, "data": parse_cache.stats()})
+
+
+@workflow_api.route('/layout', methods=['POST'])
+def workflow_layout():
+    """
+    计算workflow的分层布局坐标（节点中心点和连接折线），结构未变化的revision直接复用缓存
+    
+    参数:
+        file: 上传的workflow JSON文件
+        name: 服务端workflow文件名（对应 feature/workflow/workflow json/ 下的文件）
+    """
+    try:
+        name = request.form.get('name') or request.args.get('name')
+        file = request.files.get('file')
+        if file is not None and file.filename:
+            if not file.filename.endswith('.json'):
+                return jsonify({"error": "请上传JSON格式文件"}), 400
+            try:
+                result = parse_cache.get_or_parse(file.read())
+            except json.JSONDecodeError as e:
+                return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+        elif name:
+            entry, error = _stored_workflow(name)
+            if error:
+                return error
+            result = entry.result
+        else:
+            return jsonify({"error": "没有上传文件或指定workflow文件名"}), 400
+        
+        layout = workflow_layouts.get_or_compute(result["nodes"], result["connections"])
+        return _json_response({"success": True, "data": layout}, bool(_request_flag('stream')))
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"布局计算失败: {str(e)}"}), 500
+
+
+@workflow_api.route('/search', methods=['GET'])
+def search_blocks():
+    """
+    检索workflow仓库中的block
+    
+    参数（查询参数，同一字段可重复或逗号分隔，任一取值匹配；不同字段须同时满足）:
+        workflow: 限定的workflow文件名，默认全部
+        type / name / condition / path / operator / value / currency / payment_method / processor: 字段过滤
+        percentage: 分量范围（>50、>=50、<50、50、50..80），指定processor时按该渠道的分量筛选
+        q: 全文检索（名称、条件名称、取值）
+        offset / limit: 分页
+    
+    示例:
+        /api/search?currency=KRW&type=CONDITION
+        /api/search?type=ROUTE_SPLITTER&processor=Stripe&percentage=>50
+    """
+    try:
+        def values(name):
+            return [value.strip() for raw in request.args.getlist(name) for value in raw.split(',') if value.strip()]
+        
+        try:
+            offset = max(int(request.args.get('offset', 0)), 0)
+            limit = min(max(int(request.args.get('limit', 100)), 1), MAX_SEARCH_RESULTS)
+        except ValueError:
+            return jsonify({"error": "offset和limit必须是整数"}), 400
+        
+        try:
+            result = search_index.search(
+                filters={field: values(field) for field in TERM_FIELDS},
+                percentage=request.args.get('percentage'),
+                text=request.args.get('q'),
+                workflows=[name[:-5] if name.endswith('.json') else name for name in values('workflow')],
+                offset=offset,
+                limit=limit
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        return jsonify({"success": True, "data": result})
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"检索失败: {str(e)}"}), 500
+
+
+@workflow_api.route('/workflows', methods=['GET'])
+def list_workflows():
+    """列出服务端workflow仓库中已加载的workflow（可在parse、compare-split等接口中通过name引用）"""
+    return jsonify({
+        "success": True,
+        "data": [entry.describe() for entry in workflow_repository.entries()],
+        "repository": workflow_repository.stats(),
+        "search_index": search_index.stats()
+    })
+
+
+@workflow_api.route('/workflows/<name>/blocks/<block_id>', methods=['GET'])
+def stored_workflow_block(name, block_id):
+    """
+    获取服务端workflow文件中单个block的原始数据（内存映射文件，只解码该block）
+    
+    参数:
+        projected: 为1时只返回解析器使用的字段（与流式读取的精简block一致）
+    """
+    try:
+        try:
+            mapped = mapped_workflows.get(resolve_workflow_file(name, workflow_repository.directory))
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 404
+        except json.JSONDecodeError as e:
+            return jsonify({"error": f"JSON解析失败: {str(e)}"}), 400
+        
+        block = mapped.find(block_id, projected=bool(_request_flag('projected')))
+        if block is None:
+            return jsonify({"error": f"block不存在: {block_id}"}), 404
+        
+        return jsonify({"success": True, "data": block})
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"读取block失败: {str(e)}"}), 500
+
+
+@workflow_api.route('/workflows/reload', methods=['POST'])
+def reload_workflows():
+    """立即重新扫描workflow目录（只重新解析发生变化的文件）"""
+    try:
+        changes = workflow_repository.reload()
+        return jsonify({"success": True, "data": changes, "repository": workflow_repository.stats()})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"重新加载失败: {str(e)}"}), 500
+
+
 @workflow_api.route('/health', methods=['GET'])
 def health():
     """健康检查"""
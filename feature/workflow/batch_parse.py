@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow批量解析
+多个workflow导出（如Apple、Google、Card）在进程池中并行解析，不受单个Flask线程GIL的限制，
+结果写入解析缓存，CSV行合并为一个结果返回；进程池在各请求之间复用
+"""
+
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from parse_cache import ParseCache, parse_cache
+    from workflow_graph import KeyIndex
+    from workflow_parser import csv_row_key
+    from worker_pool import get_executor, reset_executor
+except ImportError:
+    from feature.workflow.parse_cache import ParseCache, parse_cache
+    from feature.workflow.workflow_graph import KeyIndex
+    from feature.workflow.workflow_parser import csv_row_key
+    from feature.workflow.worker_pool import get_executor, reset_executor
+
+logger = logging.getLogger(__name__)
+
+# 服务端workflow文件目录
+WORKFLOW_JSON_DIR = Path(__file__).parent / "workflow json"
+
+
+# 子进程内的解析缓存：只使用共享的磁盘存储，不保留内存中的解析结果和增量解析状态
+# （结果由父进程写入其解析缓存，子进程中的副本不会再被读取）
+_worker_cache = None
+
+
+def _parse_in_worker(content: bytes, streaming: bool) -> Dict[str, Any]:
+    """进程池中执行的解析任务（子进程内同样优先从磁盘存储恢复）"""
+    global _worker_cache
+    if _worker_cache is None:
+        _worker_cache = ParseCache(max_entries=0, max_bytes=0, store=parse_cache.store, max_analysis_states=0,
+                                   parallel=False)
+    return _worker_cache.load_or_parse(content, streaming)
+
+
+def resolve_workflow_file(name: str, directory: Path = WORKFLOW_JSON_DIR) -> Path:
+    """
+    将服务端workflow文件名解析为路径（只允许workflow json目录下的文件）
+
+    Raises:
+        FileNotFoundError: 文件不存在或不在workflow json目录下
+    """
+    file_name = name if name.endswith('.json') else f"{name}.json"
+    path = (Path(directory) / file_name).resolve()
+    if path.parent != Path(directory).resolve() or not path.is_file():
+        raise FileNotFoundError(f"workflow文件不存在: {name}")
+    return path
+
+
+def iter_merged_csv_rows(results: Iterable[Dict[str, Any]]) -> Iterator[Dict]:
+    """按请求顺序逐行产出各workflow的CSV行（去除完全相同的行）"""
+    row_index = KeyIndex()
+    for result in results:
+        for row in result.get("csv_format", []):
+            if row_index.add(csv_row_key(row)):
+                yield row
+
+
+def merge_csv_rows(results: List[Dict[str, Any]]) -> List[Dict]:
+    """按请求顺序合并各workflow的CSV行（去除完全相同的行）"""
+    return list(iter_merged_csv_rows(results))
+
+
+def parse_batch(items: List[Tuple[str, bytes]], streaming: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    并行解析多个workflow导出
+
+    Args:
+        items: [(名称, 文件内容)]
+        streaming: 是否流式读取，None时按文件大小自动选择
+
+    Returns:
+        {"workflows": [{name, summary, split_count, csv_row_count} 或 {name, error}],
+         "csv_format": 合并后的CSV行, "errors": 失败数}
+    """
+    results = [None] * len(items)
+    pending = []  # (序号, 缓存键, 是否流式读取)
+
+    # 先查进程内缓存，未命中的提交到进程池
+    for index, (name, content) in enumerate(items):
+        key, item_streaming = parse_cache.content_key(content, streaming)
+        cached = parse_cache.get(key)
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending.append((index, key, item_streaming))
+
+    executor = None
+    if len(pending) > 1:
+        try:
+            executor = get_executor()
+        except OSError as exc:
+            logger.warning("创建进程池失败，改为进程内解析: %s", exc)
+
+    if executor is not None:
+        try:
+            futures = [
+                (index, key, executor.submit(_parse_in_worker, items[index][1], item_streaming))
+                for index, key, item_streaming in pending
+            ]
+            for index, key, future in futures:
+                try:
+                    results[index] = future.result()
+                    parse_cache.put(key, results[index], len(items[index][1]))
+                except BrokenProcessPool:
+                    raise
+                except Exception as exc:
+                    results[index] = exc
+            pending = []
+        except (BrokenProcessPool, OSError) as exc:
+            # 进程池不可用（如打包后的应用或资源受限），回退为当前进程内解析
+            logger.warning("进程池解析失败，改为进程内解析: %s", exc)
+            reset_executor()
+            pending = [item for item in pending if results[item[0]] is None]
+
+    for index, key, item_streaming in pending:
+        try:
+            results[index] = parse_cache.get_or_parse(items[index][1], streaming=item_streaming)
+        except Exception as exc:
+            results[index] = exc
+
+    workflows = []
+    parsed = []
+    for (name, _), result in zip(items, results):
+        if isinstance(result, Exception):
+            workflows.append({"name": name, "error": str(result)})
+            continue
+        parsed.append(result)
+        workflows.append({
+            "name": name,
+            "summary": result["summary"],
+            "split_count": len(result["splits"]),
+            "csv_row_count": len(result["csv_format"])
+        })
+
+    return {
+        "workflows": workflows,
+        "csv_format": merge_csv_rows(parsed),
+        "errors": len(items) - len(parsed)
+    }
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow解析器性能基准测试
+对内置的workflow导出和合成workflow（workflow_synth）分别测量 parse_json、_analyze_splits、
+get_csv_format_data、compare_configurations 的耗时、tracemalloc峰值内存和分阶段耗时，
+结果写入JSON文件，便于跨提交对比
+
+用法:
+    python3 -m feature.workflow.benchmark --sizes 1000 10000 100000 --repeat 3
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from workflow_parser import WorkflowParser
+    from split_comparator import SplitComparator
+    from workflow_synth import generate_workflow, count_blocks
+except ImportError:
+    from feature.workflow.workflow_parser import WorkflowParser
+    from feature.workflow.split_comparator import SplitComparator
+    from feature.workflow.workflow_synth import generate_workflow, count_blocks
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+BUNDLED_DIR = Path(__file__).parent / "workflow json"
+DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "logs" / "benchmarks"
+
+# 分阶段计时的解析器方法（耗时包含其内部调用的其他阶段）
+PARSER_PHASES = (
+    "_parse_workflow",
+    "_analyze_splits",
+    "_traverse_workflow",
+    "_parse_split_block",
+    "_find_all_currency_combinations_from_conditions",
+    "_add_split",
+    "_export_result",
+)
+
+# 基准测试使用的调整方案
+DEFAULT_ADJUSTMENT_TEXT = """CARD
+USD - 20%：40%：40%
+KRW/EUR/AED - 40%：20%：40%
+AP
+USD/JPY - 50%：50%：0%
+GP
+EUR - 30%：30%：40%
+"""
+
+
+class PhaseTimer:
+    """在实例上包装方法，累计每个阶段的调用次数和耗时"""
+
+    def __init__(self):
+        self.phases = {}  # 阶段名 -> {"calls": 次数, "seconds": 累计耗时}
+
+    def instrument(self, obj: Any, method_names, prefix: str = ""):
+        for name in method_names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self._wrap(prefix + name, method))
+
+    def _wrap(self, phase: str, method: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats = self.phases.setdefault(phase, {"calls": 0, "seconds": 0.0})
+                stats["calls"] += 1
+                stats["seconds"] += time.perf_counter() - start
+        return timed
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            phase: {"calls": stats["calls"], "seconds": round(stats["seconds"], 6)}
+            for phase, stats in self.phases.items()
+        }
+
+
+def _run_pipeline(workflow_data: Any, adjustment_text: str, timer: Optional[PhaseTimer] = None,
+                  on_stage: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    执行一次完整流程：parse_json -> get_csv_format_data -> compare_configurations（复用解析结果）
+
+    Returns:
+        {"seconds": {阶段: 耗时}, "splits": split数, "csv_rows": CSV行数}
+    """
+    seconds = {}
+    parser = WorkflowParser()
+    comparator = SplitComparator()
+    if timer:
+        timer.instrument(parser, PARSER_PHASES)
+        timer.instrument(comparator, ("parse_adjustment_text", "extract_current_splits"), prefix="comparator.")
+
+    def stage(name: str, func: Callable, *args, **kwargs):
+        if on_stage:
+            on_stage(name)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds[name] = time.perf_counter() - start
+        return result
+
+    parsed = stage("parse_json", parser.parse_json, workflow_data)
+    csv_rows = stage("get_csv_format_data", parser.get_csv_format_data)
+    stage("compare_configurations", comparator.compare_configurations, None, adjustment_text, parsed=parsed)
+    if on_stage:
+        on_stage(None)
+
+    return {"seconds": seconds, "splits": len(parsed["splits"]), "csv_rows": len(csv_rows)}
+
+
+def _measure_analyze_splits(workflow_data: Any, repeat: int) -> List[float]:
+    """单独测量_analyze_splits（在已完成block解析的解析器上重复执行）"""
+    parser = WorkflowParser()
+    parser.parse_json(workflow_data)
+    timings = []
+    for _ in range(repeat):
+        parser._reset_splits()
+        start = time.perf_counter()
+        parser._analyze_splits()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _summarize(timings: List[float]) -> Dict[str, Any]:
+    return {
+        "min": round(min(timings), 6),
+        "median": round(statistics.median(timings), 6),
+        "max": round(max(timings), 6),
+        "runs": [round(t, 6) for t in timings]
+    }
+
+
+def benchmark_case(name: str, workflow_data: Any, repeat: int = 3,
+                   adjustment_text: str = DEFAULT_ADJUSTMENT_TEXT, params: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    对单个workflow执行基准测试
+
+    Args:
+        name: 用例名称
+        workflow_data: workflow JSON数据
+        repeat: 计时重复次数（取最小值/中位数）
+        adjustment_text: compare_configurations使用的调整方案
+        params: 合成参数（写入结果）
+
+    Returns:
+        用例结果: {name, blocks, params, wall_seconds, phases, peak_memory_bytes, splits, csv_rows}
+    """
+    # 计时（不开启tracemalloc，避免影响耗时）
+    stage_timings = {}
+    totals = []
+    last = None
+    for _ in range(repeat):
+        last = _run_pipeline(workflow_data, adjustment_text)
+        for stage, seconds in last["seconds"].items():
+            stage_timings.setdefault(stage, []).append(seconds)
+        totals.append(sum(last["seconds"].values()))
+    stage_timings["_analyze_splits"] = _measure_analyze_splits(workflow_data, repeat)
+
+    # 分阶段耗时（包装方法有额外开销，单独执行一次）
+    timer = PhaseTimer()
+    _run_pipeline(workflow_data, adjustment_text, timer=timer)
+
+    # 峰值内存：每个阶段开始时重置峰值，记录该阶段内的峰值
+    peak_memory = {}
+    current_stage = [None]
+
+    def on_stage(stage: Optional[str]):
+        if current_stage[0]:
+            peak_memory[current_stage[0]] = tracemalloc.get_traced_memory()[1]
+        current_stage[0] = stage
+        tracemalloc.reset_peak()
+
+    tracemalloc.start()
+    try:
+        _run_pipeline(workflow_data, adjustment_text, on_stage=on_stage)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": name,
+        "blocks": count_blocks(workflow_data),
+        "params": params or {},
+        "wall_seconds": {
+            "total": _summarize(totals),
+            **{stage: _summarize(timings) for stage, timings in stage_timings.items()}
+        },
+        "phases": timer.report(),
+        "peak_memory_bytes": peak_memory,
+        "splits": last["splits"],
+        "csv_rows": last["csv_rows"]
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(sizes: List[int], depth: int = 4, splitter_density: float = 0.5, currency_fanout: int = 4,
+                   seed: int = 0, repeat: int = 3, include_bundled: bool = True) -> Dict[str, Any]:
+    """
+    执行完整基准测试（内置导出 + 各规模的合成workflow）
+
+    Returns:
+        {"meta": {...}, "cases": [用例结果, ...]}
+    """
+    cases = []
+
+    if include_bundled:
+        for path in sorted(BUNDLED_DIR.glob("*.json")):
+            with open(path, 'r', encoding='utf-8') as f:
+                workflow_data = json.load(f)
+            logger.info("基准测试 %s", path.name)
+            cases.append(benchmark_case(path.stem, workflow_data, repeat, params={"source": "bundled"}))
+
+    for size in sizes:
+        params = {
+            "source": "synthetic",
+            "target_blocks": size,
+            "depth": depth,
+            "splitter_density": splitter_density,
+            "currency_fanout": currency_fanout,
+            "seed": seed
+        }
+        workflow_data = generate_workflow(size, depth, splitter_density, currency_fanout, seed)
+        logger.info("基准测试 合成workflow %d blocks", size)
+        cases.append(benchmark_case(f"synthetic-{size}", workflow_data, repeat, params=params))
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": repeat
+        },
+        "cases": cases
+    }
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Workflow解析器性能基准测试")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000],
+                        help='合成workflow的block数量（默认 1000 10000 100000）')
+    parser.add_argument('--depth', type=int, default=4, help='币种条件之前的条件链长度')
+    parser.add_argument('--splitter-density', type=float, default=0.5, help='币种分支连接ROUTE_SPLITTER的比例')
+    parser.add_argument('--currency-fanout', type=int, default=4, help='每个币种条件block的币种分支数')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据随机种子')
+    parser.add_argument('--repeat', type=int, default=3, help='计时重复次数')
+    parser.add_argument('--no-bundled', action='store_true', help='不测试内置的workflow导出')
+    parser.add_argument('--output', help='结果JSON文件路径（默认 logs/benchmarks/benchmark_<时间>.json）')
+    return parser
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = _build_arg_parser().parse_args()
+
+    result = run_benchmarks(args.sizes, args.depth, args.splitter_density, args.currency_fanout,
+                            args.seed, args.repeat, include_bundled=not args.no_bundled)
+
+    output = Path(args.output) if args.output else (
+        DEFAULT_OUTPUT_DIR / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    for case in result["cases"]:
+        wall = case["wall_seconds"]
+        print(f"{case['name']:<20} blocks={case['blocks']:<7} splits={case['splits']:<6} "
+              f"total={wall['total']['median']:.4f}s parse={wall['parse_json']['median']:.4f}s "
+              f"csv={wall['get_csv_format_data']['median']:.4f}s "
+              f"compare={wall['compare_configurations']['median']:.4f}s "
+              f"peak={max(case['peak_memory_bytes'].values(), default=0) / 1024 / 1024:.1f}MB")
+    print(f"结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+条件名称分词
+统一从条件名称中提取币种、Network、Network Tokenized、Adaptive 3DS信息，
+正则只编译一次，每个不同的条件字符串只分词一次（WorkflowParser和SplitComparator共用）
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# 3个大写字母组成的独立单词（币种代码）
+CURRENCY_WORD_PATTERN = re.compile(r'\b([A-Z]{3})\b')
+# 任意连续3个大写字母（拆分"USD/CAD"等多币种值）
+CURRENCY_CODE_PATTERN = re.compile(r'[A-Z]{3}')
+
+# 条件名称中不是币种的3字母单词
+EXCLUDED_WORDS = frozenset({
+    'ALL', 'AND', 'THE', 'FOR', 'NOT', 'IN', 'IS', 'TO', 'OF', 'ON', 'AT', 'BY',
+    'BIN', 'NET', 'OUT', 'PAY', 'API', 'URL', 'ID', 'KEY', 'TAG', 'LOG', 'ERR'
+})
+
+# 常见的币种代码
+COMMON_CURRENCIES = frozenset({
+    'USD', 'EUR', 'GBP', 'JPY', 'CNY', 'KRW', 'AUD', 'CAD', 'CHF',
+    'NZD', 'SGD', 'HKD', 'TWD', 'THB', 'AED', 'PHP', 'INR', 'BRL'
+})
+
+# 缓存的不同字符串数量上限
+TOKEN_CACHE_SIZE = 8192
+
+
+class ConditionTokens:
+    """单个条件名称的分词结果（不可变，按条件字符串共享）"""
+
+    __slots__ = ("currency_codes", "currencies", "network", "network_tokenized", "adaptive_3ds")
+
+    def __init__(self, currency_codes: Tuple[str, ...], network: str, network_tokenized: str,
+                 adaptive_3ds: Optional[str]):
+        self.currency_codes = currency_codes  # 名称中的币种代码（已排除常见单词，保留重复）
+        self.currencies = tuple(dict.fromkeys(currency_codes))  # 去重后的币种代码
+        self.network = network  # "Amex"、"非Amex"，无Network条件时为""
+        self.network_tokenized = network_tokenized  # "TRUE"、"False"，无Network Tokenized条件时为""
+        self.adaptive_3ds = adaptive_3ds  # "部分开启"、"否"，名称中没有Adaptive 3DS时为None
+
+
+def _extract_network(name: str) -> str:
+    segments = [segment.strip() for segment in name.split("->") if segment.strip()]
+    # "Network!=Amex"后面紧跟"Default"或"All other conditions"时为default分支，应识别为Amex
+    for i, segment in enumerate(segments):
+        segment_upper = segment.upper().replace(" ", "")
+        if "NETWORK" in segment_upper and "AMEX" in segment_upper:
+            if "!=" in segment_upper or "NOT" in segment_upper:
+                if i + 1 < len(segments):
+                    next_segment = segments[i + 1].upper()
+                    if "DEFAULT" in next_segment or "ALL OTHER" in next_segment:
+                        return "Amex"
+                return "非Amex"
+            return "Amex"
+
+    if "NETWORK=AMEX" in name.upper():
+        return "Amex"
+    return ""
+
+
+def _extract_network_tokenized(name_upper: str) -> str:
+    if "NOT NETWORK TOKENISED" in name_upper or "NOT NETWORK TOKENIZED" in name_upper:
+        return "False"
+    if "NETWORK TOKENISED" in name_upper or "NETWORK TOKENIZED" in name_upper:
+        # 确保不是"NOT"
+        if "NOT" not in name_upper or name_upper.find("NOT") > name_upper.find("TOKENISED"):
+            return "TRUE"
+    return ""
+
+
+def _extract_adaptive_3ds(name: str, name_upper: str) -> Optional[str]:
+    if "ADAPTIVE 3DS" not in name_upper and "ADAPTIVE3DS" not in name_upper:
+        return None
+    if "部分" in name or "PARTIAL" in name_upper:
+        return "部分开启"
+    return "否"
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def tokenize_condition(name: str) -> ConditionTokens:
+    """
+    对条件名称分词（按字符串缓存）
+
+    Args:
+        name: 条件名称，可以是用" -> "连接的条件链
+
+    Returns:
+        分词结果
+    """
+    name_upper = name.upper()
+    currency_codes = tuple(code for code in CURRENCY_WORD_PATTERN.findall(name_upper) if code not in EXCLUDED_WORDS)
+    return ConditionTokens(
+        currency_codes,
+        _extract_network(name),
+        _extract_network_tokenized(name_upper),
+        _extract_adaptive_3ds(name, name_upper)
+    )
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def split_currency_codes(value: str) -> Tuple[str, ...]:
+    """将币种值（如"USD/CAD"）拆分为单独的币种代码"""
+    return tuple(CURRENCY_CODE_PATTERN.findall(value.upper()))
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def find_common_currency(text: str) -> Optional[str]:
+    """返回文本中第一个常见币种代码（区分大小写，按独立单词匹配），没有时返回None"""
+    for code in CURRENCY_WORD_PATTERN.findall(text):
+        if code in COMMON_CURRENCIES:
+            return code
+    return None
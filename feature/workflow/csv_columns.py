@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV行的列式构建
+每个split只推导一次行属性，按列存放；币种拆分用整列重复展开，
+去重和排序基于各列取值编码后的整数键，不再逐行构建dict和调用Python排序函数；
+结果可以转换为行dict列表（与原get_csv_format_data一致）或直接生成pandas DataFrame
+"""
+
+from itertools import chain, repeat
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    from condition_tokens import split_currency_codes
+except ImportError:
+    from feature.workflow.condition_tokens import split_currency_codes
+
+# CSV列（行dict的字段顺序）
+CSV_FIELDS = ('支付方式', 'Network', '币种', '开启Affinity', 'Adaptive 3DS', '备注', 'Network Tokenized？',
+              'Adyen', 'Stripe', 'Airwallex')
+
+# 排序：Network非Amex在前、Amex在后，其余最后；Network Tokenized TRUE在前、False在后，其余最后
+NETWORK_ORDER = {'非Amex': 0, 'Amex': 1}
+NETWORK_TOKENIZED_ORDER = {'TRUE': 0, 'False': 1}
+
+
+class CsvColumns:
+    """列式存储的CSV行（expand_csv_rows的结果未去重，build_csv_columns的结果已去重、排序）"""
+
+    __slots__ = ("columns", "split_indexes")
+
+    def __init__(self, columns: Dict[str, List[Any]], split_indexes: List[int]):
+        """
+        Args:
+            columns: 字段 -> 该列所有行的取值（字段与CSV_FIELDS一致）
+            split_indexes: 每行对应的split在WorkflowParser.splits中的序号
+        """
+        self.columns = columns
+        self.split_indexes = split_indexes
+
+    def __len__(self) -> int:
+        return len(self.split_indexes)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """转换为行dict列表"""
+        return [dict(zip(CSV_FIELDS, values)) for values in zip(*(self.columns[field] for field in CSV_FIELDS))]
+
+    def to_dataframe(self):
+        """
+        生成pandas DataFrame（列顺序与CSV_FIELDS一致）
+
+        Raises:
+            ImportError: 未安装pandas
+        """
+        import pandas as pd
+        return pd.DataFrame({field: self.columns[field] for field in CSV_FIELDS}, columns=list(CSV_FIELDS))
+
+
+def _encode(column: Sequence[Any]) -> Tuple[List[int], Dict[Any, int]]:
+    """按首次出现顺序把列取值编码为整数，返回(编码列, 取值 -> 编码)"""
+    dictionary = {}
+    return [dictionary.setdefault(value, len(dictionary)) for value in column], dictionary
+
+
+def expand_csv_rows(split_rows: Iterable[Tuple[int, Dict[str, Any]]]) -> CsvColumns:
+    """
+    由每个split推导出的CSV行（币种未拆分）构建按币种拆分后的列（未去重、未排序）
+
+    Args:
+        split_rows: [(split序号, 行dict)]，行dict包含CSV_FIELDS中的所有字段
+
+    Returns:
+        CsvColumns，行顺序与逐个split、逐个币种展开的顺序一致
+    """
+    split_indexes = []
+    base = {field: [] for field in CSV_FIELDS}
+    for split_index, row in split_rows:
+        split_indexes.append(split_index)
+        for field in CSV_FIELDS:
+            base[field].append(row.get(field, ''))
+
+    # 币种拆分：相同币种字符串只拆分一次，其余列按拆分数整列重复
+    currency_codes = {}
+    expanded_currencies = []
+    for currency in base['币种']:
+        codes = currency_codes.get(currency)
+        if codes is None:
+            codes = (split_currency_codes(str(currency)) if currency else None) or [currency]
+            currency_codes[currency] = codes
+        expanded_currencies.append(codes)
+    counts = [len(codes) for codes in expanded_currencies]
+
+    def expand(column: List[Any]) -> List[Any]:
+        return list(chain.from_iterable(map(repeat, column, counts)))
+
+    columns = {field: expand(base[field]) for field in CSV_FIELDS if field != '币种'}
+    columns['币种'] = list(chain.from_iterable(expanded_currencies))
+    return CsvColumns(columns, expand(split_indexes))
+
+
+def build_csv_columns(rows: CsvColumns, key_fields: Sequence[str]) -> CsvColumns:
+    """
+    对按币种拆分后的行去重、排序
+
+    Args:
+        rows: expand_csv_rows的结果
+        key_fields: 去重使用的字段
+
+    Returns:
+        CsvColumns，行顺序与逐行按首次出现去重、再按(Network, 币种, Network Tokenized)稳定排序的结果一致
+    """
+    columns = rows.columns
+    row_splits = rows.split_indexes
+
+    # 去重：各键字段编码后按混合进制合成一个整数键
+    keys = [0] * len(row_splits)
+    dictionaries = {}
+    for field in key_fields:
+        encoded, dictionary = _encode(columns[field])
+        dictionaries[field] = dictionary
+        radix = len(dictionary) or 1
+        keys = [key * radix + code for key, code in zip(keys, encoded)]
+    first_rows = {}
+    for index, key in enumerate(keys):
+        first_rows.setdefault(key, index)
+    unique = sorted(first_rows.values())
+
+    # 排序：只对不同取值计算排序编码，再合成整数排序键（sorted为稳定排序）
+    currencies = sorted(dictionaries['币种']) if '币种' in dictionaries else sorted(set(columns['币种']))
+    currency_rank = {currency: rank for rank, currency in enumerate(currencies)}
+    currency_count = len(currency_rank) or 1
+    network_column = columns['Network']
+    currency_column = columns['币种']
+    nt_column = columns['Network Tokenized？']
+    sort_keys = {
+        index: ((NETWORK_ORDER.get(network_column[index], 2) * currency_count + currency_rank[currency_column[index]]) * 3
+                + NETWORK_TOKENIZED_ORDER.get(nt_column[index], 2))
+        for index in unique
+    }
+    order = sorted(unique, key=sort_keys.__getitem__)
+
+    return CsvColumns({field: [columns[field][index] for index in order] for field in CSV_FIELDS},
+                      [row_splits[index] for index in order])
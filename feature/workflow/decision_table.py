@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow路由决策表
+将WorkflowParser的split/条件分析结果编译为扁平的哈希表：
+(支付方式, 币种, Network, Network Tokenized, Adaptive 3DS) -> 命中的ROUTE_SPLITTER及各渠道分量，
+查询时只做哈希查找和小范围过滤，不遍历workflow图；支持一次批量查询大量属性组合
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 支付方式别名 -> 支付方式代码（与WorkflowParser一致）
+PAYMENT_METHOD_ALIASES = {
+    'CARD': 'CARD', 'Card': 'CARD', 'PAYMENT_CARD': 'CARD',
+    'AP': 'AP', 'Apple Pay': 'AP', 'APPLE_PAY': 'AP', 'APPLE': 'AP',
+    'GP': 'GP', 'Google Pay': 'GP', 'GOOGLE_PAY': 'GP', 'GOOGLE': 'GP',
+}
+
+# Network归一化后的取值：Amex / 非Amex（Card的"Mastercard Visa JCB"也归为非Amex）
+NETWORK_AMEX = 'Amex'
+NETWORK_NON_AMEX = '非Amex'
+
+# 未匹配任何币种条件时走默认分支
+DEFAULT_CURRENCY = '其他'
+
+# 查询字段（按决策表键的顺序）
+QUERY_FIELDS = ("payment_method", "currency", "network", "network_tokenized", "adaptive_3ds")
+
+
+def normalize_payment_method(value: Any) -> Optional[str]:
+    """支付方式归一化为CARD/AP/GP，无法识别返回None"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    return PAYMENT_METHOD_ALIASES.get(text) or PAYMENT_METHOD_ALIASES.get(text.upper())
+
+
+def normalize_currency(value: Any) -> Optional[str]:
+    if value is None or str(value).strip() == '':
+        return None
+    text = str(value).strip()
+    return text if text == DEFAULT_CURRENCY else text.upper()
+
+
+def normalize_network(value: Any) -> Optional[str]:
+    """Network归一化为Amex/非Amex，空值返回None（不限）"""
+    if value is None or str(value).strip() == '':
+        return None
+    text = str(value).strip().upper().replace(' ', '').replace('_', '').replace('-', '')
+    if text in ('AMEX', 'AMERICANEXPRESS'):
+        return NETWORK_AMEX
+    return NETWORK_NON_AMEX
+
+
+def normalize_network_tokenized(value: Any) -> Optional[bool]:
+    """Network Tokenized归一化为True/False，空值返回None（不限）"""
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().upper()
+    if text in ('TRUE', 'YES', '1', '是'):
+        return True
+    if text in ('FALSE', 'NO', '0', '否'):
+        return False
+    return None
+
+
+def normalize_adaptive_3ds(value: Any) -> Optional[str]:
+    if value is None or str(value).strip() == '':
+        return None
+    return str(value).strip()
+
+
+def normalize_query(query: Dict[str, Any]) -> Tuple:
+    """
+    将查询归一化为决策表键
+
+    Raises:
+        ValueError: 缺少支付方式/币种，或支付方式无法识别
+    """
+    payment_method = normalize_payment_method(query.get("payment_method"))
+    if payment_method is None:
+        raise ValueError(f"无法识别的支付方式: {query.get('payment_method')}")
+    currency = normalize_currency(query.get("currency"))
+    if currency is None:
+        raise ValueError("缺少币种")
+    return (
+        payment_method,
+        currency,
+        normalize_network(query.get("network")),
+        normalize_network_tokenized(query.get("network_tokenized")),
+        normalize_adaptive_3ds(query.get("adaptive_3ds"))
+    )
+
+
+def _entry_from_row(split: Dict, row: Dict) -> Dict[str, Any]:
+    """由split和对应的CSV行生成决策表条目"""
+    routes = split.get("routes", [])
+    return {
+        "payment_method": normalize_payment_method(row.get('支付方式')),
+        "currency": normalize_currency(row.get('币种')),
+        "network": normalize_network(row.get('Network')),
+        "network_tokenized": normalize_network_tokenized(row.get('Network Tokenized？')),
+        "adaptive_3ds": normalize_adaptive_3ds(row.get('Adaptive 3DS')),
+        "split_id": split.get("id"),
+        "split_name": split.get("name"),
+        "condition": (split.get("condition") or {}).get("name", ""),
+        "no_split": not routes or all(route.get("percentage", 0) == 0 for route in routes),
+        "routes": [
+            {"name": route.get("name"), "percentage": route.get("percentage", 0), "next": route.get("next")}
+            for route in routes
+        ],
+        "processors": {name: row.get(name, '') for name in ('Adyen', 'Stripe', 'Airwallex')}
+    }
+
+
+def compile_entries(splits: List[Dict], rows) -> List[Dict[str, Any]]:
+    """
+    由WorkflowParser的splits和按币种拆分的CSV行编译决策表条目（与get_csv_format_data共用同一份行推导结果）
+
+    Args:
+        splits: WorkflowParser.splits
+        rows: WorkflowParser.get_csv_rows()的结果（CsvColumns）
+
+    Returns:
+        条目列表，可直接序列化并写入解析结果
+    """
+    entries = []
+    seen = set()
+    for split_index, row in zip(rows.split_indexes, rows.rows()):
+        entry = _entry_from_row(splits[split_index], row)
+        key = (entry["split_id"],) + tuple(entry[field] for field in QUERY_FIELDS)
+        if key in seen:
+            continue
+        seen.add(key)
+        entries.append(entry)
+    return entries
+
+
+def _entry_matches(entry: Dict[str, Any], network: Optional[str], network_tokenized: Optional[bool],
+                   adaptive_3ds: Optional[str]) -> bool:
+    """条目字段为空表示该split不区分此属性，与任意查询值匹配"""
+    return (
+        (network is None or entry["network"] is None or entry["network"] == network)
+        and (network_tokenized is None or entry["network_tokenized"] is None
+             or entry["network_tokenized"] == network_tokenized)
+        and (adaptive_3ds is None or entry["adaptive_3ds"] is None or entry["adaptive_3ds"] == adaptive_3ds)
+    )
+
+
+class DecisionTable:
+    """扁平的路由决策表（按(支付方式, 币种)分桶，桶内按Network/Network Tokenized/3DS过滤）"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entries = entries
+        self._buckets = {}  # (支付方式, 币种) -> [条目]
+        for entry in entries:
+            self._buckets.setdefault((entry["payment_method"], entry["currency"]), []).append(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _resolve(self, key: Tuple) -> Dict[str, Any]:
+        payment_method, currency, network, network_tokenized, adaptive_3ds = key
+        matched_currency = currency
+        bucket = self._buckets.get((payment_method, currency))
+        if bucket is None:
+            # 币种没有单独配置时走默认分支（"其他"）
+            matched_currency = DEFAULT_CURRENCY
+            bucket = self._buckets.get((payment_method, DEFAULT_CURRENCY), [])
+
+        matches = [entry for entry in bucket if _entry_matches(entry, network, network_tokenized, adaptive_3ds)]
+
+        return {
+            "query": dict(zip(QUERY_FIELDS, key)),
+            "matched_currency": matched_currency if bucket else None,
+            "matches": matches
+        }
+
+    def lookup(self, payment_method: Any, currency: Any, network: Any = None,
+               network_tokenized: Any = None, adaptive_3ds: Any = None) -> Dict[str, Any]:
+        """
+        查询单个属性组合命中的split
+
+        Args:
+            payment_method: 支付方式（CARD/AP/GP或Card/Apple Pay/Google Pay）
+            currency: 币种代码
+            network: Network（Amex/非Amex或具体卡组织），None表示不限
+            network_tokenized: 是否Network Tokenized，None表示不限
+            adaptive_3ds: Adaptive 3DS取值，None表示不限
+
+        Returns:
+            {"query": 归一化后的查询, "matched_currency": 命中的币种（默认分支为"其他"）或None,
+             "matches": [{split_id, split_name, condition, routes, processors, ...}]}
+
+        Raises:
+            ValueError: 查询无效
+        """
+        return self._resolve(normalize_query({
+            "payment_method": payment_method,
+            "currency": currency,
+            "network": network,
+            "network_tokenized": network_tokenized,
+            "adaptive_3ds": adaptive_3ds
+        }))
+
+    def lookup_many(self, queries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        批量查询（同一归一化键只解析一次）
+
+        Args:
+            queries: [{payment_method, currency, network, network_tokenized, adaptive_3ds}]
+
+        Returns:
+            与queries一一对应的结果列表，无效查询返回{"query": 原查询, "error": 错误信息}
+        """
+        resolved = {}
+        results = []
+        for query in queries:
+            try:
+                key = normalize_query(query if isinstance(query, dict) else {})
+            except ValueError as exc:
+                results.append({"query": query, "error": str(exc)})
+                continue
+            result = resolved.get(key)
+            if result is None:
+                result = resolved[key] = self._resolve(key)
+            results.append(result)
+        return results
+
+
+def compile_decision_table(parser) -> DecisionTable:
+    """
+    从已完成解析的WorkflowParser编译决策表
+
+    用法:
+        parser = WorkflowParser()
+        parser.parse_json(workflow_data)
+        table = compile_decision_table(parser)
+        table.lookup("CARD", "USD", network="Amex")
+    """
+    return DecisionTable(compile_entries(parser.splits, parser.get_csv_rows()))
+
+
+class DecisionTableCache:
+    """按解析缓存键复用已编译的决策表索引"""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._tables = OrderedDict()  # 缓存键 -> DecisionTable
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: str, entries: List[Dict[str, Any]]) -> DecisionTable:
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+        table = DecisionTable(entries)
+        with self._lock:
+            self._tables[key] = table
+            while len(self._tables) > self.max_entries:
+                self._tables.popitem(last=False)
+        return table
+
+
+# 进程内共享的决策表缓存
+decision_tables = DecisionTableCache()
@@ -5,13 +5,107 @@ Docx文件读取器
 从Primer Workflow文档中提取分量配置信息
 """
 
+import os
 import re
-from typing import Dict, List, Optional
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 try:
     from docx import Document
 except ImportError:
     Document = None
 
+# split_comparator使用的渠道顺序（与docx中的分量顺序一致）
+SPLIT_ROUTES = ["Adyen", "Stripe", "AWX"]
+
+
+def format_split_config(config: Dict[str, Dict[str, List[int]]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    将docx分量配置转换为split_comparator需要的格式
+    
+    Returns:
+        {支付方式: {币种: {"percentages": [...], "routes": [...], "split_id": None}}}
+    """
+    formatted_config = {}
+    for payment_method, currencies in config.items():
+        formatted_config[payment_method] = {}
+        for currency, percentages in currencies.items():
+            formatted_config[payment_method][currency] = {
+                "percentages": percentages,
+                "routes": list(SPLIT_ROUTES),
+                "split_id": None
+            }
+    return formatted_config
+
+
+class DocxConfig:
+    """一个docx文件版本的解析结果（缓存中共享，调用方不应修改）"""
+    
+    __slots__ = ("path", "mtime_ns", "size", "config", "formatted")
+    
+    def __init__(self, path: str, stat: os.stat_result, config: Dict[str, Dict[str, List[int]]]):
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.config = config
+        self.formatted = format_split_config(config)
+    
+    def matches(self, stat: os.stat_result) -> bool:
+        return self.mtime_ns == stat.st_mtime_ns and self.size == stat.st_size
+
+
+class DocxConfigCache:
+    """按文件路径 + 修改时间 + 大小缓存docx分量配置，文件变化后重新解析"""
+    
+    def __init__(self):
+        self._entries = {}  # 绝对路径 -> DocxConfig
+        self._lock = threading.Lock()
+        # 同一时间只解析一次，并发请求等待同一个解析结果
+        self._parse_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, file_path: str, parse: Callable[[str], Dict[str, Dict[str, List[int]]]]) -> DocxConfig:
+        """
+        获取docx的解析结果，未缓存或文件已变化时调用parse解析
+        
+        Raises:
+            FileNotFoundError: 文件不存在
+        """
+        path = str(Path(file_path).resolve())
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.matches(stat):
+                self.hits += 1
+                return entry
+        
+        with self._parse_lock:
+            stat = os.stat(path)
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is not None and entry.matches(stat):
+                    self.hits += 1
+                    return entry
+            # 先取文件状态再解析：解析期间文件被修改时，下次请求的状态不同会重新解析
+            entry = DocxConfig(path, stat, parse(path))
+            with self._lock:
+                self._entries[path] = entry
+                self.misses += 1
+            return entry
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"files": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# 进程内共享的docx解析缓存
+docx_configs = DocxConfigCache()
+
 
 class DocxReader:
     """Docx文件读取器"""
@@ -20,6 +114,15 @@ class DocxReader:
         if Document is None:
             raise ImportError("请安装python-docx库: pip install python-docx")
     
+    def read_docx_cached(self, file_path: str) -> DocxConfig:
+        """
+        读取docx文件的分量配置（按路径、修改时间和大小缓存，各请求共享）
+        
+        Returns:
+            DocxConfig: config为read_docx的结果，formatted为split_comparator格式的配置
+        """
+        return docx_configs.get(file_path, self.read_docx)
+    
     def read_docx(self, file_path: str) -> Dict[str, Dict[str, List[int]]]:
         """
         读取docx文件并提取分量配置
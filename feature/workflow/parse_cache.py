@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow解析结果缓存
+按上传文件内容的哈希缓存解析结果（节点、条件、连接、splits、CSV行、摘要），
+相同的导出文件重复上传时直接返回缓存，不再重新遍历图
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    from workflow_parser import WorkflowParser
+    from parse_store import ParseStore, workflow_store_key
+    from decision_table import compile_entries
+except ImportError:
+    from feature.workflow.workflow_parser import WorkflowParser
+    from feature.workflow.parse_store import ParseStore, workflow_store_key
+    from feature.workflow.decision_table import compile_entries
+
+try:
+    from workflow_stream import load_workflow_skeleton
+except ImportError:
+    from feature.workflow.workflow_stream import load_workflow_skeleton
+
+logger = logging.getLogger(__name__)
+
+# 超过该大小的上传文件自动使用流式读取
+STREAMING_THRESHOLD_BYTES = 4 * 1024 * 1024
+
+
+def load_workflow_content(content: bytes, streaming: bool = False) -> Any:
+    """
+    解码上传的workflow JSON字节内容
+
+    Args:
+        content: 上传文件的原始字节
+        streaming: 是否流式读取（逐个解码block，只保留解析所需字段）
+
+    Returns:
+        workflow JSON数据
+
+    Raises:
+        json.JSONDecodeError: JSON格式错误
+    """
+    if streaming:
+        return load_workflow_skeleton(content)
+    return json.loads(content.decode('utf-8'))
+
+
+def parse_workflow_data(json_data: Any, previous: Optional[Dict[str, Any]] = None,
+                        incremental: bool = False, parallel: bool = False) -> Dict[str, Any]:
+    """
+    解析workflow JSON数据
+
+    Args:
+        json_data: workflow JSON数据
+        previous: 同一workflow上一个revision的增量解析状态（{"analysis_state": ...}），未变化的split分析直接复用
+        incremental: 是否在结果中返回增量解析状态（analysis_state）
+        parallel: split数较多时是否在共享进程池中并行分析split条件（见WorkflowParser）
+
+    Returns:
+        解析结果: {nodes, conditions, connections, splits, csv_format, decision_table, summary}
+    """
+    parser = WorkflowParser(parallel=parallel)
+    result = parser.parse_json(json_data, previous=previous, incremental=incremental)
+
+    # CSV行只推导一次，CSV格式数据和决策表共用
+    csv_rows = parser.get_csv_rows()
+    value = {
+        "nodes": result["nodes"],
+        "conditions": result["conditions"],
+        "connections": result["connections"],
+        "splits": result["splits"],
+        "csv_format": parser.get_csv_columns(csv_rows).rows(),
+        "decision_table": compile_entries(parser.splits, csv_rows),
+        "summary": parser.get_summary()
+    }
+    if "analysis_state" in result:
+        value["analysis_state"] = result["analysis_state"]
+    return value
+
+
+class ParseCache:
+    """按内容哈希寻址的LRU解析结果缓存（按条目数、总字节数和存活时间淘汰）"""
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600, store: Optional[ParseStore] = None, max_analysis_states: int = 8,
+                 parallel: bool = True):
+        """
+        Args:
+            max_entries: 最多缓存的条目数
+            max_bytes: 缓存条目对应上传文件的总字节数上限
+            ttl_seconds: 条目存活时间（秒），超时后视为未命中
+            store: 磁盘持久化存储，内存未命中时按workflow id/version/revision_id查找
+            max_analysis_states: 最多保留增量解析状态的workflow数（每个workflow只保留最近一个revision）
+            parallel: 大型workflow是否并行分析split（进程池子进程中始终在进程内分析）
+        """
+        self.parallel = parallel
+        self.store = store
+        self.max_analysis_states = max_analysis_states
+        self._analysis_states = OrderedDict()  # (workflow id, ...) -> {"analysis_state": AnalysisState}
+        self.incremental_parses = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, size, created_at)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(content: bytes) -> str:
+        """计算上传内容的缓存键"""
+        return hashlib.sha256(content).hexdigest()
+
+    def content_key(self, content: bytes, streaming: Optional[bool] = None) -> Tuple[str, bool]:
+        """
+        计算上传内容的缓存键并确定是否流式读取
+
+        Args:
+            content: 上传文件的原始字节
+            streaming: 是否流式读取，None时超过STREAMING_THRESHOLD_BYTES自动启用
+
+        Returns:
+            (缓存键, 是否流式读取)
+        """
+        if streaming is None:
+            streaming = len(content) > STREAMING_THRESHOLD_BYTES
+        # 流式读取的节点data为精简block，与完整解析结果分开缓存
+        return self.make_key(content) + (":stream" if streaming else ""), streaming
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的解析结果，未命中或已过期返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, created_at = entry
+            if self._is_expired(created_at):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """只读取已缓存的解析结果（不计入命中/未命中统计，不调整LRU顺序），未缓存或已过期返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry[2]):
+                return None
+            return entry[0]
+
+    def put(self, key: str, value: Dict[str, Any], size: int = 0):
+        """写入解析结果，超出容量时淘汰最久未使用的条目"""
+        # 单个条目超过总容量时不缓存
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, time.monotonic())
+            self._total_bytes += size
+            self._evict()
+
+    def get_or_parse(self, content: bytes, streaming: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        获取上传内容的解析结果，未命中时解析并写入缓存
+
+        Args:
+            content: 上传文件的原始字节
+            streaming: 是否流式读取，None时超过STREAMING_THRESHOLD_BYTES自动启用
+
+        Returns:
+            解析结果: {nodes, conditions, connections, splits, csv_format, summary}
+        """
+        key, streaming = self.content_key(content, streaming)
+        value = self.get(key)
+        if value is None:
+            value = self._load_or_parse(load_workflow_content(content, streaming), streaming)
+            self.put(key, value, len(content))
+        return value
+
+    def load_or_parse(self, content: bytes, streaming: bool = False) -> Dict[str, Any]:
+        """从磁盘存储读取或解析上传内容（结果写回磁盘存储，不写入内存缓存）"""
+        return self._load_or_parse(load_workflow_content(content, streaming), streaming)
+
+    def _load_or_parse(self, json_data: Any, streaming: bool = False) -> Dict[str, Any]:
+        """
+        从磁盘存储读取解析结果，未命中时解析并写回存储
+
+        同一workflow（workflow id相同）的新revision基于上一个revision的增量解析状态解析，
+        只重新分析祖先链中有block变化的split
+        """
+        store_key = workflow_store_key(json_data)
+        if store_key and streaming:
+            store_key += (("ingest", "stream"),)
+        if store_key and self.store:
+            value = self.store.load(store_key)
+            if value is not None:
+                return value
+
+        # 增量状态按workflow id区分（不含version/revision_id），流式读取的精简block单独记录
+        family_key = tuple(item[0] for item in store_key) if store_key else None
+        with self._lock:
+            previous = self._analysis_states.get(family_key) if family_key else None
+
+        value = parse_workflow_data(json_data, previous=previous, incremental=family_key is not None,
+                                    parallel=self.parallel)
+        analysis_state = value.pop("analysis_state", None)
+        if family_key and analysis_state is not None:
+            with self._lock:
+                if previous is not None:
+                    self.incremental_parses += 1
+                self._analysis_states[family_key] = {"analysis_state": analysis_state}
+                self._analysis_states.move_to_end(family_key)
+                while len(self._analysis_states) > self.max_analysis_states:
+                    self._analysis_states.popitem(last=False)
+
+        if store_key and self.store:
+            try:
+                self.store.save(store_key, value)
+            except OSError as exc:
+                logger.warning("写入解析结果存储失败: %s", exc)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "incremental_parses": self.incremental_parses,
+                "analysis_states": len(self._analysis_states),
+                "store": self.store.stats() if self.store else None
+            }
+
+    def clear(self):
+        """清空缓存（保留统计计数）"""
+        with self._lock:
+            self._entries.clear()
+            self._analysis_states.clear()
+            self._total_bytes = 0
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - created_at > self.ttl_seconds
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def _evict(self):
+        """淘汰过期条目，再按LRU淘汰直到满足条目数和字节数上限"""
+        for key in [k for k, (_, _, created_at) in self._entries.items() if self._is_expired(created_at)]:
+            self._remove(key)
+            self.expirations += 1
+
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+
+# 进程内共享的解析缓存（带磁盘持久化，服务重启后可直接恢复）
+parse_cache = ParseCache(store=ParseStore())
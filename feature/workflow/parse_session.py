@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow解析会话
+解析结果保存在服务端并分配会话id，首次响应只返回摘要、splits和CSV行，
+节点和连接通过分页接口按需获取（支持字段选择），单个block的原始数据通过详情接口获取
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+# 分页接口每页最大条数
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 200
+
+# 各集合可选择的字段；未指定fields时返回默认字段（不含原始block数据）
+NODE_FIELDS = ("id", "name", "type", "block_type", "description", "data")
+DEFAULT_NODE_FIELDS = ("id", "name", "type", "block_type", "description")
+CONNECTION_FIELDS = ("from", "to", "label", "type", "condition")
+DEFAULT_CONNECTION_FIELDS = ("from", "to", "label", "type")
+
+
+class ParseSession:
+    """单个解析会话：解析结果及按需构建的block索引"""
+
+    def __init__(self, session_id: str, result: Dict[str, Any]):
+        self.session_id = session_id
+        self.result = result
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+        self._node_index = None
+
+    def find_node(self, block_id: str) -> Optional[Dict[str, Any]]:
+        """按block id查找节点"""
+        if self._node_index is None:
+            self._node_index = {node.get("id"): node for node in self.result.get("nodes", [])}
+        return self._node_index.get(block_id)
+
+
+def slim_condition(condition: Optional[Dict]) -> Optional[Dict]:
+    """去掉条件信息中嵌入的完整block（保留block_id引用）"""
+    if not isinstance(condition, dict):
+        return condition
+    slim = {key: value for key, value in condition.items() if key != "block"}
+    parent_conditions = condition.get("parent_conditions")
+    if parent_conditions:
+        slim["parent_conditions"] = [
+            {key: value for key, value in parent.items() if key != "parent_block"}
+            for parent in parent_conditions
+        ]
+    return slim
+
+
+def slim_split(split: Dict) -> Dict:
+    """去掉split中的原始block数据和条件中嵌入的完整block"""
+    slim = {key: value for key, value in split.items() if key != "data"}
+    slim["condition"] = slim_condition(split.get("condition"))
+    return slim
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], default: Iterable[str]) -> List[str]:
+    """
+    解析逗号分隔的字段列表
+
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    if not fields:
+        return list(default)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}（可选: {', '.join(allowed)}）")
+    return selected
+
+
+def paginate(items: List[Dict], offset: int, limit: int, fields: List[str]) -> Dict[str, Any]:
+    """
+    分页并按字段投影
+
+    Returns:
+        {"items": [...], "total": 总数, "offset": 偏移, "limit": 每页条数, "next_offset": 下一页偏移或None}
+    """
+    if offset < 0:
+        raise ValueError("offset不能为负数")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit必须在1到{MAX_PAGE_SIZE}之间")
+
+    page = items[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(items) else None
+    return {
+        "items": [{field: item[field] for field in fields if field in item} for item in page],
+        "total": len(items),
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset
+    }
+
+
+class ParseSessionStore:
+    """解析会话存储（按最后访问时间TTL淘汰，超出数量上限时淘汰最久未访问的会话）"""
+
+    def __init__(self, ttl_seconds: float = 1800, max_sessions: int = 64):
+        """
+        Args:
+            ttl_seconds: 会话空闲超时时间（秒）
+            max_sessions: 最多保留的会话数
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session id -> ParseSession
+        self._lock = threading.Lock()
+        self.expirations = 0
+        self.evictions = 0
+
+    def create(self, result: Dict[str, Any]) -> ParseSession:
+        """为解析结果创建会话"""
+        session = ParseSession(uuid.uuid4().hex, result)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._evict()
+        return session
+
+    def get(self, session_id: str) -> Optional[ParseSession]:
+        """获取会话（刷新访问时间），不存在或已过期返回None"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self._is_expired(session):
+                del self._sessions[session_id]
+                self.expirations += 1
+                return None
+            session.last_access = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """删除会话，返回会话是否存在"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """获取会话统计信息"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "expirations": self.expirations,
+                "evictions": self.evictions
+            }
+
+    def _is_expired(self, session: ParseSession) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - session.last_access > self.ttl_seconds
+
+    def _evict(self):
+        for session_id in [sid for sid, session in self._sessions.items() if self._is_expired(session)]:
+            del self._sessions[session_id]
+            self.expirations += 1
+
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+
+# 进程内共享的解析会话存储
+parse_sessions = ParseSessionStore()
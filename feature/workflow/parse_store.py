@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow解析结果持久化存储
+将WorkflowParser的解析结果序列化到磁盘，按workflow id、version、revision_id寻址，
+服务重启后可直接从磁盘恢复，无需重新解析
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    from workflow_parser import PARSER_SCHEMA_VERSION
+except ImportError:
+    from feature.workflow.workflow_parser import PARSER_SCHEMA_VERSION
+
+# 默认存储目录：项目根目录下的 logs/parse_cache
+DEFAULT_STORE_DIR = Path(__file__).parent.parent.parent / "logs" / "parse_cache"
+
+
+def workflow_store_key(json_data: Any) -> Optional[Tuple]:
+    """
+    从workflow导出数据中提取存储键
+
+    Args:
+        json_data: workflow JSON数据（单个导出或导出列表）
+
+    Returns:
+        ((workflow id, version, revision_id), ...)，任一导出缺少标识信息时返回None
+    """
+    exports = json_data if isinstance(json_data, list) else [json_data]
+    if not exports:
+        return None
+
+    key = []
+    for export in exports:
+        if not isinstance(export, dict):
+            return None
+        workflow_source = export.get("workflow_source") or {}
+        workflow_id = workflow_source.get("id") or export.get("id")
+        version = workflow_source.get("version", export.get("version"))
+        revision_id = workflow_source.get("revision_id")
+        if not workflow_id or version is None or not revision_id:
+            return None
+        key.append((str(workflow_id), str(version), str(revision_id)))
+    return tuple(key)
+
+
+class ParseStore:
+    """基于pickle文件的解析结果存储，带解析器schema版本校验"""
+
+    def __init__(self, store_dir: Optional[Path] = None):
+        """
+        Args:
+            store_dir: 存储目录，默认为 logs/parse_cache
+        """
+        self.store_dir = Path(store_dir) if store_dir else DEFAULT_STORE_DIR
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.stale = 0
+
+    def _path_for(self, key: Tuple) -> Path:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return self.store_dir / f"{digest}.pkl"
+
+    def load(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        按存储键读取解析结果
+
+        Returns:
+            解析结果，不存在、schema版本不一致或文件损坏时返回None
+        """
+        path = self._path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                record = pickle.load(f)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except Exception:
+            # 文件损坏，删除后按未命中处理
+            self._discard(path)
+            self._count("misses")
+            return None
+
+        if (not isinstance(record, dict) or record.get("schema_version") != PARSER_SCHEMA_VERSION
+                or record.get("key") != key):
+            # 解析器升级后旧条目失效
+            self._discard(path)
+            self._count("stale")
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return record["value"]
+
+    def save(self, key: Tuple, value: Dict[str, Any]):
+        """写入解析结果（先写临时文件再原子替换）"""
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path_for(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        record = {
+            "schema_version": PARSER_SCHEMA_VERSION,
+            "key": key,
+            "created_at": time.time(),
+            "value": value
+        }
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._count("writes")
+        finally:
+            if tmp_path.exists():
+                self._discard(tmp_path)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        with self._lock:
+            return {
+                "store_dir": str(self.store_dir),
+                "schema_version": PARSER_SCHEMA_VERSION,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "stale": self.stale
+            }
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _discard(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON响应分块编码
+按层级逐个编码dict/list的成员并以固定大小的块输出，不在内存中拼出完整的JSON字符串，
+大型解析结果（节点、连接、splits）可以边编码边发送
+"""
+
+import json
+from typing import Any, Iterator
+
+# 每个输出块的目标大小（字节数近似为字符数）
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# 逐成员编码的层级深度，更深的对象整体编码（如单个节点）
+DEFAULT_STREAM_DEPTH = 3
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+# 与jsonify默认输出一致：紧凑格式、键排序、ASCII转义
+_encoder = json.JSONEncoder(ensure_ascii=True, sort_keys=True, separators=(",", ":"), default=_default)
+
+
+def _iter_value(value: Any, depth: int) -> Iterator[str]:
+    if depth <= 0 or not isinstance(value, (dict, list, tuple)) or not value:
+        yield _encoder.encode(value)
+        return
+
+    if isinstance(value, dict):
+        yield "{"
+        for index, key in enumerate(sorted(value, key=str)):
+            prefix = "," if index else ""
+            yield prefix + _encoder.encode(str(key)) + ":"
+            yield from _iter_value(value[key], depth - 1)
+        yield "}"
+    else:
+        yield "["
+        for index, item in enumerate(value):
+            if index:
+                yield ","
+            yield from _iter_value(item, depth - 1)
+        yield "]"
+
+
+def iter_json_chunks(value: Any, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     stream_depth: int = DEFAULT_STREAM_DEPTH) -> Iterator[str]:
+    """
+    分块编码JSON
+
+    Args:
+        value: 要编码的对象
+        chunk_size: 每个输出块的目标大小
+        stream_depth: 逐成员编码的层级深度
+
+    Yields:
+        JSON文本块，拼接后与一次性编码的结果等价
+    """
+    buffer = []
+    size = 0
+    for piece in _iter_value(value, stream_depth):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渠道分量模拟器
+给定交易量分布（按支付方式/币种/Network等），计算当前workflow和各调整方案下
+Adyen、Stripe、Airwallex的期望交易量：解析出的split经决策表转换为份额矩阵，
+期望值由矩阵乘法一次得出；多个调整方案叠加为三维数组统一计算，可选蒙特卡洛模式估计方差
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None
+    pd = None
+
+try:
+    from decision_table import DecisionTable, normalize_query, normalize_currency, DEFAULT_CURRENCY
+    from split_comparator import SplitComparator
+except ImportError:
+    from feature.workflow.decision_table import DecisionTable, normalize_query, normalize_currency, DEFAULT_CURRENCY
+    from feature.workflow.split_comparator import SplitComparator
+
+# 渠道列（与CSV行及调整方案中的分量顺序一致），最后一列为未分配（无分量或分量合计不足100%）
+PROCESSORS = ("Adyen", "Stripe", "Airwallex")
+UNASSIGNED = "未分配"
+SHARE_COLUMNS = PROCESSORS + (UNASSIGNED,)
+
+# 交易量CSV的列名别名 -> 标准列名
+TRAFFIC_COLUMN_ALIASES = {
+    '支付方式': 'payment_method',
+    '币种': 'currency',
+    'Network': 'network',
+    'Network Tokenized？': 'network_tokenized',
+    'Adaptive 3DS': 'adaptive_3ds',
+    '交易量': 'volume',
+    '交易笔数': 'volume',
+}
+
+TRAFFIC_KEY_COLUMNS = ("payment_method", "currency", "network", "network_tokenized", "adaptive_3ds")
+
+# 蒙特卡洛每批模拟的最大元素数（批次数 x 行数 x 渠道数），控制内存占用
+MONTE_CARLO_BATCH_ELEMENTS = 4 * 1024 * 1024
+
+
+def _percentage_shares(percentages: Sequence) -> List[float]:
+    """调整方案中的[Adyen%, Stripe%, AWX%] -> [Adyen, Stripe, Airwallex, 未分配]份额"""
+    shares = [float(p) / 100 for p in list(percentages)[:len(PROCESSORS)]]
+    shares += [0.0] * (len(PROCESSORS) - len(shares))
+    shares.append(max(0.0, 1.0 - sum(shares)))
+    return shares
+
+
+def _factorize(keys: Iterable) -> tuple:
+    """按首次出现顺序编码 -> (编码数组, 唯一值列表)"""
+    index = {}
+    codes = [index.setdefault(key, len(index)) for key in keys]
+    return np.asarray(codes, dtype=np.intp), list(index)
+
+
+def _entry_shares(entry: Dict[str, Any]) -> List[float]:
+    """决策表条目 -> [Adyen, Stripe, Airwallex, 未分配]份额"""
+    if entry.get("no_split"):
+        return [0.0, 0.0, 0.0, 1.0]
+    shares = []
+    for name in PROCESSORS:
+        value = entry["processors"].get(name, '')
+        shares.append(float(value) / 100 if isinstance(value, (int, float)) else 0.0)
+    shares.append(max(0.0, 1.0 - sum(shares)))
+    return shares
+
+
+def _is_routing_entry(entry: Dict[str, Any]) -> bool:
+    """是否为按渠道分流的split（Adaptive 3DS等非渠道split的各渠道分量为空，无分量的split不分流）"""
+    if entry.get("no_split"):
+        return False
+    return any(isinstance(value, (int, float)) and value > 0 for value in entry["processors"].values())
+
+
+def _entry_specificity(entry: Dict[str, Any]) -> tuple:
+    """条目的具体程度：限定的属性数（Network、Network Tokenized、Adaptive 3DS），其次为条件链深度"""
+    attributes = sum(entry.get(field) is not None for field in ("network", "network_tokenized", "adaptive_3ds"))
+    depth = len([segment for segment in (entry.get("condition") or "").split("->") if segment.strip()])
+    return attributes, depth
+
+
+def _match_shares(matches: List[Dict[str, Any]]) -> List[float]:
+    """
+    命中条目 -> 份额：只取渠道分流split中最具体的条目；
+    最具体的条目有多个时（如未指定Network时Amex与非Amex均命中）取平均；没有渠道分流split时计入未分配
+    """
+    routing = [entry for entry in matches if _is_routing_entry(entry)]
+    if not routing:
+        return [0.0, 0.0, 0.0, 1.0]
+    best = max(_entry_specificity(entry) for entry in routing)
+    selected = [_entry_shares(entry) for entry in routing if _entry_specificity(entry) == best]
+    return [sum(column) / len(selected) for column in zip(*selected)]
+
+
+class ShareSimulator:
+    """基于决策表的渠道分量模拟器"""
+
+    def __init__(self, table: Union[DecisionTable, List[Dict[str, Any]]]):
+        """
+        Args:
+            table: 决策表或决策表条目（解析结果中的decision_table）
+        """
+        if np is None or pd is None:
+            raise ImportError("请安装numpy和pandas库: pip install pandas")
+        self.table = table if isinstance(table, DecisionTable) else DecisionTable(table)
+        self._comparator = SplitComparator()
+
+    @staticmethod
+    def load_traffic(traffic: Any) -> "pd.DataFrame":
+        """
+        读取交易量分布
+
+        Args:
+            traffic: DataFrame、CSV文件路径或记录列表；需要payment_method、currency、volume列
+                     （也可使用支付方式/币种/交易量等CSV列名），network等属性列可选
+
+        Returns:
+            标准化后的DataFrame（列: payment_method, currency, network, network_tokenized, adaptive_3ds, volume）
+
+        Raises:
+            ValueError: 缺少必需列或交易量为负数
+        """
+        if isinstance(traffic, pd.DataFrame):
+            frame = traffic.copy()
+        elif isinstance(traffic, str) or hasattr(traffic, "read"):
+            frame = pd.read_csv(traffic, dtype=str, keep_default_na=False)
+        else:
+            frame = pd.DataFrame(list(traffic))
+
+        frame = frame.rename(columns=TRAFFIC_COLUMN_ALIASES)
+        missing = [column for column in ("payment_method", "currency", "volume") if column not in frame.columns]
+        if missing:
+            raise ValueError(f"交易量数据缺少列: {', '.join(missing)}")
+        for column in TRAFFIC_KEY_COLUMNS:
+            if column not in frame.columns:
+                frame[column] = None
+        frame["volume"] = pd.to_numeric(frame["volume"], errors="raise").astype(float)
+        if (frame["volume"] < 0).any():
+            raise ValueError("交易量不能为负数")
+        return frame[list(TRAFFIC_KEY_COLUMNS) + ["volume"]].reset_index(drop=True)
+
+    def current_shares(self, traffic: "pd.DataFrame") -> "np.ndarray":
+        """
+        按当前workflow计算每行交易的渠道份额
+
+        只有按渠道分流的split参与计算（Adaptive 3DS等split和无分量split不分流），取其中最具体的条目；
+        同样具体的条目有多个（如未指定Network时Amex与非Amex均命中）时取平均；
+        未命中任何渠道分流split的交易计入未分配
+
+        Returns:
+            (行数, 4)的份额矩阵，列顺序为SHARE_COLUMNS
+        """
+        keys = traffic[list(TRAFFIC_KEY_COLUMNS)].astype(object)
+        keys = keys.where(keys.notna(), None)
+        normalized = [normalize_query(record) for record in keys.to_dict("records")]
+
+        # 相同属性组合只查询一次
+        codes, uniques = _factorize(normalized)
+        results = self.table.lookup_many(dict(zip(TRAFFIC_KEY_COLUMNS, key)) for key in uniques)
+        unique_shares = np.array([_match_shares(result.get("matches") or []) for result in results],
+                                 dtype=float).reshape(len(uniques), len(SHARE_COLUMNS))
+        return unique_shares[codes]
+
+    def _scenario_overrides(self, group_keys: Sequence, scenarios: Sequence[Dict], mode: str) -> "np.ndarray":
+        """
+        调整方案 -> (方案数, 分组数, 4)的覆盖份额数组，未覆盖的位置为NaN
+
+        Args:
+            group_keys: [(支付方式, 币种, 决策表中实际命中的币种)]，与交易量分组一一对应；
+                没有单独配置、走"其他"分支的币种，实际命中的币种为"其他"
+            scenarios: parse_adjustment_text的结果列表
+            mode: "update"（未调整的币种保持当前配置）或 "override"（方案中列出的支付方式下，
+                  未列出的币种走方案中的"其他"配置；未列出的支付方式保持当前配置）
+        """
+        overrides = np.full((len(scenarios), len(group_keys), len(SHARE_COLUMNS)), np.nan)
+
+        for scenario_index, config in enumerate(scenarios):
+            for payment_method, currencies in config.items():
+                expanded = {}
+                for currency_key, percentages in currencies.items():
+                    for currency in currency_key.split('/'):
+                        currency = normalize_currency(currency)
+                        if currency:
+                            expanded[currency] = percentages
+                default = expanded.get(DEFAULT_CURRENCY)
+                for index, (group_method, group_currency, matched_currency) in enumerate(group_keys):
+                    if group_method != payment_method:
+                        continue
+                    if group_currency in expanded:
+                        # 方案中单独列出的币种（即使当前走"其他"分支）
+                        percentages = expanded[group_currency]
+                    elif matched_currency in expanded:
+                        # 当前走"其他"分支的币种随"其他"配置调整
+                        percentages = expanded[matched_currency]
+                    elif mode == "override":
+                        # 方案中未列出的币种走该支付方式的"其他"配置，没有"其他"配置时计入未分配
+                        percentages = default
+                        if percentages is None:
+                            overrides[scenario_index, index] = [0.0, 0.0, 0.0, 1.0]
+                            continue
+                    else:
+                        continue
+                    overrides[scenario_index, index] = _percentage_shares(percentages)
+        return overrides
+
+    def scenario_shares(self, traffic: "pd.DataFrame", adjustments: Iterable[Union[str, Dict]],
+                        mode: str = "update") -> "np.ndarray":
+        """
+        计算当前配置及各调整方案下每行交易的渠道份额
+
+        Args:
+            traffic: load_traffic返回的交易量数据
+            adjustments: 调整方案文本或parse_adjustment_text的结果
+            mode: "update" 或 "override"
+
+        Returns:
+            (1 + 方案数, 行数, 4)的份额数组，第0个为当前配置
+        """
+        if mode not in ("update", "override"):
+            raise ValueError("mode必须为update或override")
+        scenarios = [
+            self._comparator.parse_adjustment_text(adjustment) if isinstance(adjustment, str) else adjustment
+            for adjustment in adjustments
+        ]
+
+        current = self.current_shares(traffic)
+        if not scenarios:
+            return current[np.newaxis]
+
+        # 调整方案按(支付方式, 币种)生效，与SplitComparator的粒度一致
+        normalized = [normalize_query(record) for record in traffic[["payment_method", "currency"]].to_dict("records")]
+        group_codes, groups = _factorize(key[:2] for key in normalized)
+        # 按决策表解析每个币种实际命中的分支（没有单独配置的币种走"其他"）
+        results = self.table.lookup_many({"payment_method": method, "currency": currency} for method, currency in groups)
+        group_keys = [(method, currency, result.get("matched_currency") or currency)
+                      for (method, currency), result in zip(groups, results)]
+        overrides = self._scenario_overrides(group_keys, scenarios, mode)[:, group_codes]
+        adjusted = np.where(np.isnan(overrides), current[np.newaxis], overrides)
+        return np.concatenate([current[np.newaxis], adjusted])
+
+    def simulate(self, traffic: Any, adjustments: Optional[Iterable[Union[str, Dict]]] = None,
+                 scenario_names: Optional[Sequence[str]] = None, mode: str = "update",
+                 monte_carlo: int = 0, seed: Optional[int] = None) -> Dict[str, "pd.DataFrame"]:
+        """
+        模拟当前配置和各调整方案下各渠道的交易量
+
+        Args:
+            traffic: 交易量分布（见load_traffic）
+            adjustments: 调整方案列表（文本或parse_adjustment_text结果），为空时只计算当前配置
+            scenario_names: 方案名称，默认为"方案1"、"方案2"...
+            mode: "update"（只更新调整的币种）或 "override"（按方案完全覆盖）
+            monte_carlo: 蒙特卡洛模拟次数，0表示只计算期望值；模拟时交易量按笔数取整，每笔按份额随机路由
+            seed: 随机种子
+
+        Returns:
+            {"expected": 各方案期望交易量(行为方案，列为渠道), "share": 各方案渠道占比,
+             "std"/"p5"/"p95": 蒙特卡洛的标准差和分位数（仅monte_carlo > 0时）}
+        """
+        frame = self.load_traffic(traffic)
+        adjustments = list(adjustments or [])
+        names = ["当前配置"] + list(scenario_names or [f"方案{i + 1}" for i in range(len(adjustments))])
+        if len(names) != len(adjustments) + 1:
+            raise ValueError("scenario_names与调整方案数量不一致")
+
+        shares = self.scenario_shares(frame, adjustments, mode)
+        volume = frame["volume"].to_numpy()
+
+        # 期望交易量：volume(n) x shares(k, n, 4) -> (k, 4)
+        expected = np.einsum("n,knp->kp", volume, shares)
+        total = volume.sum()
+        result = {
+            "expected": pd.DataFrame(expected, index=names, columns=SHARE_COLUMNS),
+            "share": pd.DataFrame(expected / total if total else expected, index=names, columns=SHARE_COLUMNS)
+        }
+
+        if monte_carlo > 0:
+            samples = self._monte_carlo(np.rint(volume).astype(np.int64), shares, monte_carlo, seed)
+            result["std"] = pd.DataFrame(samples.std(axis=0), index=names, columns=SHARE_COLUMNS)
+            result["p5"] = pd.DataFrame(np.percentile(samples, 5, axis=0), index=names, columns=SHARE_COLUMNS)
+            result["p95"] = pd.DataFrame(np.percentile(samples, 95, axis=0), index=names, columns=SHARE_COLUMNS)
+        return result
+
+    @staticmethod
+    def _monte_carlo(counts: "np.ndarray", shares: "np.ndarray", trials: int, seed: Optional[int]) -> "np.ndarray":
+        """
+        蒙特卡洛模拟：每行交易按份额做多项分布抽样，所有方案、行同时抽样
+
+        Returns:
+            (trials, 方案数, 4)的各渠道交易量样本
+        """
+        rng = np.random.default_rng(seed)
+        # 浮点误差可能使份额合计略大于1，归一化后再抽样
+        pvals = shares / shares.sum(axis=-1, keepdims=True)
+        per_trial = max(1, pvals.size)
+        batch = max(1, MONTE_CARLO_BATCH_ELEMENTS // per_trial)
+
+        samples = []
+        remaining = trials
+        while remaining > 0:
+            size = min(batch, remaining)
+            draws = rng.multinomial(counts[np.newaxis, np.newaxis, :],
+                                    np.broadcast_to(pvals, (size,) + pvals.shape))
+            samples.append(draws.sum(axis=2))
+            remaining -= size
+        return np.concatenate(samples).astype(float)
+
+
+def simulate_shares(decision_table: Union[DecisionTable, List[Dict[str, Any]]], traffic: Any,
+                    adjustments: Optional[Iterable[Union[str, Dict]]] = None, **kwargs) -> Dict[str, "pd.DataFrame"]:
+    """ShareSimulator(decision_table).simulate(traffic, adjustments, **kwargs)的便捷函数"""
+    return ShareSimulator(decision_table).simulate(traffic, adjustments, **kwargs)
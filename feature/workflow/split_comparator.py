@@ -12,6 +12,11 @@ try:
 except ImportError:
     from feature.workflow.workflow_parser import WorkflowParser
 
+try:
+    from condition_tokens import find_common_currency
+except ImportError:
+    from feature.workflow.condition_tokens import find_common_currency
+
 
 class SplitComparator:
     """Split配置对比器"""
@@ -90,18 +95,20 @@ class SplitComparator:
         
         return result
     
-    def extract_current_splits(self, workflow_data: Dict) -> Dict[str, List[Dict]]:
+    def extract_current_splits(self, workflow_data: Dict, parsed: Optional[Dict] = None) -> Dict[str, List[Dict]]:
         """
         从workflow数据中提取当前的split配置
         
         Args:
             workflow_data: workflow JSON数据
+            parsed: 已有的解析结果（如解析缓存中的结果），提供时不再重新解析workflow_data
             
         Returns:
             {支付方式: [split配置列表]}
         """
         # 解析workflow
-        parsed = self.parser.parse_json(workflow_data)
+        if parsed is None:
+            parsed = self.parser.parse_json(workflow_data)
         
         # 按支付方式和币种组织split数据
         splits_by_method = {}
@@ -166,16 +173,8 @@ class SplitComparator:
         
         # 尝试从条件表达式中提取币种和支付方式
         if expression:
-            # 查找币种代码（3个大写字母，排除常见的非币种词）
-            currency_pattern = r'\b([A-Z]{3})\b'
-            currency_matches = re.findall(currency_pattern, expression)
-            # 常见的币种代码
-            common_currencies = ['USD', 'EUR', 'GBP', 'JPY', 'CNY', 'KRW', 'AUD', 'CAD', 'CHF', 
-                               'NZD', 'SGD', 'HKD', 'TWD', 'THB', 'AED', 'PHP', 'INR', 'BRL']
-            for match in currency_matches:
-                if match in common_currencies:
-                    currency = match
-                    break
+            # 查找常见的币种代码（3个大写字母，排除常见的非币种词）
+            currency = find_common_currency(expression)
             
             # 从表达式中提取支付方式
             if not payment_method:
@@ -201,13 +200,7 @@ class SplitComparator:
             
             # 从route名称中提取币种
             if not currency:
-                currency_matches = re.findall(r'\b([A-Z]{3})\b', route_name)
-                common_currencies = ['USD', 'EUR', 'GBP', 'JPY', 'CNY', 'KRW', 'AUD', 'CAD', 'CHF', 
-                                   'NZD', 'SGD', 'HKD', 'TWD', 'THB', 'AED', 'PHP', 'INR', 'BRL']
-                for match in currency_matches:
-                    if match in common_currencies:
-                        currency = match
-                        break
+                currency = find_common_currency(route_name)
         
         # 尝试从split的原始数据中提取
         split_data = split.get("data", {})
@@ -232,31 +225,19 @@ class SplitComparator:
                         
                         # 从path中提取币种
                         if not currency:
-                            currency_matches = re.findall(r'\b([A-Z]{3})\b', path)
-                            common_currencies = ['USD', 'EUR', 'GBP', 'JPY', 'CNY', 'KRW', 'AUD', 'CAD', 'CHF', 
-                                               'NZD', 'SGD', 'HKD', 'TWD', 'THB', 'AED', 'PHP', 'INR', 'BRL']
-                            for match in currency_matches:
-                                if match in common_currencies:
-                                    currency = match
-                                    break
+                            currency = find_common_currency(path)
                     
                     # 从operand值中提取币种
                     operand_value = operand.get("operand", {})
                     if isinstance(operand_value, dict):
                         value = operand_value.get("value", "")
-                        if isinstance(value, str):
-                            currency_matches = re.findall(r'\b([A-Z]{3})\b', value.upper())
-                            common_currencies = ['USD', 'EUR', 'GBP', 'JPY', 'CNY', 'KRW', 'AUD', 'CAD', 'CHF', 
-                                               'NZD', 'SGD', 'HKD', 'TWD', 'THB', 'AED', 'PHP', 'INR', 'BRL']
-                            if not currency:
-                                for match in currency_matches:
-                                    if match in common_currencies:
-                                        currency = match
-                                        break
+                        if isinstance(value, str) and not currency:
+                            currency = find_common_currency(value.upper())
         
         return payment_method, currency
     
-    def compare_configurations(self, workflow_data: Dict, adjustment_text: str, adjustment_mode: str = "update") -> Dict[str, Any]:
+    def compare_configurations(self, workflow_data: Dict, adjustment_text: str, adjustment_mode: str = "update",
+                               parsed: Optional[Dict] = None) -> Dict[str, Any]:
         """
         对比当前配置和调整方案，生成修改建议
         
@@ -264,6 +245,7 @@ class SplitComparator:
             workflow_data: workflow JSON数据
             adjustment_text: 调整方案文本
             adjustment_mode: 调整模式，"update"（更新调整）或 "override"（覆盖调整）
+            parsed: 已有的解析结果，提供时不再重新解析workflow_data
             
         Returns:
             对比结果和建议
@@ -272,7 +254,7 @@ class SplitComparator:
         new_config = self.parse_adjustment_text(adjustment_text)
         
         # 提取当前配置
-        current_splits = self.extract_current_splits(workflow_data)
+        current_splits = self.extract_current_splits(workflow_data, parsed)
         
         # 生成对比结果
         comparison_result = {
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享进程池
+批量解析（多个workflow并行）和大型workflow的split并行分析共用同一个进程池，在各请求之间复用；
+进程池中的子进程不再创建嵌套的进程池；
+子进程通过forkserver（不支持时spawn）启动，不从多线程的服务进程fork，
+避免继承其他线程持有的锁（解析缓存、workflow仓库、logging）导致子进程死锁
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# 进程池最大进程数
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+# 子进程启动方式
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 当前进程是否为进程池中的子进程
+_in_worker = False
+
+
+def _mark_worker():
+    """子进程初始化：标记为子进程，避免在子进程内再创建进程池"""
+    global _in_worker
+    _in_worker = True
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """获取（必要时创建）共享的进程池；在进程池的子进程中返回None"""
+    global _executor
+    if _in_worker:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, initializer=_mark_worker,
+                                            mp_context=multiprocessing.get_context(START_METHOD))
+        return _executor
+
+
+def reset_executor():
+    """进程池异常时丢弃，下次请求重新创建"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+@atexit.register
+def shutdown_executor():
+    """关闭共享的进程池"""
+    reset_executor()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow结构对比
+对同一workflow的两个导出（相同workflow_source.id，不同revision_id）计算每个block的内容哈希和
+可达子树的Merkle哈希，从入口block向下对比时子树哈希相同即整体跳过，只深入有变化的区域，
+输出新增/删除/修改的block、变化的条件分支和变化的split分量
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    from workflow_graph import block_content_hash
+except ImportError:
+    from feature.workflow.workflow_graph import block_content_hash
+
+
+def _export_list(workflow_data: Any) -> List[Dict]:
+    exports = workflow_data if isinstance(workflow_data, list) else [workflow_data]
+    return [export for export in exports if isinstance(export, dict)]
+
+
+def _block_successors(block: Dict) -> List[str]:
+    """block的后继id（conditional、default、split各分支、APPLICATION的outcome，按出现顺序）"""
+    successors = []
+    outcomes = block.get("outcomes")
+    if isinstance(outcomes, dict):
+        for outcome in outcomes.get("conditional") or []:
+            if isinstance(outcome, dict) and outcome.get("next"):
+                successors.append(outcome["next"])
+        default = outcomes.get("default")
+        if isinstance(default, dict) and default.get("next"):
+            successors.append(default["next"])
+    elif isinstance(outcomes, list):
+        for outcome in outcomes:
+            if isinstance(outcome, dict) and outcome.get("next"):
+                successors.append(outcome["next"])
+    outcome = block.get("outcome")
+    if isinstance(outcome, dict) and outcome.get("next"):
+        successors.append(outcome["next"])
+    return successors
+
+
+def block_display_name(block: Dict) -> str:
+    """用于展示的block名称"""
+    if block.get("type") == "ROUTE_SPLITTER":
+        return block.get("route_splitter_name") or "Split"
+    return block.get("name") or (block.get("action") or {}).get("name") or block.get("type", "unknown")
+
+
+class WorkflowHashes:
+    """单个workflow导出的Merkle哈希：block内容哈希、可达子树哈希和入口block"""
+
+    __slots__ = ("source", "blocks", "order", "content", "subtree", "successors", "roots", "unreachable")
+
+    def __init__(self, workflow_data: Any, previous: Optional["WorkflowHashes"] = None):
+        """
+        Args:
+            workflow_data: workflow JSON数据
+            previous: 同一workflow另一个revision的哈希，与其相同的block（按id整体比较）直接沿用内容哈希
+        """
+        self.source = {}  # workflow id/version/revision_id/name
+        self.blocks = {}  # block id -> block
+        self.order = {}  # block id -> 在导出中的位置
+        self.successors = {}  # block id -> [后继block id]
+        for export in _export_list(workflow_data):
+            workflow_source = export.get("workflow_source") or {}
+            if not self.source:
+                self.source = {
+                    "id": workflow_source.get("id") or export.get("id"),
+                    "version": workflow_source.get("version", export.get("version")),
+                    "revision_id": workflow_source.get("revision_id"),
+                    "name": workflow_source.get("name")
+                }
+            for block in (workflow_source.get("workflow") or {}).get("blocks") or []:
+                block_id = block.get("id")
+                if block_id and block_id not in self.blocks:
+                    self.blocks[block_id] = block
+                    self.order[block_id] = len(self.order)
+                    self.successors[block_id] = _block_successors(block)
+
+        self.content = {}
+        previous_blocks = previous.blocks if previous is not None else {}
+        for block_id, block in self.blocks.items():
+            previous_block = previous_blocks.get(block_id)
+            if previous_block is not None and previous_block == block:
+                self.content[block_id] = previous.content[block_id]
+            else:
+                self.content[block_id] = block_content_hash(block)
+
+        # 入口block：TRIGGER和没有入边的block
+        has_incoming = {next_id for successors in self.successors.values() for next_id in successors}
+        self.roots = [block_id for block_id, block in self.blocks.items()
+                      if block.get("type") == "TRIGGER" or block_id not in has_incoming]
+        self.unreachable = []  # 从入口不可达的block（如只在环中），由_subtree_hashes填充
+        self.subtree = self._subtree_hashes()
+
+    def _subtree_hashes(self) -> Dict[str, str]:
+        """
+        后序遍历计算子树哈希：block内容哈希 + 各后继的子树哈希（按分支顺序）
+        环路中指回祖先的连接只计入目标id；指向不存在的block时计入缺失标记；
+        先从入口block遍历，之后仍未计算的block即为从入口不可达的block
+        """
+        subtree = {}
+        on_stack = set()
+
+        def visit(start: str):
+            if start in subtree:
+                return
+            stack = [(start, False)]
+            while stack:
+                block_id, expanded = stack.pop()
+                if expanded:
+                    on_stack.discard(block_id)
+                    digest = hashlib.blake2b(self.content[block_id].encode("ascii"), digest_size=16)
+                    for next_id in self.successors[block_id]:
+                        if next_id in subtree:
+                            digest.update(subtree[next_id].encode("ascii"))
+                        elif next_id in self.blocks:
+                            digest.update(f"cycle:{next_id}".encode("utf-8"))
+                        else:
+                            digest.update(f"missing:{next_id}".encode("utf-8"))
+                    subtree[block_id] = digest.hexdigest()
+                    continue
+                if block_id in subtree or block_id in on_stack:
+                    continue
+                on_stack.add(block_id)
+                stack.append((block_id, True))
+                for next_id in reversed(self.successors[block_id]):
+                    if next_id in self.blocks and next_id not in subtree and next_id not in on_stack:
+                        stack.append((next_id, False))
+
+        for start in self.roots:
+            visit(start)
+        self.unreachable = [block_id for block_id in self.blocks if block_id not in subtree]
+        for start in self.unreachable:
+            visit(start)
+        return subtree
+
+
+def _outcome_key(outcome: Dict, index: int) -> str:
+    return outcome.get("id") or outcome.get("name") or f"#{index}"
+
+
+def _outcome_view(outcome: Dict) -> Dict[str, Any]:
+    return {"name": outcome.get("name"), "condition": outcome.get("condition"), "next": outcome.get("next")}
+
+
+def _condition_changes(block_id: str, old_block: Dict, new_block: Dict) -> List[Dict[str, Any]]:
+    """对比条件block的conditional/default分支（按outcome id匹配）"""
+    old_outcomes = old_block.get("outcomes") if isinstance(old_block.get("outcomes"), dict) else {}
+    new_outcomes = new_block.get("outcomes") if isinstance(new_block.get("outcomes"), dict) else {}
+    old_conditional = {_outcome_key(o, i): o for i, o in enumerate(old_outcomes.get("conditional") or [])}
+    new_conditional = {_outcome_key(o, i): o for i, o in enumerate(new_outcomes.get("conditional") or [])}
+
+    changes = []
+    block_name = block_display_name(new_block)
+    for key, new_outcome in new_conditional.items():
+        old_outcome = old_conditional.get(key)
+        if old_outcome is None:
+            changes.append({"block_id": block_id, "block_name": block_name, "outcome_id": key,
+                            "action": "added", "old": None, "new": _outcome_view(new_outcome)})
+        elif _outcome_view(old_outcome) != _outcome_view(new_outcome):
+            old_view, new_view = _outcome_view(old_outcome), _outcome_view(new_outcome)
+            changes.append({"block_id": block_id, "block_name": block_name, "outcome_id": key,
+                            "action": "modified", "fields": [f for f in new_view if old_view[f] != new_view[f]],
+                            "old": old_view, "new": new_view})
+    for key, old_outcome in old_conditional.items():
+        if key not in new_conditional:
+            changes.append({"block_id": block_id, "block_name": block_name, "outcome_id": key,
+                            "action": "removed", "old": _outcome_view(old_outcome), "new": None})
+
+    old_default = (old_outcomes.get("default") or {}).get("next")
+    new_default = (new_outcomes.get("default") or {}).get("next")
+    if old_default != new_default:
+        changes.append({"block_id": block_id, "block_name": block_name, "outcome_id": "default",
+                        "action": "modified", "fields": ["next"],
+                        "old": {"next": old_default}, "new": {"next": new_default}})
+    return changes
+
+
+def _route_view(outcome: Dict) -> Dict[str, Any]:
+    evaluation = outcome.get("split_evaluation") or {}
+    return {"name": outcome.get("name"), "percentage": evaluation.get("value", 0), "next": outcome.get("next")}
+
+
+def _split_change(block_id: str, old_block: Dict, new_block: Dict,
+                  split_context: Optional[Dict[str, Dict]]) -> Optional[Dict[str, Any]]:
+    """对比split block的分量（按outcome id匹配）"""
+    old_routes = {_outcome_key(o, i): _route_view(o) for i, o in enumerate(old_block.get("outcomes") or [])}
+    new_routes = {_outcome_key(o, i): _route_view(o) for i, o in enumerate(new_block.get("outcomes") or [])}
+
+    routes = []
+    for key in list(new_routes) + [key for key in old_routes if key not in new_routes]:
+        old_route, new_route = old_routes.get(key), new_routes.get(key)
+        if old_route == new_route:
+            continue
+        routes.append({
+            "route_id": key,
+            "name": (new_route or old_route)["name"],
+            "action": "added" if old_route is None else "removed" if new_route is None else "modified",
+            "old_percentage": old_route["percentage"] if old_route else None,
+            "new_percentage": new_route["percentage"] if new_route else None,
+            "old_next": old_route["next"] if old_route else None,
+            "new_next": new_route["next"] if new_route else None
+        })
+    if not routes and old_block.get("route_splitter_name") == new_block.get("route_splitter_name"):
+        return None
+
+    change = {
+        "block_id": block_id,
+        "name": block_display_name(new_block),
+        "old_name": block_display_name(old_block),
+        "routes": routes
+    }
+    if split_context and block_id in split_context:
+        change.update(split_context[block_id])
+    return change
+
+
+def split_context_from_parsed(parsed: Optional[Dict[str, Any]]) -> Dict[str, Dict]:
+    """从解析结果中取出每个split block的支付方式和币种（用于说明变化的split所在分支）"""
+    context = {}
+    for split in (parsed or {}).get("splits", []):
+        if not split.get("routes"):
+            continue
+        entry = context.setdefault(split.get("id"), {"payment_method": split.get("payment_method"), "currencies": []})
+        if split.get("currency") not in entry["currencies"]:
+            entry["currencies"].append(split.get("currency"))
+    return context
+
+
+def diff_workflows(old: WorkflowHashes, new: WorkflowHashes,
+                   split_context: Optional[Dict[str, Dict]] = None) -> Dict[str, Any]:
+    """
+    对比两个workflow导出
+
+    从两侧共有的入口block向下遍历，子树哈希相同的block整体跳过（其下游均未变化），
+    只在哈希不同的区域内逐个对比block内容
+
+    Args:
+        old: 旧导出的哈希
+        new: 新导出的哈希
+        split_context: split block id -> {payment_method, currencies}，用于补充split变化的业务信息
+
+    Returns:
+        {"workflow", "summary", "added_blocks", "removed_blocks", "modified_blocks",
+         "condition_changes", "split_changes"}
+    """
+    added = [block_id for block_id in new.blocks if block_id not in old.blocks]
+    removed = [block_id for block_id in old.blocks if block_id not in new.blocks]
+
+    modified = []
+    condition_changes = []
+    split_changes = []
+    unchanged_subtrees = 0
+    compared = 0
+
+    def compare(block_id: str):
+        if old.content[block_id] == new.content[block_id]:
+            return
+        old_block, new_block = old.blocks[block_id], new.blocks[block_id]
+        modified.append(block_id)
+        if isinstance(new_block.get("outcomes"), dict) or isinstance(old_block.get("outcomes"), dict):
+            condition_changes.extend(_condition_changes(block_id, old_block, new_block))
+        if new_block.get("type") == "ROUTE_SPLITTER" or old_block.get("type") == "ROUTE_SPLITTER":
+            change = _split_change(block_id, old_block, new_block, split_context)
+            if change:
+                split_changes.append(change)
+
+    # 沿新revision的连接遍历；新增的block没有可对比的旧内容，但继续向下遍历（其下游可能是修改过的共有block）
+    roots = list(new.roots)
+    roots += [block_id for block_id in old.roots if block_id in new.blocks and block_id not in set(roots)]
+    stack = list(reversed(roots))
+    visited = set()
+    while stack:
+        block_id = stack.pop()
+        if block_id in visited:
+            continue
+        visited.add(block_id)
+
+        if block_id in old.blocks:
+            compared += 1
+            if old.subtree[block_id] == new.subtree[block_id]:
+                unchanged_subtrees += 1
+                continue
+            compare(block_id)
+
+        for next_id in reversed(new.successors[block_id]):
+            if next_id in new.blocks and next_id not in visited:
+                stack.append(next_id)
+
+    # 新revision中从入口不可达的共有block（如只在环中或只被删除的block引用）按内容哈希补充对比；
+    # 只检查不可达的block，跳过的相同子树中的block不再逐个对比
+    for block_id in new.unreachable:
+        if block_id not in visited and block_id in old.blocks:
+            compare(block_id)
+
+    modified.sort(key=new.order.get)
+
+    def describe(hashes: WorkflowHashes, block_id: str) -> Dict[str, Any]:
+        block = hashes.blocks[block_id]
+        return {"id": block_id, "type": block.get("type"), "name": block_display_name(block)}
+
+    modified_blocks = []
+    for block_id in modified:
+        old_block, new_block = old.blocks[block_id], new.blocks[block_id]
+        entry = describe(new, block_id)
+        entry["fields"] = sorted(key for key in set(old_block) | set(new_block) if old_block.get(key) != new_block.get(key))
+        modified_blocks.append(entry)
+
+    return {
+        "workflow": {"old": old.source, "new": new.source},
+        "summary": {
+            "added": len(added),
+            "removed": len(removed),
+            "modified": len(modified_blocks),
+            "condition_changes": len(condition_changes),
+            "split_changes": len(split_changes),
+            "compared_blocks": compared,
+            "unchanged_subtrees": unchanged_subtrees
+        },
+        "added_blocks": [describe(new, block_id) for block_id in added],
+        "removed_blocks": [describe(old, block_id) for block_id in removed],
+        "modified_blocks": modified_blocks,
+        "condition_changes": condition_changes,
+        "split_changes": split_changes
+    }
+
+
+class WorkflowHashCache:
+    """按上传内容的缓存键复用已计算的Merkle哈希"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # 缓存键 -> WorkflowHashes
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: str, load_data, previous: Optional[WorkflowHashes] = None) -> WorkflowHashes:
+        """
+        Args:
+            key: 缓存键（如解析缓存的内容哈希）
+            load_data: 未命中时调用，返回workflow JSON数据
+            previous: 另一个revision的哈希（未变化的block沿用其内容哈希）
+        """
+        with self._lock:
+            hashes = self._entries.get(key)
+            if hashes is not None:
+                self._entries.move_to_end(key)
+                return hashes
+        hashes = WorkflowHashes(load_data(), previous)
+        with self._lock:
+            self._entries[key] = hashes
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return hashes
+
+
+# 进程内共享的Merkle哈希缓存
+workflow_hashes = WorkflowHashCache()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow图的紧凑内部表示
+使用__slots__对象表示block、连接、条件和父级条件链，id和名称字符串驻留（intern），
+条件链以不可变元组在各split之间共享；只在对外输出时转换为dict
+"""
+
+import hashlib
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def intern_str(value: Any) -> Any:
+    """驻留字符串，非字符串原样返回"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def block_content_hash(block: Dict) -> str:
+    """block内容哈希（键排序后的JSON，与字段顺序无关）"""
+    content = json.dumps(block, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class GraphRecord:
+    """slots记录基类，支持按dict键只读访问，便于与原有dict结构互换使用"""
+
+    __slots__ = ()
+    # (输出键, 属性名)
+    _keys: Tuple[Tuple[str, str], ...] = ()
+
+    def _attr(self, key: str) -> Optional[str]:
+        for output_key, attr in self._keys:
+            if output_key == key:
+                return attr
+        return None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        attr = self._attr(key)
+        if attr is None:
+            return default
+        value = getattr(self, attr)
+        return default if value is None and not self._has_key(key) else value
+
+    def __getitem__(self, key: str) -> Any:
+        attr = self._attr(key)
+        if attr is None or not self._has_key(key):
+            raise KeyError(key)
+        return getattr(self, attr)
+
+    def __contains__(self, key: str) -> bool:
+        return self._attr(key) is not None and self._has_key(key)
+
+    def _has_key(self, key: str) -> bool:
+        return True
+
+    def to_dict(self, memo: Optional[Dict[int, Any]] = None) -> Dict[str, Any]:
+        """转换为对外输出的dict，memo用于让共享对象输出为同一个dict"""
+        if memo is not None and id(self) in memo:
+            return memo[id(self)]
+        result = {}
+        if memo is not None:
+            memo[id(self)] = result
+        for output_key, attr in self._keys:
+            if self._has_key(output_key):
+                result[output_key] = export_value(getattr(self, attr), memo)
+        return result
+
+
+def export_value(value: Any, memo: Optional[Dict[int, Any]] = None) -> Any:
+    """将内部表示中的值转换为dict/list结构"""
+    if isinstance(value, GraphRecord):
+        return value.to_dict(memo)
+    if isinstance(value, tuple):
+        return [export_value(item, memo) for item in value]
+    return value
+
+
+class Operand(GraphRecord):
+    """条件操作数"""
+
+    __slots__ = ("type", "operator", "expression", "operand")
+    _keys = (("type", "type"), ("operator", "operator"), ("expression", "expression"), ("operand", "operand"))
+
+    def __init__(self, type_: str, operator: str, expression: Any, operand: Any):
+        self.type = intern_str(type_)
+        self.operator = intern_str(operator)
+        self.expression = expression
+        self.operand = operand
+
+
+class Condition(GraphRecord):
+    """conditional outcome上的条件"""
+
+    __slots__ = ("operator", "operands")
+    _keys = (("operator", "operator"), ("operands", "operands"))
+
+    def __init__(self, operator: str, operands: Tuple[Operand, ...]):
+        self.operator = intern_str(operator)
+        self.operands = operands
+
+
+class Block(GraphRecord):
+    """workflow节点"""
+
+    __slots__ = ("id", "name", "type", "block_type", "description", "data")
+    _keys = (("id", "id"), ("name", "name"), ("type", "type"), ("block_type", "block_type"),
+             ("description", "description"), ("data", "data"))
+
+    def __init__(self, id_: str, name: str, type_: str, block_type: str, description: str, data: Dict):
+        self.id = intern_str(id_)
+        self.name = intern_str(name)
+        self.type = intern_str(type_)
+        self.block_type = intern_str(block_type)
+        self.description = description
+        self.data = data  # 原始block（不复制）
+
+
+class Edge(GraphRecord):
+    """block之间的连接（conditional或default outcome）"""
+
+    __slots__ = ("source", "target", "label", "type", "condition", "source_block", "outcome")
+    _keys = (("from", "source"), ("to", "target"), ("label", "label"), ("type", "type"), ("condition", "condition"))
+
+    def __init__(self, source: str, target: str, label: str, type_: str, condition: Optional[Condition],
+                 source_block: Dict, outcome: Dict):
+        self.source = intern_str(source)
+        self.target = intern_str(target)
+        self.label = intern_str(label)
+        self.type = intern_str(type_)
+        self.condition = condition
+        self.source_block = source_block  # 来源block原始数据（不输出）
+        self.outcome = outcome  # 原始outcome（不输出）
+
+    @property
+    def is_default(self) -> bool:
+        return self.type == "default"
+
+    def _has_key(self, key: str) -> bool:
+        # default连接不输出condition字段
+        return key != "condition" or self.type == "conditional"
+
+
+class ParentLink(GraphRecord):
+    """条件链中的一个父级条件，多个split共享同一条链"""
+
+    __slots__ = ("name", "condition", "block_id", "block_type", "is_default", "parent_block")
+    _keys = (("name", "name"), ("condition", "condition"), ("block_id", "block_id"),
+             ("block_type", "block_type"), ("is_default", "is_default"), ("parent_block", "parent_block"))
+
+    def __init__(self, name: str, condition: Optional[Dict], block_id: str, block_type: str,
+                 is_default: bool, parent_block: Optional[Dict] = None):
+        self.name = intern_str(name)
+        self.condition = condition
+        self.block_id = intern_str(block_id)
+        self.block_type = intern_str(block_type)
+        self.is_default = is_default
+        self.parent_block = parent_block
+
+    def _has_key(self, key: str) -> bool:
+        # 只有default分支的父级条件记录parent_block
+        return key != "parent_block" or self.parent_block is not None
+
+
+def export_records(records: List[Any], memo: Optional[Dict[int, Any]] = None) -> List[Any]:
+    """将记录列表转换为dict列表"""
+    if memo is None:
+        memo = {}
+    return [export_value(record, memo) for record in records]
+
+
+class BlockFacts:
+    """单次遍历中为每个block收集的条件信息，供后续各阶段直接使用"""
+
+    __slots__ = ("has_network_tokenised", "has_not_network_tokenised", "default_network_name",
+                 "has_amex_not_equal", "amex_chain_link", "edge_payment_methods")
+
+    def __init__(self):
+        self.has_network_tokenised = False  # conditional中有Network Tokenised条件
+        self.has_not_network_tokenised = False  # conditional中有NOT Network Tokenised条件
+        self.default_network_name = None  # 第一个Network/Amex条件为"!="时，default分支对应"Network=Amex"
+        self.has_amex_not_equal = False  # 任一Network/Amex条件包含"!="
+        self.amex_chain_link = None  # default分支所在条件链开头需要插入的"Network=Amex"父级条件
+        self.edge_payment_methods = ()  # 每个conditional outcome条件中的支付方式（与conditional顺序一致）
+
+
+class TraversalResult:
+    """workflow单次遍历的结果"""
+
+    __slots__ = ("block_facts", "split_payment_methods", "currency_outcomes", "network_tokenized_branches")
+
+    def __init__(self, block_facts: Dict[str, BlockFacts], split_payment_methods: Dict[str, str],
+                 currency_outcomes: List[Tuple[str, Dict, Optional[List[str]]]],
+                 network_tokenized_branches: Dict[str, Tuple[str, ...]]):
+        self.block_facts = block_facts  # block id -> BlockFacts
+        self.split_payment_methods = split_payment_methods  # split id -> 从TRIGGER追踪到的支付方式
+        self.currency_outcomes = currency_outcomes  # [(block id, outcome, 币种列表；default为None)]
+        self.network_tokenized_branches = network_tokenized_branches  # block id -> 上游Network Tokenized分支值
+
+
+class AnalysisState:
+    """增量解析状态：block内容哈希、祖先签名及按签名可复用的split分析结果"""
+
+    __slots__ = ("blocks", "signatures", "split_infos", "currency_combos", "stats")
+
+    def __init__(self):
+        self.blocks = {}  # block id -> (原始block, 内容哈希)
+        self.signatures = {}  # block id -> 祖先签名（block及其全部上游内容的哈希）
+        self.split_infos = {}  # split id -> (祖先签名, (按币种拆分前的split信息或None, (network, network_tokenized)))
+        self.currency_combos = {}  # 币种条件block id -> (祖先签名, 该block产生的币种组合)
+        self.stats = {"changed_blocks": 0, "reused_splits": 0, "recomputed_splits": 0,
+                      "reused_currency_blocks": 0, "recomputed_currency_blocks": 0}
+
+
+class KeyIndex:
+    """按键去重的哈希索引，记录每个键首次出现的对象，成员检查为O(1)"""
+
+    __slots__ = ("_items",)
+
+    def __init__(self):
+        self._items = {}
+
+    def add(self, key: Tuple, item: Any = None) -> bool:
+        """登记键，返回该键是否首次出现（已存在时保留先登记的对象）"""
+        if key in self._items:
+            return False
+        self._items[key] = item
+        return True
+
+    def get(self, key: Tuple, default: Any = None) -> Any:
+        return self._items.get(key, default)
+
+    def __contains__(self, key: Tuple) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
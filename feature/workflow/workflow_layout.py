@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow服务端布局
+基于WorkflowParser输出的nodes和connections计算分层（Sugiyama）布局坐标，前端只负责绘制：
+1. 反转DFS回边去环  2. 最长路径分层  3. 跨层连接插入虚拟节点
+4. 重心法多轮上下扫描减少交叉  5. 按相邻层位置对齐并保证节点间距
+各步骤均为线性或按层排序，几千个block的workflow可在毫秒到百毫秒级完成；
+布局按图结构（节点id和连接）的哈希缓存，只改动block内容（如分量）的revision直接复用坐标
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+# 节点尺寸和间距（像素）
+NODE_WIDTH = 180
+NODE_HEIGHT = 60
+DUMMY_WIDTH = 20
+HORIZONTAL_GAP = 40
+VERTICAL_GAP = 80
+
+# 重心法上下扫描轮数
+ORDERING_SWEEPS = 4
+
+# 坐标对齐轮数（向下、向上交替）
+POSITIONING_PASSES = 3
+
+
+def layout_key(nodes: List[Dict], connections: List[Dict]) -> str:
+    """布局缓存键：只取节点id和连接端点，block内容变化不影响布局"""
+    digest = hashlib.blake2b(digest_size=16)
+    for node in nodes:
+        digest.update(str(node.get("id")).encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(b"\1")
+    for connection in connections:
+        digest.update(f"{connection.get('from')}\0{connection.get('to')}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _remove_cycles(count: int, successors: List[List[int]]) -> set:
+    """迭代DFS找出回边（指向当前DFS栈上节点的边），返回需要反转的(u, v)"""
+    state = [0] * count  # 0未访问 1在栈上 2已完成
+    back_edges = set()
+    for root in range(count):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if state[child] == 1:
+                    back_edges.add((node, child))
+                elif state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(successors[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return back_edges
+
+
+def _assign_layers(count: int, edges: List[Tuple[int, int]]) -> List[int]:
+    """最长路径分层（Kahn拓扑序），入口节点在第0层"""
+    successors = [[] for _ in range(count)]
+    indegree = [0] * count
+    for u, v in edges:
+        successors[u].append(v)
+        indegree[v] += 1
+    layer = [0] * count
+    queue = [node for node in range(count) if indegree[node] == 0]
+    for node in queue:
+        for child in successors[node]:
+            if layer[node] + 1 > layer[child]:
+                layer[child] = layer[node] + 1
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    return layer
+
+
+def _order_layers(layers: List[List[int]], upper: List[List[int]], lower: List[List[int]]):
+    """重心法：按相邻层邻居位置的平均值对每层排序，上下交替扫描"""
+    position = [0] * len(upper)
+    for layer in layers:
+        for index, node in enumerate(layer):
+            position[node] = index
+
+    def sweep(layer_indexes, neighbors):
+        for layer_index in layer_indexes:
+            layer = layers[layer_index]
+
+            def barycenter(node):
+                adjacent = neighbors[node]
+                if not adjacent:
+                    return position[node]
+                return sum(position[other] for other in adjacent) / len(adjacent)
+
+            layer.sort(key=barycenter)
+            for index, node in enumerate(layer):
+                position[node] = index
+
+    for _ in range(ORDERING_SWEEPS):
+        sweep(range(1, len(layers)), upper)
+        sweep(range(len(layers) - 2, -1, -1), lower)
+
+
+def _place_layer(layer: List[int], desired: List[float], widths: List[float]) -> List[float]:
+    """
+    在保持层内顺序和最小间距的前提下让节点尽量靠近期望位置：
+    分别从左向右、从右向左推开重叠节点，取两次结果的平均值（两者都满足间距，平均值也满足）
+    """
+    size = len(layer)
+    left = [0.0] * size
+    right = [0.0] * size
+    for index in range(size):
+        left[index] = desired[index]
+        if index:
+            gap = (widths[layer[index - 1]] + widths[layer[index]]) / 2 + HORIZONTAL_GAP
+            left[index] = max(left[index], left[index - 1] + gap)
+    for index in range(size - 1, -1, -1):
+        right[index] = desired[index]
+        if index < size - 1:
+            gap = (widths[layer[index]] + widths[layer[index + 1]]) / 2 + HORIZONTAL_GAP
+            right[index] = min(right[index], right[index + 1] - gap)
+    return [(a + b) / 2 for a, b in zip(left, right)]
+
+
+def _assign_x(layers: List[List[int]], upper: List[List[int]], lower: List[List[int]],
+              widths: List[float]) -> List[float]:
+    """按相邻层邻居的平均x坐标对齐，上下交替"""
+    x = [0.0] * len(widths)
+    for layer in layers:
+        offset = 0.0
+        for node in layer:
+            x[node] = offset + widths[node] / 2
+            offset += widths[node] + HORIZONTAL_GAP
+
+    for pass_index in range(POSITIONING_PASSES):
+        if pass_index % 2 == 0:
+            layer_indexes, neighbors = range(1, len(layers)), upper
+        else:
+            layer_indexes, neighbors = range(len(layers) - 2, -1, -1), lower
+        for layer_index in layer_indexes:
+            layer = layers[layer_index]
+            desired = [
+                sum(x[other] for other in neighbors[node]) / len(neighbors[node]) if neighbors[node] else x[node]
+                for node in layer
+            ]
+            for node, value in zip(layer, _place_layer(layer, desired, widths)):
+                x[node] = value
+    return x
+
+
+def compute_layout(nodes: List[Dict], connections: List[Dict]) -> Dict[str, Any]:
+    """
+    计算分层布局
+
+    Args:
+        nodes: WorkflowParser输出的节点列表（使用id）
+        connections: WorkflowParser输出的连接列表（使用from/to）
+
+    Returns:
+        {"nodes": [{id, x, y, layer, order, width, height}],
+         "edges": [{from, to, points: [[x, y], ...], reversed}],
+         "width", "height", "layers"}
+        坐标为节点中心点，从上到下分层；edges与connections一一对应，
+        reversed表示该连接在环中被反转参与分层
+    """
+    ids = []
+    index_of = {}
+    for node in nodes:
+        node_id = node.get("id")
+        if node_id not in index_of:
+            index_of[node_id] = len(ids)
+            ids.append(node_id)
+    count = len(ids)
+
+    # 去重后的连接（自环不参与布局）
+    edge_pairs = []
+    seen_pairs = set()
+    successors = [[] for _ in range(count)]
+    for connection in connections:
+        u, v = index_of.get(connection.get("from")), index_of.get(connection.get("to"))
+        if u is None or v is None or u == v or (u, v) in seen_pairs:
+            continue
+        seen_pairs.add((u, v))
+        edge_pairs.append((u, v))
+        successors[u].append(v)
+
+    back_edges = _remove_cycles(count, successors)
+    dag_edges = []
+    dag_seen = set()
+    for u, v in edge_pairs:
+        pair = (v, u) if (u, v) in back_edges else (u, v)
+        if pair not in dag_seen:
+            dag_seen.add(pair)
+            dag_edges.append(pair)
+    layer_of = _assign_layers(count, dag_edges)
+
+    # 跨多层的连接拆成经过虚拟节点的链
+    widths = [NODE_WIDTH] * count
+    upper = [[] for _ in range(count)]
+    lower = [[] for _ in range(count)]
+    chains = {}  # (u, v) -> 从上到下经过的节点序号
+    for u, v in dag_edges:
+        chain = [u]
+        for layer in range(layer_of[u] + 1, layer_of[v]):
+            dummy = len(widths)
+            widths.append(DUMMY_WIDTH)
+            layer_of.append(layer)
+            upper.append([])
+            lower.append([])
+            chain.append(dummy)
+        chain.append(v)
+        for a, b in zip(chain, chain[1:]):
+            lower[a].append(b)
+            upper[b].append(a)
+        chains[(u, v)] = chain
+
+    layers = [[] for _ in range(max(layer_of) + 1 if layer_of else 0)]
+    for node, layer in enumerate(layer_of):
+        layers[layer].append(node)
+
+    _order_layers(layers, upper, lower)
+    x = _assign_x(layers, upper, lower, widths)
+
+    min_x = min((x[node] - widths[node] / 2 for node in range(len(widths))), default=0.0)
+    layer_height = NODE_HEIGHT + VERTICAL_GAP
+
+    def point(node):
+        return [round(x[node] - min_x, 1), layer_of[node] * layer_height + NODE_HEIGHT / 2]
+
+    order_of = {}
+    for layer in layers:
+        for index, node in enumerate(layer):
+            order_of[node] = index
+
+    node_positions = []
+    for node, node_id in enumerate(ids):
+        center = point(node)
+        node_positions.append({
+            "id": node_id,
+            "x": center[0],
+            "y": center[1],
+            "layer": layer_of[node],
+            "order": order_of[node],
+            "width": NODE_WIDTH,
+            "height": NODE_HEIGHT
+        })
+
+    edges = []
+    for connection in connections:
+        u, v = index_of.get(connection.get("from")), index_of.get(connection.get("to"))
+        entry = {"from": connection.get("from"), "to": connection.get("to"), "points": [], "reversed": False}
+        if u is not None and v is not None and u != v:
+            if (u, v) in chains:
+                entry["points"] = [point(node) for node in chains[(u, v)]]
+            else:
+                # 在环中被反转的连接，沿反转后的链反向绘制
+                entry["points"] = [point(node) for node in reversed(chains[(v, u)])]
+                entry["reversed"] = True
+        edges.append(entry)
+
+    width = max((x[node] - min_x + widths[node] / 2 for node in range(len(widths))), default=0.0)
+    return {
+        "nodes": node_positions,
+        "edges": edges,
+        "width": round(width, 1),
+        "height": len(layers) * layer_height - VERTICAL_GAP if layers else 0,
+        "layers": len(layers)
+    }
+
+
+class LayoutCache:
+    """按图结构哈希复用已计算的布局（结构不变的revision直接命中）"""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._layouts = OrderedDict()  # 布局缓存键 -> 布局
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, nodes: List[Dict], connections: List[Dict]) -> Dict[str, Any]:
+        key = layout_key(nodes, connections)
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                self.hits += 1
+                return layout
+            self.misses += 1
+        layout = compute_layout(nodes, connections)
+        with self._lock:
+            self._layouts[key] = layout
+            while len(self._layouts) > self.max_entries:
+                self._layouts.popitem(last=False)
+        return layout
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._layouts), "hits": self.hits, "misses": self.misses}
+
+
+# 进程内共享的布局缓存
+workflow_layouts = LayoutCache()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow JSON文件的内存映射与block偏移索引
+对workflow json目录下的导出文件做mmap，只扫描一遍JSON结构（按括号跳过字符串，不构建对象），
+记录 workflow_source.workflow.blocks 中每个block的字节区间和block id；
+读取单个block时只解码对应区间，解码结果保留在小容量LRU中
+"""
+
+import json
+import mmap
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    from workflow_stream import load_workflow_skeleton, project_block
+except ImportError:
+    from feature.workflow.workflow_stream import load_workflow_skeleton, project_block
+
+# 每个文件保留的已解码block数
+DEFAULT_BLOCK_CACHE_SIZE = 64
+
+# 同时保持映射的文件数
+DEFAULT_MAX_FILES = 16
+
+# 下一个括号之前的内容（整体跳过字符串，字符串中的括号不计入结构）
+_SEGMENT = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')
+_BRACKET, _BRACE = ord('['), ord('{')
+_OPEN = (_BRACKET, _BRACE)
+# 括号前紧邻的对象键
+_KEY_BEFORE = re.compile(rb'"((?:[^"\\]|\\.)*)"\s*:\s*$')
+# block顶层的id字段
+_BLOCK_ID = re.compile(rb'"id"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def _decode_string(raw: bytes) -> str:
+    return json.loads(b'"' + raw + b'"')
+
+
+def scan_block_offsets(buffer) -> Tuple[List[Tuple[int, int]], Dict[str, int], List[Tuple[int, int, int, int]]]:
+    """
+    扫描workflow导出的JSON结构，记录每个block的字节区间
+
+    Args:
+        buffer: 文件内容（bytes或mmap）
+
+    Returns:
+        (block字节区间列表[(起始, 结束)], block id -> 序号,
+         各导出的blocks数组[(起始, 结束, 第一个block的序号, block数)])
+
+    Raises:
+        json.JSONDecodeError: 括号不匹配
+    """
+    spans = []
+    ids = {}
+    arrays = []
+    stack = []  # [(括号, 键)]
+    blocks_level = None  # blocks数组在stack中的层级
+    array_start = 0
+    array_first = 0
+    inner = 0  # 当前block内的嵌套层数，0表示不在block内
+    block_start = 0
+    block_id = None
+
+    for match in _SEGMENT.finditer(buffer):
+        position = match.end() - 1
+        char = buffer[position]
+        if inner:
+            if inner == 1 and block_id is None:
+                id_match = _BLOCK_ID.search(buffer, match.start(), position)
+                if id_match:
+                    block_id = _decode_string(id_match.group(1))
+            if char in _OPEN:
+                inner += 1
+                continue
+            inner -= 1
+            if inner == 0:
+                if block_id is not None and block_id not in ids:
+                    ids[block_id] = len(spans)
+                spans.append((block_start, position + 1))
+            continue
+
+        if char in _OPEN:
+            if blocks_level is not None and len(stack) == blocks_level + 1 and char == _BRACE:
+                inner, block_start, block_id = 1, position, None
+                continue
+            key = None
+            if stack and stack[-1][0] == _BRACE:
+                key_match = _KEY_BEFORE.search(buffer, match.start(), position)
+                key = key_match.group(1) if key_match else None
+            if (char == _BRACKET and key == b'blocks' and blocks_level is None and len(stack) >= 2
+                    and stack[-1][1] == b'workflow' and stack[-2][1] == b'workflow_source'):
+                blocks_level = len(stack)
+                array_start, array_first = position, len(spans)
+            stack.append((char, key))
+        else:
+            if not stack:
+                raise json.JSONDecodeError("Unmatched bracket", "", position)
+            stack.pop()
+            if blocks_level is not None and len(stack) == blocks_level:
+                arrays.append((array_start, position + 1, array_first, len(spans) - array_first))
+                blocks_level = None
+
+    if stack or inner:
+        raise json.JSONDecodeError("Unterminated JSON", "", len(buffer))
+    return spans, ids, arrays
+
+
+class MappedWorkflowFile:
+    """内存映射的单个workflow导出文件（按需解码block）"""
+
+    def __init__(self, path: Union[str, Path], cache_size: int = DEFAULT_BLOCK_CACHE_SIZE):
+        self.path = Path(path)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # block序号 -> 已解码的block
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        with open(self.path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.mtime_ns = stat.st_mtime_ns
+            self.size = stat.st_size
+            # 空文件无法映射
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        try:
+            self.spans, self.ids, self.arrays = scan_block_offsets(self._buffer)
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        buffer, self._buffer = self._buffer, b""
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+    def is_current(self) -> bool:
+        """文件在映射之后是否未被修改"""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+    def block_ids(self) -> List[str]:
+        return list(self.ids)
+
+    def _decode(self, index: int) -> Any:
+        start, end = self.spans[index]
+        return json.loads(self._buffer[start:end])
+
+    def block(self, index: int) -> Dict[str, Any]:
+        """按序号获取block（LRU缓存已解码的block）"""
+        with self._lock:
+            block = self._cache.get(index)
+            if block is not None:
+                self._cache.move_to_end(index)
+                self.hits += 1
+                return block
+            self.misses += 1
+        block = self._decode(index)
+        with self._lock:
+            self._cache[index] = block
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return block
+
+    def find(self, block_id: str, projected: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        按block id获取原始block
+
+        Args:
+            block_id: block id
+            projected: 是否只返回解析器需要的字段（与流式读取的精简block一致）
+
+        Returns:
+            block数据，不存在时返回None
+        """
+        index = self.ids.get(block_id)
+        if index is None:
+            return None
+        block = self.block(index)
+        return project_block(block) if projected else block
+
+    def iter_blocks(self, projected: bool = False) -> Iterator[Dict[str, Any]]:
+        """按文件顺序逐个解码block（不写入LRU，适合整体遍历）"""
+        for index in range(len(self.spans)):
+            block = self._decode(index)
+            yield project_block(block) if projected and isinstance(block, dict) else block
+
+    def skeleton(self) -> Union[Dict, List]:
+        """
+        生成与 workflow_stream.load_workflow_skeleton 相同的精简数据：
+        blocks数组以外的部分按流式读取规则解码，block逐个从映射区间解码后精简
+
+        Returns:
+            可直接传给WorkflowParser.parse_json的精简workflow数据
+        """
+        pieces = []
+        position = 0
+        for start, end, _, _ in self.arrays:
+            pieces.append(self._buffer[position:start])
+            pieces.append(b"[]")
+            position = end
+        pieces.append(self._buffer[position:])
+        result = load_workflow_skeleton(b"".join(pieces))
+
+        # 各导出的blocks数组按文件顺序对应精简结果中被置空的blocks
+        exports = result if isinstance(result, list) else [result]
+        arrays = iter(self.arrays)
+        for export in exports:
+            workflow = export.get("workflow_source", {}).get("workflow") if isinstance(export, dict) else None
+            if not isinstance(workflow, dict) or workflow.get("blocks") != []:
+                continue
+            array = next(arrays, None)
+            if array is None:
+                break
+            _, _, first, count = array
+            workflow["blocks"] = [
+                project_block(block) if isinstance(block, dict) else block
+                for block in map(self._decode, range(first, first + count))
+            ]
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "size": self.size,
+                "blocks": len(self.spans),
+                "cached_blocks": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class MappedWorkflowRegistry:
+    """按文件路径复用已映射的workflow文件，文件修改后重新映射和扫描"""
+
+    def __init__(self, max_files: int = DEFAULT_MAX_FILES, cache_size: int = DEFAULT_BLOCK_CACHE_SIZE):
+        self.max_files = max_files
+        self.cache_size = cache_size
+        self._files = OrderedDict()  # 路径 -> MappedWorkflowFile
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def get(self, path: Union[str, Path]) -> MappedWorkflowFile:
+        """
+        获取文件的映射（未映射或文件已修改时重新扫描）
+
+        Raises:
+            FileNotFoundError: 文件不存在
+            json.JSONDecodeError: JSON结构不完整
+        """
+        key = str(Path(path).resolve())
+        with self._lock:
+            mapped = self._files.get(key)
+            if mapped is not None and mapped.is_current():
+                self._files.move_to_end(key)
+                return mapped
+
+        mapped = MappedWorkflowFile(key, self.cache_size)
+        with self._lock:
+            previous = self._files.pop(key, None)
+            self._files[key] = mapped
+            self.scans += 1
+            evicted = []
+            while len(self._files) > self.max_files:
+                evicted.append(self._files.popitem(last=False)[1])
+        # 旧映射可能仍被其他请求使用，交给垃圾回收在引用释放后关闭
+        del previous, evicted
+        return mapped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": [mapped.stats() for mapped in self._files.values()],
+                "scans": self.scans
+            }
+
+
+# 进程内共享的文件映射
+mapped_workflows = MappedWorkflowRegistry()
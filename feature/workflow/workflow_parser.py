@@ -5,37 +5,143 @@ Workflow JSON解析器
 解析workflow JSON文件，提取节点、条件、分支等结构信息
 """
 
+import hashlib
 import json
-from typing import Dict, List, Any, Optional
+import logging
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from itertools import groupby
+from typing import Dict, IO, List, Any, Optional, Union
+
+try:
+    from workflow_stream import load_workflow_skeleton
+    from workflow_graph import (Block, Edge, Condition, Operand, ParentLink, BlockFacts, TraversalResult,
+                                AnalysisState, KeyIndex, block_content_hash, export_records, export_value)
+except ImportError:
+    from feature.workflow.workflow_stream import load_workflow_skeleton
+    from feature.workflow.workflow_graph import (Block, Edge, Condition, Operand, ParentLink, BlockFacts,
+                                                 TraversalResult, AnalysisState, KeyIndex, block_content_hash,
+                                                 export_records, export_value)
+
+try:
+    from condition_tokens import tokenize_condition, split_currency_codes
+    from worker_pool import get_executor, reset_executor, MAX_WORKERS
+    from csv_columns import CsvColumns, build_csv_columns, expand_csv_rows
+except ImportError:
+    from feature.workflow.condition_tokens import tokenize_condition, split_currency_codes
+    from feature.workflow.worker_pool import get_executor, reset_executor, MAX_WORKERS
+    from feature.workflow.csv_columns import CsvColumns, build_csv_columns, expand_csv_rows
+
+# 解析结果结构版本，解析逻辑或输出结构变化时递增，使持久化的旧解析结果失效
+PARSER_SCHEMA_VERSION = 4
+
+# CSV行去重使用的字段
+CSV_KEY_FIELDS = ('支付方式', 'Network', '币种', 'Network Tokenized？', '开启Affinity', 'Adaptive 3DS',
+                  'Adyen', 'Stripe', 'Airwallex')
+
+
+# CSV中支付方式的显示名称
+PAYMENT_METHOD_DISPLAY_NAMES = {
+    'CARD': 'Card',
+    'AP': 'Apple Pay',
+    'GP': 'Google Pay'
+}
+
+# 增量解析时表示没有可复用的分析结果
+_NOT_CACHED = object()
+
+# AnalysisState中各类分析结果对应的统计项
+_ANALYSIS_STATS = {"split_infos": "splits", "currency_combos": "currency_blocks"}
+
+# 需要分析的split达到该数量时才并行分析（较小的workflow在当前进程内分析，省去进程间传输）
+PARALLEL_SPLIT_THRESHOLD = 2000
+
+# 每个并行任务至少分析的split数
+MIN_SPLIT_CHUNK_SIZE = 250
+
+logger = logging.getLogger(__name__)
+
+# 进程池子进程内复用的解析器（只使用其条件提取方法）
+_chunk_parser = None
+
+
+def csv_row_key(row: Dict) -> tuple:
+    """CSV行的唯一标识（基于所有关键字段）"""
+    return tuple(row.get(field, '') for field in CSV_KEY_FIELDS)
+
+
+def analyze_split_chunk(items: List[tuple], parent_table: List[Dict]) -> List[tuple]:
+    """
+    进程池任务：分析一批split的币种、支付方式、Network和Network Tokenized
+
+    Args:
+        items: [(条件名称, 条件, 父级条件在parent_table中的序号元组或None, split名称, 追踪到的支付方式或None)]，
+            条件信息为None的split对应None
+        parent_table: 本批split条件链中用到的父级条件 [{name, condition}]
+
+    Returns:
+        与items一一对应的 (币种, 条件中提取的支付方式, 最终支付方式, (Network, Network Tokenized))
+    """
+    global _chunk_parser
+    if _chunk_parser is None:
+        _chunk_parser = WorkflowParser()
+    results = []
+    for condition_name, condition, parent_indexes, split_name, traced_payment_method in items:
+        condition_info = None
+        if condition_name is not None:
+            condition_info = {"name": condition_name, "condition": condition}
+            if parent_indexes is not None:
+                condition_info["parent_conditions"] = [parent_table[index] for index in parent_indexes]
+        results.append(_chunk_parser._analyze_split_condition(condition_info, split_name, traced_payment_method))
+    return results
 
 
 class WorkflowParser:
     """Workflow解析器类"""
     
-    def __init__(self):
-        self.nodes = []  # 解析后的节点列表
-        self.conditions = []  # 条件列表
-        self.connections = []  # 连接关系列表
-        self.splits = []  # Split节点列表
+    def __init__(self, parallel: bool = False):
+        """
+        Args:
+            parallel: 需要分析的split数达到PARALLEL_SPLIT_THRESHOLD时，是否在共享进程池中分批并行分析
+        """
+        self.parallel = parallel
+        # 内部使用紧凑的slots对象（见workflow_graph），只在parse_json返回时转换为dict
+        self.nodes = []  # 解析后的节点列表（Block）
+        self.conditions = []  # 条件列表（Condition）
+        self.connections = []  # 连接关系列表（Edge）
+        self.splits = []  # Split节点列表（条件链为共享的ParentLink元组）
         self.raw_data = None  # 原始数据
-        
-    def parse_json(self, json_data: Dict) -> Dict:
+        self._incoming_edges = {}  # 反向邻接索引：目标block id -> [指向它的Edge]
+        self._parent_conditions_cache = {}  # 每个block的父级条件链缓存（不可变元组，各split共享）
+        self._condition_chain_cache = {}  # 每个block的条件链（condition_info）缓存
+        self._traversal = None  # 单次遍历结果（TraversalResult）
+        self._split_index = KeyIndex()  # (currency, payment_method, network, network_tokenized) -> split
+        self._split_network = {}  # id(split) -> (network, network_tokenized)，避免重复解析条件链
+        self._previous_state = None  # 上一次解析的AnalysisState（增量解析时复用）
+        self._analysis_state = None  # 本次解析的AnalysisState（仅增量模式）
+        
+    def parse_json(self, json_data: Dict, previous: Optional[Dict] = None, incremental: bool = False) -> Dict:
         """
         解析JSON数据
         
         Args:
             json_data: workflow JSON数据
+            previous: 上一个revision的解析结果（需以增量模式解析），祖先链未变化的split直接复用其分析结果
+            incremental: 是否记录增量解析状态（结果中的analysis_state，供下一次解析作为previous传入）
             
         Returns:
             解析后的结构数据
         """
         self.raw_data = json_data
+        self._previous_state = previous.get("analysis_state") if previous else None
+        self._analysis_state = None
+        incremental = incremental or previous is not None
         
         # 清空之前的数据
         self.nodes = []
         self.conditions = []
         self.connections = []
-        self.splits = []
+        self._reset_splits()
         
         # 遍历解析
         if isinstance(json_data, list):
@@ -45,16 +151,40 @@ class WorkflowParser:
             self._parse_workflow(json_data)
         
         # 分析split节点
-        self._analyze_splits()
+        self._analyze_splits(incremental)
+        self._previous_state = None
         
+        result = self._export_result()
+        if self._analysis_state is not None:
+            result["analysis_state"] = self._analysis_state
+            result["incremental"] = dict(self._analysis_state.stats)
+        return result
+    
+    def _reset_splits(self):
+        """清空split列表及其去重索引"""
+        self.splits = []
+        self._split_index = KeyIndex()
+        self._split_network = {}
+    
+    def _export_result(self) -> Dict:
+        """将内部表示转换为对外输出的dict结构（共享对象输出为同一个dict）"""
+        memo = {}
         return {
-            "nodes": self.nodes,
-            "conditions": self.conditions,
-            "connections": self.connections,
-            "splits": self.splits,
+            "nodes": export_records(self.nodes, memo),
+            "conditions": export_records(self.conditions, memo),
+            "connections": export_records(self.connections, memo),
+            "splits": [self._export_split(split, memo) for split in self.splits],
             "raw_data": self.raw_data
         }
     
+    def _export_split(self, split: Dict, memo: Dict) -> Dict:
+        """转换单个split，条件链中的ParentLink转换为dict"""
+        exported = split.copy()
+        condition_info = split.get("condition")
+        if isinstance(condition_info, dict):
+            exported["condition"] = {key: export_value(value, memo) for key, value in condition_info.items()}
+        return exported
+    
     def _parse_workflow(self, workflow: Dict):
         """解析单个workflow"""
         workflow_source = workflow.get("workflow_source", {})
@@ -142,77 +272,75 @@ class WorkflowParser:
             # 创建连接
             next_id = cond.get("next")
             if next_id:
-                self.connections.append({
-                    "from": block_id,
-                    "to": next_id,
-                    "label": cond.get("name", "Condition"),
-                    "type": "conditional",
-                    "condition": condition_info
-                })
+                self.connections.append(Edge(
+                    block_id, next_id, cond.get("name", "Condition"), "conditional", condition_info, block, cond
+                ))
         
         # 解析default outcome
         default = outcomes.get("default", {})
         if default and isinstance(default, dict):
             next_id = default.get("next")
             if next_id:
-                self.connections.append({
-                    "from": block_id,
-                    "to": next_id,
-                    "label": "Default",
-                    "type": "default"
-                })
+                self.connections.append(Edge(
+                    block_id, next_id, "Default", "default", None, block, default
+                ))
     
     def _create_node(self, id_: Any, name: str, type_: str, block_type: str, 
-                    description: str, data: Dict) -> Optional[Dict]:
+                    description: str, data: Dict) -> Optional[Block]:
         """创建节点"""
         if not id_:
             return None
-            
-        return {
-            "id": str(id_),
-            "name": name,
-            "type": type_ or "unknown",
-            "block_type": block_type or "unknown",
-            "description": description,
-            "data": data
-        }
+        
+        return Block(str(id_), name, type_ or "unknown", block_type or "unknown", description, data)
     
-    def _extract_condition_info(self, condition: Dict) -> Dict:
+    def _extract_condition_info(self, condition: Dict) -> Condition:
         """提取条件信息"""
-        condition_info = {
-            "operator": condition.get("operator", ""),
-            "operands": []
-        }
+        operands = tuple(
+            Operand(operand.get("type", ""), operand.get("operator", ""),
+                    operand.get("expression", {}), operand.get("operand", {}))
+            for operand in condition.get("operands", [])
+        )
+        return Condition(condition.get("operator", ""), operands)
+    
+    def parse_stream(self, content: Union[str, bytes, IO]) -> Dict:
+        """
+        流式解析JSON内容：逐个解码block，只保留解析所需字段
         
-        operands = condition.get("operands", [])
-        for operand in operands:
-            operand_info = {
-                "type": operand.get("type", ""),
-                "operator": operand.get("operator", ""),
-                "expression": operand.get("expression", {}),
-                "operand": operand.get("operand", {})
-            }
-            condition_info["operands"].append(operand_info)
+        节点的data字段为精简后的block（不含input_configuration、application_visuals等），
+        raw_data为精简后的workflow结构
         
-        return condition_info
+        Args:
+            content: workflow JSON文本、字节或已打开的文件对象（按块读取）
+            
+        Returns:
+            解析后的结构数据
+        """
+        return self.parse_json(load_workflow_skeleton(content))
     
-    def load_from_file(self, file_path: str) -> Dict:
+    def load_from_file(self, file_path: str, streaming: bool = False) -> Dict:
         """
         从文件加载并解析JSON
         
         Args:
             file_path: JSON文件路径
+            streaming: 是否使用流式读取（按块读取文件，只保留解析所需字段）
             
         Returns:
             解析后的结构数据
         """
         with open(file_path, 'r', encoding='utf-8') as f:
+            if streaming:
+                return self.parse_stream(f)
             json_data = json.load(f)
         
         return self.parse_json(json_data)
     
-    def _analyze_splits(self):
-        """分析所有split节点和币种组合，从TRIGGER开始追踪支付方式"""
+    def _analyze_splits(self, incremental: bool = False):
+        """
+        分析所有split节点和币种组合，从TRIGGER开始追踪支付方式
+        
+        增量模式下按block祖先签名复用上一次解析的split分析和币种组合（签名相同说明split及其全部上游未变化）
+        """
         # 构建blocks索引
         workflow_source = self.raw_data.get("workflow_source", {}) if isinstance(self.raw_data, dict) else {}
         if isinstance(self.raw_data, list) and self.raw_data:
@@ -224,45 +352,59 @@ class WorkflowParser:
         # 创建blocks索引
         blocks_dict = {block["id"]: block for block in blocks}
         
+        # 构建反向邻接索引（每次解析只构建一次），后续父级条件查找都基于该索引
+        self._build_incoming_index(blocks_dict)
+        
+        # 单次遍历收集所有阶段需要的信息（block条件信息、split支付方式、币种条件）
+        self._traversal = self._traverse_workflow(blocks_dict)
+        
+        if incremental:
+            self._analysis_state = AnalysisState()
+            self._ancestor_signatures(blocks_dict, self._analysis_state)
+        
         # 找到所有ROUTE_SPLITTER节点（有分量的）
         split_blocks = [b for b in blocks if b.get("type") == "ROUTE_SPLITTER"]
         
-        # 从TRIGGER开始，为每个split追踪支付方式
-        # 构建split到支付方式的映射
-        split_payment_method_map = self._build_split_payment_method_map(blocks_dict)
+        # 从TRIGGER开始追踪到的split支付方式
+        split_payment_method_map = self._traversal.split_payment_methods
+        
+        # 解析所有split节点（有分量的）；增量模式下先取出可复用的分析结果，其余的统一分析
+        reused = {}
+        pending = []
+        for split_block in split_blocks:
+            cached = self._reuse_analysis("split_infos", split_block.get("id"))
+            if cached is _NOT_CACHED:
+                pending.append(split_block)
+            else:
+                reused[id(split_block)] = cached
+        analyzed = dict(zip(map(id, pending), self._analyze_split_blocks(pending, blocks_dict, split_payment_method_map)))
         
-        # 解析所有split节点（有分量的）
+        # 按原始block顺序合并，结果与逐个分析完全一致
         for split_block in split_blocks:
-            split_info = self._parse_split_block(split_block, blocks_dict)
+            split_id = split_block.get("id")
+            if id(split_block) in analyzed:
+                split_info, network_info = analyzed[id(split_block)]
+                self._record_analysis("split_infos", split_id, (split_info, network_info))
+            else:
+                split_info, network_info = reused[id(split_block)]
+                if split_info:
+                    split_info = dict(split_info, data=split_block)
+            
             if split_info:
-                # 如果从条件中无法提取支付方式，使用映射中的支付方式
-                split_id = split_info["id"]
-                if split_info.get("payment_method") == "UNKNOWN" and split_id in split_payment_method_map:
-                    split_info["payment_method"] = split_payment_method_map[split_id]
-                
+                # 按币种拆分后的split条件链相同，Network和Network Tokenized只解析一次
                 for expanded_split in self._split_split_info_by_currency(split_info):
-                    self.splits.append(expanded_split)
+                    self._add_split(expanded_split, network_info)
         
         # 查找所有币种组合（包括没有分量的情况）
         # 从所有条件节点中找到所有币种组合
         all_currency_combinations = self._find_all_currency_combinations_from_conditions(blocks_dict, split_payment_method_map)
         
-        # 将没有分量的币种组合也添加到splits中
+        # 将没有分量的币种组合也添加到splits中（按哈希索引去重）
         for combo in all_currency_combinations:
-            # 检查是否已经存在相同的split（避免重复）
-            existing = False
-            for existing_split in self.splits:
-                if (existing_split.get("currency") == combo.get("currency") and
-                    existing_split.get("payment_method") == combo.get("payment_method")):
-                    # 检查Network和Network Tokenized是否也相同
-                    existing_network = self._extract_network(existing_split.get("condition"), existing_split.get("payment_method"))
-                    existing_nt = self._extract_network_tokenized(existing_split.get("condition"))
-                    if (existing_network == combo.get("network_value") and
-                        existing_nt == combo.get("network_tokenized")):
-                        existing = True
-                        break
-            
-            if not existing:
+            # 检查是否已经存在相同币种、支付方式、Network和Network Tokenized的split（避免重复）
+            combo_key = (combo.get("currency"), combo.get("payment_method"),
+                         combo.get("network_value"), combo.get("network_tokenized"))
+            if combo_key not in self._split_index:
                 # 创建一个没有分量的split信息
                 condition_info = combo.get("condition_info")
                 if not condition_info:
@@ -282,81 +424,482 @@ class WorkflowParser:
                     "payment_method": combo.get("payment_method", "UNKNOWN"),
                     "data": None
                 }
-                self.splits.append(split_info)
+                self._add_split(split_info)
     
-    def _find_all_currency_combinations_from_conditions(self, blocks_dict: Dict, split_payment_method_map: Dict) -> List[Dict]:
-        """从所有条件节点中找到所有币种组合（包括没有分量的）"""
-        combinations = []
+    def _analyze_split_blocks(self, split_blocks: List[Dict], blocks_dict: Dict,
+                              split_payment_method_map: Dict) -> List[tuple]:
+        """
+        分析split block，返回与split_blocks一一对应的(split_info, network_info)
+        
+        并行模式下条件链在当前进程内查找（依赖反向邻接索引和共享的父级条件缓存），
+        只把条件名称、条件和去重后的父级条件表发送到进程池做条件提取，结果按原顺序合并
+        """
+        if not self.parallel or MAX_WORKERS < 2 or len(split_blocks) < PARALLEL_SPLIT_THRESHOLD:
+            results = []
+            for split_block in split_blocks:
+                split_info = self._parse_split_block(split_block, blocks_dict)
+                network_info = None
+                if split_info:
+                    # 如果从条件中无法提取支付方式，使用映射中的支付方式
+                    if split_info.get("payment_method") == "UNKNOWN" and split_block.get("id") in split_payment_method_map:
+                        split_info["payment_method"] = split_payment_method_map[split_block.get("id")]
+                    network_info = self._split_network_info(split_info)
+                results.append((split_info, network_info))
+            return results
+        
+        condition_infos = [self._find_split_condition(split_block.get("id"), blocks_dict) for split_block in split_blocks]
+        analyses = self._analyze_split_conditions_parallel(split_blocks, condition_infos, split_payment_method_map)
+        if analyses is None:
+            analyses = [
+                self._analyze_split_condition(condition_info, split_block.get("route_splitter_name", "Unknown Split"),
+                                              split_payment_method_map.get(split_block.get("id")))
+                for split_block, condition_info in zip(split_blocks, condition_infos)
+            ]
+        
+        results = []
+        for split_block, condition_info, (currency, payment_method, final_payment_method, network_info) in zip(
+                split_blocks, condition_infos, analyses):
+            split_info = self._build_split_info(split_block, condition_info, currency, payment_method)
+            split_info["payment_method"] = final_payment_method
+            results.append((split_info, network_info))
+        return results
+    
+    def _analyze_split_conditions_parallel(self, split_blocks: List[Dict], condition_infos: List[Optional[Dict]],
+                                           split_payment_method_map: Dict) -> Optional[List[tuple]]:
+        """在共享进程池中分批分析split条件，进程池不可用时返回None（改为当前进程内分析）"""
+        try:
+            executor = get_executor()
+        except OSError as exc:
+            logger.warning("创建进程池失败，split改为进程内分析: %s", exc)
+            return None
+        if executor is None:
+            return None
+        
+        chunk_size = max(MIN_SPLIT_CHUNK_SIZE, -(-len(split_blocks) // (MAX_WORKERS * 2)))
+        futures = []
+        for start in range(0, len(split_blocks), chunk_size):
+            # 每批只携带本批用到的父级条件（多个split共享的条件链只传一次）
+            parent_index = {}
+            parent_table = []
+            items = []
+            for split_block, condition_info in zip(split_blocks[start:start + chunk_size],
+                                                   condition_infos[start:start + chunk_size]):
+                split_name = split_block.get("route_splitter_name", "Unknown Split")
+                traced_payment_method = split_payment_method_map.get(split_block.get("id"))
+                if not condition_info:
+                    items.append((None, None, None, split_name, traced_payment_method))
+                    continue
+                parent_indexes = None
+                if "parent_conditions" in condition_info:
+                    parent_indexes = []
+                    for parent in condition_info["parent_conditions"]:
+                        index = parent_index.get(id(parent))
+                        if index is None:
+                            index = parent_index[id(parent)] = len(parent_table)
+                            parent_table.append({"name": parent.get("name"), "condition": parent.get("condition")})
+                        parent_indexes.append(index)
+                    parent_indexes = tuple(parent_indexes)
+                items.append((condition_info.get("name"), condition_info.get("condition"), parent_indexes,
+                              split_name, traced_payment_method))
+            futures.append(executor.submit(analyze_split_chunk, items, parent_table))
+        
+        try:
+            return [analysis for future in futures for analysis in future.result()]
+        except (BrokenProcessPool, OSError) as exc:
+            logger.warning("进程池分析split失败，改为进程内分析: %s", exc)
+            reset_executor()
+            return None
+    
+    def _analyze_split_condition(self, condition_info: Optional[Dict], split_name: str,
+                                 traced_payment_method: Optional[str]) -> tuple:
+        """
+        从split的条件链中提取币种、支付方式、Network和Network Tokenized（只依赖条件信息，可在子进程中执行）
+        
+        Returns:
+            (币种, 条件中提取的支付方式, 最终支付方式（无法提取时使用追踪到的支付方式）, (Network, Network Tokenized))
+        """
+        currency, payment_method = self._extract_currency_and_payment_method(condition_info, split_name)
+        final_payment_method = payment_method
+        if payment_method == "UNKNOWN" and traced_payment_method is not None:
+            final_payment_method = traced_payment_method
+        network_info = (self._extract_network(condition_info, final_payment_method),
+                        self._extract_network_tokenized(condition_info))
+        return currency, payment_method, final_payment_method, network_info
+    
+    def _split_network_info(self, split_info: Dict) -> tuple:
+        """从split的条件链中解析(Network, Network Tokenized)"""
+        condition_info = split_info.get("condition")
+        return (self._extract_network(condition_info, split_info.get("payment_method")),
+                self._extract_network_tokenized(condition_info))
+    
+    def _add_split(self, split_info: Dict, network_info: Optional[tuple] = None):
+        """添加split并登记到去重索引（Network和Network Tokenized只解析一次）"""
+        if network_info is None:
+            network_info = self._split_network_info(split_info)
+        network, network_tokenized = network_info
+        
+        self.splits.append(split_info)
+        self._split_network[id(split_info)] = network_info
+        self._split_index.add((split_info.get("currency"), split_info.get("payment_method"), network, network_tokenized),
+                              split_info)
+    
+    def _ancestor_signatures(self, blocks_dict: Dict, state: AnalysisState):
+        """
+        计算每个block的内容哈希和祖先签名，写入state
+        
+        与上一次解析相同的block（按id取出后整体比较）直接沿用其内容哈希，只对变化和新增的block重新哈希；
+        祖先签名为block内容哈希与所有入边来源block的签名（按入边顺序）一起哈希，签名相同说明该block、
+        其全部上游block及连接顺序都没有变化，基于条件链的分析结果可以直接复用。
+        TRIGGER顺序影响支付方式的覆盖顺序，一并计入；环路上及其下游的block没有签名（总是重新分析）
+        """
+        previous_blocks = self._previous_state.blocks if self._previous_state is not None else {}
+        for block_id, block in blocks_dict.items():
+            previous = previous_blocks.get(block_id)
+            if previous is not None and previous[0] == block:
+                state.blocks[block_id] = (block, previous[1])
+                continue
+            state.blocks[block_id] = (block, block_content_hash(block))
+            state.stats["changed_blocks"] += 1
+        
+        trigger_order = "|".join(str(block_id) for block_id, block in blocks_dict.items()
+                                 if block.get("type") == "TRIGGER").encode("utf-8")
+        
+        pending = {}
+        successors = {}
+        for block_id in blocks_dict:
+            edges = self._incoming_edges.get(block_id, ())
+            pending[block_id] = len(edges)
+            for edge in edges:
+                successors.setdefault(edge.source, []).append(block_id)
+        
+        signatures = state.signatures
+        ready = deque(block_id for block_id, count in pending.items() if count == 0)
+        while ready:
+            block_id = ready.popleft()
+            digest = hashlib.blake2b(state.blocks[block_id][1].encode("ascii"), digest_size=16)
+            digest.update(trigger_order)
+            for edge in self._incoming_edges.get(block_id, ()):
+                digest.update(signatures[edge.source].encode("ascii"))
+            signatures[block_id] = digest.hexdigest()
+            
+            for next_id in successors.get(block_id, ()):
+                pending[next_id] -= 1
+                if pending[next_id] == 0:
+                    ready.append(next_id)
+    
+    def _reuse_analysis(self, kind: str, block_id: str) -> Any:
+        """增量模式下返回上一次解析中祖先签名相同的分析结果，不可复用时返回_NOT_CACHED"""
+        state = self._analysis_state
+        if state is None or self._previous_state is None:
+            return _NOT_CACHED
+        signature = state.signatures.get(block_id)
+        cached = getattr(self._previous_state, kind).get(block_id)
+        if signature is None or cached is None or cached[0] != signature:
+            return _NOT_CACHED
+        
+        getattr(state, kind)[block_id] = cached
+        state.stats["reused_" + _ANALYSIS_STATS[kind]] += 1
+        return cached[1]
+    
+    def _record_analysis(self, kind: str, block_id: str, value: Any):
+        """增量模式下记录本次分析结果及其祖先签名"""
+        state = self._analysis_state
+        if state is not None:
+            getattr(state, kind)[block_id] = (state.signatures.get(block_id), value)
+            state.stats["recomputed_" + _ANALYSIS_STATS[kind]] += 1
+    
+    def _traverse_workflow(self, blocks_dict: Dict) -> TraversalResult:
+        """
+        遍历引擎：一次扫描所有block收集条件信息，再从TRIGGER做一次前向遍历确定每个split的支付方式
+        
+        后续阶段（条件链、Network Tokenized分支、币种组合、split支付方式）都直接使用该结果，不再各自扫描blocks
+        """
+        block_facts = {}
+        currency_outcomes = []
         
-        # 找到所有包含币种信息的条件节点
         for block_id, block in blocks_dict.items():
-            outcomes = block.get("outcomes", {})
+            outcomes = block.get("outcomes")
             if not isinstance(outcomes, dict):
                 continue
             
+            facts = BlockFacts()
             conditional = outcomes.get("conditional", [])
-            default = outcomes.get("default", {})
+            edge_payment_methods = []
+            amex_checked = False
+            has_currency_cond = False
             
-            # 检查每个conditional outcome
             for cond in conditional:
                 cond_name = cond.get("name", "")
-                cond_data = cond.get("condition", {})
+                name_lower = cond_name.lower()
                 
-                if "currency" in cond_name.lower() or "币种" in cond_name.lower():
-                    currencies_to_process = self._extract_currencies_from_condition(cond_name)
-                    if not currencies_to_process:
-                        continue
-                    
-                    combo_infos = self._extract_all_combo_infos_from_condition_chain(
-                        block_id, cond, blocks_dict, split_payment_method_map
-                    )
-                    
-                    for currency in currencies_to_process:
-                        for combo_info in combo_infos:
-                            combo_copy = combo_info.copy()
-                            combo_copy["currency"] = currency
-                            combo_copy["condition_name"] = cond_name
-                            combo_copy["id"] = block_id
-                            combinations.append(combo_copy)
+                # Network Tokenized条件
+                if "tokenised" in name_lower or "tokenized" in name_lower:
+                    if "NOT" in cond_name.upper():
+                        facts.has_not_network_tokenised = True
+                    else:
+                        facts.has_network_tokenised = True
+                
+                # Network/Amex条件
+                if "network" in name_lower and "amex" in name_lower:
+                    if "!=" in cond_name:
+                        facts.has_amex_not_equal = True
+                    if not amex_checked:
+                        amex_checked = True
+                        if "!=" in cond_name:
+                            facts.default_network_name = "Network=Amex"
+                        if "!=" in cond_name or "NOT" in cond_name.upper():
+                            facts.amex_chain_link = ParentLink(
+                                "Network=Amex", cond.get("condition"), block_id, block.get("type"), True
+                            )
+                
+                # 币种条件
+                if "currency" in name_lower or "币种" in name_lower:
+                    has_currency_cond = True
+                    currencies = self._extract_currencies_from_condition(cond_name)
+                    if currencies:
+                        currency_outcomes.append((block_id, cond, currencies))
+                
+                # 条件中的支付方式
+                edge_payment_methods.append(self._extract_payment_method_from_condition(cond.get("condition", {})))
             
-            # 检查default outcome（可能对应"其他"币种）
+            # 有币种相关的conditional时，default可能对应"其他"币种
+            default = outcomes.get("default", {})
+            if has_currency_cond and isinstance(default, dict):
+                currency_outcomes.append((block_id, default, None))
+            
+            facts.edge_payment_methods = tuple(edge_payment_methods)
+            block_facts[block_id] = facts
+        
+        split_payment_methods = self._propagate_payment_methods(blocks_dict, block_facts)
+        network_tokenized_branches = self._propagate_network_tokenized(block_facts)
+        return TraversalResult(block_facts, split_payment_methods, currency_outcomes, network_tokenized_branches)
+    
+    def _extract_payment_method_from_condition(self, cond_data: Optional[Dict]) -> Optional[str]:
+        """从条件的operands中提取支付方式，没有时返回None"""
+        payment_method = None
+        if not cond_data:
+            return payment_method
+        
+        for op in cond_data.get("operands", []):
+            expression = op.get("expression", {})
+            if isinstance(expression, dict):
+                path = expression.get("path", "")
+                if "paymentMethodType" in path or "payment_method" in path.lower():
+                    operand_value = op.get("operand", {})
+                    if isinstance(operand_value, dict):
+                        value = operand_value.get("value") or operand_value.get("label", "")
+                        if value:
+                            value_upper = str(value).upper()
+                            if "GOOGLE" in value_upper or "GP" in value_upper or "GOOGLE_PAY" in value_upper:
+                                payment_method = "GP"
+                            elif "APPLE" in value_upper or "AP" in value_upper or "APPLE_PAY" in value_upper:
+                                payment_method = "AP"
+                            elif "CARD" in value_upper or "CARD_PAYMENT" in value_upper:
+                                payment_method = "CARD"
+        return payment_method
+    
+    def _propagate_payment_methods(self, blocks_dict: Dict, block_facts: Dict[str, BlockFacts]) -> Dict[str, str]:
+        """从TRIGGER开始前向深度优先遍历，记录每个split的支付方式"""
+        split_pm_map = {}
+        
+        for trigger_block in [b for b in blocks_dict.values() if b.get("type") == "TRIGGER"]:
+            # 每个TRIGGER独立遍历，后遍历的TRIGGER覆盖先前记录的支付方式
+            self._propagate_from_trigger(trigger_block.get("id"), blocks_dict, block_facts, split_pm_map)
+        
+        return split_pm_map
+    
+    def _propagate_from_trigger(self, trigger_id: str, blocks_dict: Dict, block_facts: Dict[str, BlockFacts],
+                                split_pm_map: Dict[str, str]):
+        """从单个TRIGGER前向遍历，子节点逆序入栈以保持与递归遍历相同的先序"""
+        visited = set()
+        stack = [(trigger_id, "UNKNOWN")]
+        
+        while stack:
+            block_id, current_payment_method = stack.pop()
+            if block_id in visited:
+                continue
+            visited.add(block_id)
+            
+            block = blocks_dict.get(block_id)
+            if not block:
+                continue
+            
+            # 如果是split，记录支付方式
+            if block.get("type") == "ROUTE_SPLITTER":
+                split_pm_map[block_id] = current_payment_method
+            
+            outcomes = block.get("outcomes")
+            if not outcomes or not isinstance(outcomes, dict):
+                continue
+            
+            children = []
+            facts = block_facts[block_id]
+            for cond, pm in zip(outcomes.get("conditional", []), facts.edge_payment_methods):
+                next_id = cond.get("next")
+                if next_id:
+                    children.append((next_id, pm or current_payment_method))
+            
+            default = outcomes.get("default", {})
             if isinstance(default, dict):
-                # 检查这个block是否有币种相关的conditional
-                has_currency_cond = False
-                for cond in conditional:
-                    cond_name = cond.get("name", "")
-                    if "currency" in cond_name.lower() or "币种" in cond_name.lower():
-                        has_currency_cond = True
-                        break
+                next_id = default.get("next")
+                if next_id:
+                    children.append((next_id, current_payment_method))
+            
+            stack.extend(reversed(children))
+    
+    @staticmethod
+    def _network_tokenized_edge_values(edge: Edge, facts: BlockFacts) -> tuple:
+        """连接对应的Network Tokenized分支值：conditional对应条件本身，default对应相反值"""
+        if facts.has_network_tokenised and facts.has_not_network_tokenised:
+            return ("TRUE", "False")
+        if facts.has_network_tokenised:
+            return ("False",) if edge.is_default else ("TRUE",)
+        if facts.has_not_network_tokenised:
+            return ("TRUE",) if edge.is_default else ("False",)
+        return ()
+    
+    def _propagate_network_tokenized(self, block_facts: Dict[str, BlockFacts]) -> Dict[str, tuple]:
+        """
+        计算每个block上游条件链中出现过的Network Tokenized分支值
+        
+        NT(v) = 所有入边的分支值 ∪ 所有入边来源block的NT，用工作队列迭代到不动点：
+        每个block至多保存两个值、至多更新两次，不递归、无深度限制，环路也能收敛
+        """
+        successors = {}
+        for target_id, edges in self._incoming_edges.items():
+            for edge in edges:
+                successors.setdefault(edge.source, []).append(target_id)
+        
+        values = {}
+        worklist = deque(self._incoming_edges)
+        queued = set(worklist)
+        while worklist:
+            block_id = worklist.popleft()
+            queued.discard(block_id)
+            
+            current = values.get(block_id, frozenset())
+            reached = set(current)
+            for edge in self._incoming_edges[block_id]:
+                reached.update(self._network_tokenized_edge_values(edge, block_facts[edge.source]))
+                reached.update(values.get(edge.source, ()))
+            if len(reached) == len(current):
+                continue
+            
+            values[block_id] = frozenset(reached)
+            for next_id in successors.get(block_id, ()):
+                if next_id not in queued and next_id in self._incoming_edges:
+                    queued.add(next_id)
+                    worklist.append(next_id)
+        
+        return {block_id: tuple(v for v in ("TRUE", "False") if v in reached) for block_id, reached in values.items()}
+    
+    def _build_incoming_index(self, blocks_dict: Dict):
+        """
+        构建反向邻接索引：目标block -> 指向它的Edge列表（conditional/default outcome）
+        
+        只收录来源block属于当前分析的blocks_dict的连接；列表顺序与按blocks_dict顺序逐个扫描outcomes的顺序一致
+        （同一block内先conditional后default），保证基于索引的查找结果与逐个扫描完全相同
+        """
+        self._incoming_edges = {}
+        self._parent_conditions_cache = {}
+        self._condition_chain_cache = {}
+        
+        for edge in self.connections:
+            if blocks_dict.get(edge.source) is edge.source_block:
+                self._incoming_edges.setdefault(edge.target, []).append(edge)
+    
+    def _find_parent_conditions(self, target_block_id: str) -> tuple:
+        """查找指向目标block的所有父级条件（按block缓存为不可变元组，各split共享）"""
+        cached = self._parent_conditions_cache.get(target_block_id)
+        if cached is None:
+            cached = tuple(self._walk_parent_conditions(target_block_id))
+            self._parent_conditions_cache[target_block_id] = cached
+        return cached
+    
+    def _walk_parent_conditions(self, target_block_id: str) -> List[ParentLink]:
+        """
+        沿反向邻接索引向上查找条件链
+        
+        使用显式栈（每层保存入边迭代器）做先序遍历，顺序与逐层递归一致；
+        每个block只展开一次，不限制深度，深层workflow中更上层的条件不会被截断
+        """
+        parent_conditions = []
+        visited = {target_block_id}
+        stack = [iter(self._incoming_edges.get(target_block_id, ()))]
+        while stack:
+            edge = next(stack[-1], None)
+            if edge is None:
+                stack.pop()
+                continue
+            
+            block_id, block, outcome = edge.source, edge.source_block, edge.outcome
+            if not edge.is_default:
+                parent_conditions.append(ParentLink(
+                    outcome.get("name", "Unknown Condition"), outcome.get("condition", {}),
+                    block_id, block.get("type"), False
+                ))
+            else:
+                # 如果conditional是"Network!=Amex"，那么default就是"Network=Amex"
+                network_condition_name = self._traversal.block_facts[block_id].default_network_name
                 
-                # 如果有币种相关的conditional，default可能对应"其他"币种
-                if has_currency_cond:
-                    combo_infos = self._extract_all_combo_infos_from_condition_chain(
-                        block_id, default, blocks_dict, split_payment_method_map
-                    )
-                    for combo_info in combo_infos:
-                        combo_info["currency"] = "其他"
-                        combo_info["condition_name"] = default.get("name", "Default")
-                        combo_info["id"] = block_id
-                        combinations.append(combo_info)
+                parent_conditions.append(ParentLink(
+                    network_condition_name if network_condition_name else (outcome.get("name", "Default")), None,
+                    block_id, block.get("type"), True,
+                    block  # 保存父级block以便检查条件
+                ))
+            if block_id not in visited:
+                visited.add(block_id)
+                stack.append(iter(self._incoming_edges.get(block_id, ())))
+        
+        return parent_conditions
+    
+    def _find_all_currency_combinations_from_conditions(self, blocks_dict: Dict, split_payment_method_map: Dict) -> List[Dict]:
+        """从所有条件节点中找到所有币种组合（包括没有分量的）"""
+        combinations = []
+        
+        # 遍历阶段已收集所有包含币种信息的条件outcome（default对应"其他"币种），同一block的outcome相邻
+        for block_id, block_outcomes in groupby(self._traversal.currency_outcomes, key=lambda item: item[0]):
+            block_combinations = self._reuse_analysis("currency_combos", block_id)
+            if block_combinations is _NOT_CACHED:
+                block_combinations = self._block_currency_combinations(
+                    block_id, block_outcomes, blocks_dict, split_payment_method_map
+                )
+                self._record_analysis("currency_combos", block_id, block_combinations)
+            combinations.extend(block_combinations)
+        
+        return combinations
+    
+    def _block_currency_combinations(self, block_id: str, block_outcomes, blocks_dict: Dict,
+                                     split_payment_method_map: Dict) -> List[Dict]:
+        """单个币种条件block的所有币种组合"""
+        combinations = []
+        for _, outcome, currencies in block_outcomes:
+            combo_infos = self._extract_all_combo_infos_from_condition_chain(
+                block_id, outcome, blocks_dict, split_payment_method_map
+            )
+            
+            if currencies is None:
+                for combo_info in combo_infos:
+                    combo_info["currency"] = "其他"
+                    combo_info["condition_name"] = outcome.get("name", "Default")
+                    combo_info["id"] = block_id
+                    combinations.append(combo_info)
+                continue
+            
+            cond_name = outcome.get("name", "")
+            for currency in currencies:
+                for combo_info in combo_infos:
+                    combo_copy = combo_info.copy()
+                    combo_copy["currency"] = currency
+                    combo_copy["condition_name"] = cond_name
+                    combo_copy["id"] = block_id
+                    combinations.append(combo_copy)
         
         return combinations
     
     def _extract_currencies_from_condition(self, cond_name: str) -> List[str]:
         """从条件名称中提取币种，返回所有单独的币种代码"""
-        import re
-        excluded_words = {'ALL', 'AND', 'THE', 'FOR', 'NOT', 'IN', 'IS', 'TO', 'OF', 'ON', 'AT', 'BY', 
-                         'BIN', 'NET', 'OUT', 'PAY', 'API', 'URL', 'ID', 'KEY', 'TAG', 'LOG', 'ERR'}
-        
-        currencies = re.findall(r'\b([A-Z]{3})\b', cond_name.upper())
-        result = []
-        seen = set()
-        for code in currencies:
-            if code in excluded_words or code in seen:
-                continue
-            result.append(code)
-            seen.add(code)
-        return result
+        return list(tokenize_condition(cond_name).currencies)
     
     def _extract_all_combo_infos_from_condition_chain(self, block_id: str, condition: Dict, 
                                                       blocks_dict: Dict, split_payment_method_map: Dict) -> List[Dict]:
@@ -369,75 +912,7 @@ class WorkflowParser:
             return combo_infos
         
         # 提取Network Tokenized的所有可能值
-        network_tokenized_values = []
-        
-        # 检查条件链中是否有Network Tokenized的不同分支
-        def find_network_tokenized_branches(target_id, visited=None, depth=0):
-            if visited is None:
-                visited = set()
-            if target_id in visited or depth > 15:
-                return []
-            visited.add(target_id)
-            
-            branches = []
-            for block_id, block in blocks_dict.items():
-                outcomes = block.get("outcomes", {})
-                if not isinstance(outcomes, dict):
-                    continue
-                
-                conditional = outcomes.get("conditional", [])
-                default = outcomes.get("default", {})
-                
-                for cond in conditional:
-                    if cond.get("next") == target_id:
-                        has_network_tokenised = False
-                        has_not_network_tokenised = False
-                        
-                        for other_cond in conditional:
-                            cond_name = other_cond.get("name", "")
-                            if "tokenised" in cond_name.lower() or "tokenized" in cond_name.lower():
-                                if "NOT" in cond_name.upper():
-                                    has_not_network_tokenised = True
-                                else:
-                                    has_network_tokenised = True
-                        
-                        if has_network_tokenised and has_not_network_tokenised:
-                            branches.append("TRUE")
-                            branches.append("False")
-                        elif has_network_tokenised:
-                            branches.append("TRUE")
-                        elif has_not_network_tokenised:
-                            branches.append("False")
-                        
-                        sub_branches = find_network_tokenized_branches(block_id, visited.copy(), depth + 1)
-                        branches.extend(sub_branches)
-                
-                if isinstance(default, dict) and default.get("next") == target_id:
-                    has_network_tokenised = False
-                    has_not_network_tokenised = False
-                    
-                    for cond in conditional:
-                        cond_name = cond.get("name", "")
-                        if "tokenised" in cond_name.lower() or "tokenized" in cond_name.lower():
-                            if "NOT" in cond_name.upper():
-                                has_not_network_tokenised = True
-                            else:
-                                has_network_tokenised = True
-                    
-                    if has_network_tokenised and has_not_network_tokenised:
-                        branches.append("False")  # default对应False
-                        branches.append("TRUE")  # conditional对应TRUE
-                    elif has_network_tokenised:
-                        branches.append("False")
-                    elif has_not_network_tokenised:
-                        branches.append("TRUE")
-                    
-                    sub_branches = find_network_tokenized_branches(block_id, visited.copy(), depth + 1)
-                    branches.extend(sub_branches)
-            
-            return branches
-        
-        network_tokenized_branches = find_network_tokenized_branches(block_id)
+        network_tokenized_branches = self._find_network_tokenized_branches(block_id)
         network_tokenized_values = list(set(network_tokenized_branches)) if network_tokenized_branches else [""]
         
         # 如果没有找到Network Tokenized分支，使用默认值
@@ -523,138 +998,48 @@ class WorkflowParser:
             "condition_info": condition_info
         }]
     
-    def _extract_combo_info_from_condition_chain(self, block_id: str, condition: Dict, 
-                                                  blocks_dict: Dict, split_payment_method_map: Dict) -> Dict:
-        """从条件链中提取支付方式、Network、Network Tokenized信息（已废弃，使用_extract_all_combo_infos_from_condition_chain）"""
-        combo_infos = self._extract_all_combo_infos_from_condition_chain(block_id, condition, blocks_dict, split_payment_method_map)
-        return combo_infos[0] if combo_infos else {
-            "payment_method": "UNKNOWN",
-            "network_value": "",
-            "network_tokenized": "",
-            "condition_info": None
-        }
+    def _find_network_tokenized_branches(self, target_id: str) -> List[str]:
+        """获取目标block上游条件链中Network Tokenized的不同分支值"""
+        return list(self._traversal.network_tokenized_branches.get(target_id, ()))
     
     def _find_condition_chain_to_block(self, target_block_id: str, blocks_dict: Dict) -> Optional[Dict]:
-        """查找指向目标block的条件链"""
-        # 找到所有指向这个block的block
-        pointing_blocks = []
-        for block_id, block in blocks_dict.items():
-            outcomes = block.get("outcomes", {})
-            if not isinstance(outcomes, dict):
-                continue
-            
-            conditional = outcomes.get("conditional", [])
-            default = outcomes.get("default", {})
-            
-            for cond in conditional:
-                if cond.get("next") == target_block_id:
-                    condition = cond.get("condition", {})
-                    pointing_blocks.append({
-                        "block_id": block_id,
-                        "block": block,
-                        "type": "conditional",
-                        "name": cond.get("name", "Unknown Condition"),
-                        "condition": condition
-                    })
-            
-            if isinstance(default, dict) and default.get("next") == target_block_id:
-                pointing_blocks.append({
-                    "block_id": block_id,
-                    "block": block,
-                    "type": "default",
-                    "name": default.get("name", "Default"),
-                    "condition": None
-                })
-        
-        if not pointing_blocks:
+        """查找指向目标block的条件链（按block缓存）"""
+        if target_block_id in self._condition_chain_cache:
+            return self._condition_chain_cache[target_block_id]
+        
+        # 找到所有指向这个block的block，使用第一个指向的block来构建条件链
+        pointing_edges = self._incoming_edges.get(target_block_id)
+        if not pointing_edges:
+            self._condition_chain_cache[target_block_id] = None
             return None
         
-        # 使用第一个指向的block来构建条件链
-        pb = pointing_blocks[0]
-        
-        # 递归向上查找条件链
-        def find_parent_conditions(target_block_id, visited=None, max_depth=20):
-            if visited is None:
-                visited = set()
-            if target_block_id in visited or max_depth <= 0:
-                return []
-            visited.add(target_block_id)
-            
-            parent_conditions = []
-            for block_id, block in blocks_dict.items():
-                outcomes = block.get("outcomes", {})
-                if not isinstance(outcomes, dict):
-                    continue
-                
-                conditional = outcomes.get("conditional", [])
-                for cond in conditional:
-                    if cond.get("next") == target_block_id:
-                        condition = cond.get("condition", {})
-                        parent_cond = {
-                            "name": cond.get("name", "Unknown Condition"),
-                            "condition": condition,
-                            "block_id": block_id,
-                            "block_type": block.get("type"),
-                            "is_default": False
-                        }
-                        parent_conditions.append(parent_cond)
-                        grandparents = find_parent_conditions(block_id, visited, max_depth - 1)
-                        parent_conditions.extend(grandparents)
-                
-                default = outcomes.get("default", {})
-                if isinstance(default, dict) and default.get("next") == target_block_id:
-                    network_condition_name = None
-                    for cond in conditional:
-                        cond_name = cond.get("name", "")
-                        if "network" in cond_name.lower() and "amex" in cond_name.lower():
-                            if "!=" in cond_name or "!=" in cond_name:
-                                network_condition_name = "Network=Amex"
-                            break
-                    
-                    parent_cond = {
-                        "name": network_condition_name if network_condition_name else (default.get("name", "Default")),
-                        "condition": None,
-                        "block_id": block_id,
-                        "block_type": block.get("type"),
-                        "is_default": True,
-                        "parent_block": block
-                    }
-                    parent_conditions.append(parent_cond)
-                    grandparents = find_parent_conditions(block_id, visited, max_depth - 1)
-                    parent_conditions.extend(grandparents)
-            
-            return parent_conditions
+        pb_edge = pointing_edges[0]
+        pb_block_id, pb_block, pb_is_default, pb_outcome = pb_edge.source, pb_edge.source_block, pb_edge.is_default, pb_edge.outcome
+        if pb_is_default:
+            pb_name = pb_outcome.get("name", "Default")
+            pb_condition = None
+        else:
+            pb_name = pb_outcome.get("name", "Unknown Condition")
+            pb_condition = pb_outcome.get("condition", {})
         
-        parent_conditions = find_parent_conditions(pb["block_id"])
+        # 向上查找条件链
+        parent_conditions = self._find_parent_conditions(pb_block_id)
         
         # 构建条件信息
         # 如果pb是default类型，需要从block的conditional中提取Network条件
-        if pb["type"] == "default" and pb["block"]:
-            block = pb["block"]
-            outcomes = block.get("outcomes", {})
-            if isinstance(outcomes, dict):
-                conditional = outcomes.get("conditional", [])
-                for cond in conditional:
-                    cond_name = cond.get("name", "")
-                    if "network" in cond_name.lower() and "amex" in cond_name.lower():
-                        # 如果default对应的是"Network!=Amex"，应该识别为"Network=Amex"
-                        if "!=" in cond_name or "NOT" in cond_name.upper():
-                            # 将Network条件添加到parent_conditions的开头
-                            parent_conditions.insert(0, {
-                                "name": "Network=Amex",
-                                "condition": cond.get("condition"),
-                                "block_id": pb["block_id"],
-                                "block_type": block.get("type"),
-                                "is_default": True
-                            })
-                        break
+        if pb_is_default and pb_block:
+            # 如果default对应的是"Network!=Amex"，应该识别为"Network=Amex"
+            amex_chain_link = self._traversal.block_facts[pb_block_id].amex_chain_link
+            if amex_chain_link:
+                # 将Network条件添加到parent_conditions的开头（不修改共享的条件链）
+                parent_conditions = (amex_chain_link,) + parent_conditions
         
         condition_info = {
-            "name": pb["name"],
-            "expression": self._extract_condition_expression(pb["condition"]) if pb["condition"] else "",
-            "condition": pb["condition"],
-            "block_id": pb["block_id"],
-            "block": pb["block"],
+            "name": pb_name,
+            "expression": self._extract_condition_expression(pb_condition) if pb_condition else "",
+            "condition": pb_condition,
+            "block_id": pb_block_id,
+            "block": pb_block,
             "parent_conditions": parent_conditions
         }
         
@@ -665,233 +1050,25 @@ class WorkflowParser:
                 if "Network=Amex" not in condition_info["name"]:
                     condition_info["name"] = " -> ".join(parent_names + [condition_info["name"]])
         
+        self._condition_chain_cache[target_block_id] = condition_info
         return condition_info
     
-    def _find_all_currency_combinations(self, blocks_dict: Dict) -> List[Dict]:
-        """从TRIGGER开始，遍历所有路径，找到所有币种和支付方式的组合（包括没有分量的）"""
-        combinations = []
-        
-        # 找到TRIGGER block
-        trigger_blocks = [b for b in blocks_dict.values() if b.get("type") == "TRIGGER"]
-        if not trigger_blocks:
-            return combinations
-        
-        def traverse_and_collect(block_id: str, current_path: List[Dict], visited: set = None, depth: int = 0):
-            """递归遍历blocks，收集所有币种和支付方式的组合"""
-            if visited is None:
-                visited = set()
-            if block_id in visited or depth > 30:
-                return
-            visited.add(block_id)
-            
-            block = blocks_dict.get(block_id)
-            if not block:
-                return
-            
-            block_type = block.get("type")
-            outcomes = block.get("outcomes", {})
-            
-            if not isinstance(outcomes, dict):
-                return
-            
-            # 提取当前路径中的信息
-            current_info = {
-                "payment_method": "UNKNOWN",
-                "currency": "其他",
-                "network_value": "",
-                "network_tokenized": "",
-                "condition_info": None,
-                "path": current_path.copy()
-            }
-            
-            # 从当前路径中提取支付方式
-            for path_item in current_path:
-                if path_item.get("payment_method") and path_item["payment_method"] != "UNKNOWN":
-                    current_info["payment_method"] = path_item["payment_method"]
-            
-            # 检查当前block的条件，提取币种和支付方式信息
-            conditional = outcomes.get("conditional", [])
-            for cond in conditional:
-                cond_name = cond.get("name", "")
-                cond_data = cond.get("condition", {})
-                
-                # 提取币种信息
-                if "currency" in cond_name.lower() or "币种" in cond_name.lower():
-                    import re
-                    excluded_words = {'ALL', 'AND', 'THE', 'FOR', 'NOT', 'IN', 'IS', 'TO', 'OF', 'ON', 'AT', 'BY', 
-                                     'BIN', 'NET', 'OUT', 'PAY', 'API', 'URL', 'ID', 'KEY', 'TAG', 'LOG', 'ERR'}
-                    currencies = re.findall(r'\b([A-Z]{3})\b', cond_name.upper())
-                    currencies = [c for c in currencies if c not in excluded_words]
-                    if currencies:
-                        current_info["currency"] = '/'.join(currencies)
-                
-                # 提取支付方式信息
-                if cond_data:
-                    operands = cond_data.get("operands", [])
-                    for op in operands:
-                        expression = op.get("expression", {})
-                        if isinstance(expression, dict):
-                            path = expression.get("path", "")
-                            if "paymentMethodType" in path or "payment_method" in path.lower():
-                                operand_value = op.get("operand", {})
-                                if isinstance(operand_value, dict):
-                                    value = operand_value.get("value") or operand_value.get("label", "")
-                                    if value:
-                                        value_upper = str(value).upper()
-                                        if "GOOGLE" in value_upper or "GP" in value_upper or "GOOGLE_PAY" in value_upper:
-                                            current_info["payment_method"] = "GP"
-                                        elif "APPLE" in value_upper or "AP" in value_upper or "APPLE_PAY" in value_upper:
-                                            current_info["payment_method"] = "AP"
-                                        elif "CARD" in value_upper or "CARD_PAYMENT" in value_upper:
-                                            current_info["payment_method"] = "CARD"
-                
-                # 提取Network Tokenized信息
-                if "tokenised" in cond_name.lower() or "tokenized" in cond_name.lower():
-                    if "NOT" in cond_name.upper():
-                        current_info["network_tokenized"] = "False"
-                    else:
-                        current_info["network_tokenized"] = "TRUE"
-                
-                # 提取Network信息
-                if "network" in cond_name.lower() and "amex" in cond_name.lower():
-                    if "!=" in cond_name or "NOT" in cond_name.upper():
-                        current_info["network_value"] = "非Amex"
-                    else:
-                        current_info["network_value"] = "Amex"
-                
-                # 继续遍历
-                next_id = cond.get("next")
-                if next_id:
-                    new_path = current_path + [current_info.copy()]
-                    traverse_and_collect(next_id, new_path, visited.copy(), depth + 1)
-            
-            # 检查default outcome
-            default = outcomes.get("default", {})
-            if isinstance(default, dict):
-                next_id = default.get("next")
-                if next_id:
-                    # 检查是否有Network Tokenized相关的conditional
-                    for cond in conditional:
-                        cond_name = cond.get("name", "")
-                        if "tokenised" in cond_name.lower() or "tokenized" in cond_name.lower():
-                            if "NOT" in cond_name.upper():
-                                current_info["network_tokenized"] = "TRUE"  # default对应TRUE
-                            else:
-                                current_info["network_tokenized"] = "False"  # default对应False
-                    
-                    # 检查是否有Network相关的conditional
-                    for cond in conditional:
-                        cond_name = cond.get("name", "")
-                        if "network" in cond_name.lower() and "amex" in cond_name.lower():
-                            if "!=" in cond_name or "NOT" in cond_name.upper():
-                                current_info["network_value"] = "Amex"  # default对应Amex
-                    
-                    new_path = current_path + [current_info.copy()]
-                    traverse_and_collect(next_id, new_path, visited.copy(), depth + 1)
-            
-            # 如果是ROUTE_SPLITTER节点，记录这个组合（但已经在splits中处理了，这里主要是找没有分量的）
-            # 如果是其他类型的节点，也记录币种组合
-            if block_type != "ROUTE_SPLITTER":
-                # 检查是否有币种信息
-                if current_info["currency"] != "其他" or current_info["payment_method"] != "UNKNOWN":
-                    # 创建条件信息
-                    condition_info = {
-                        "name": " -> ".join([p.get("name", "") for p in current_path[-5:] if p.get("name")]),
-                        "condition": None,
-                        "parent_conditions": []
-                    }
-                    current_info["condition_info"] = condition_info
-                    current_info["id"] = block_id
-                    combinations.append(current_info.copy())
-        
-        # 从所有TRIGGER block开始遍历
-        for trigger_block in trigger_blocks:
-            trigger_id = trigger_block.get("id")
-            traverse_and_collect(trigger_id, [], set(), 0)
-        
-        return combinations
-    
-    def _build_split_payment_method_map(self, blocks_dict: Dict) -> Dict[str, str]:
-        """从TRIGGER开始构建split到支付方式的映射"""
-        split_pm_map = {}
-        
-        # 找到TRIGGER block
-        trigger_blocks = [b for b in blocks_dict.values() if b.get("type") == "TRIGGER"]
-        if not trigger_blocks:
-            return split_pm_map
-        
-        def traverse_blocks(block_id: str, current_payment_method: str = "UNKNOWN", visited: set = None):
-            """递归遍历blocks，追踪支付方式"""
-            if visited is None:
-                visited = set()
-            if block_id in visited:
-                return
-            visited.add(block_id)
-            
-            block = blocks_dict.get(block_id)
-            if not block:
-                return
-            
-            block_type = block.get("type")
-            
-            # 如果是split，记录支付方式
-            if block_type == "ROUTE_SPLITTER":
-                split_pm_map[block_id] = current_payment_method
-            
-            # 检查outcomes
-            outcomes = block.get("outcomes")
-            if not outcomes or not isinstance(outcomes, dict):
-                return
-            
-            # 检查conditional outcomes
-            conditional = outcomes.get("conditional", [])
-            for cond in conditional:
-                cond_data = cond.get("condition", {})
-                next_id = cond.get("next")
-                
-                # 检查条件中是否有支付方式信息
-                pm = current_payment_method
-                if cond_data:
-                    operands = cond_data.get("operands", [])
-                    for op in operands:
-                        expression = op.get("expression", {})
-                        if isinstance(expression, dict):
-                            path = expression.get("path", "")
-                            if "paymentMethodType" in path or "payment_method" in path.lower():
-                                operand_value = op.get("operand", {})
-                                if isinstance(operand_value, dict):
-                                    value = operand_value.get("value") or operand_value.get("label", "")
-                                    if value:
-                                        value_upper = str(value).upper()
-                                        if "GOOGLE" in value_upper or "GP" in value_upper or "GOOGLE_PAY" in value_upper:
-                                            pm = "GP"
-                                        elif "APPLE" in value_upper or "AP" in value_upper or "APPLE_PAY" in value_upper:
-                                            pm = "AP"
-                                        elif "CARD" in value_upper or "CARD_PAYMENT" in value_upper:
-                                            pm = "CARD"
-                
-                if next_id:
-                    traverse_blocks(next_id, pm, visited)
-            
-            # 检查default outcome
-            default = outcomes.get("default", {})
-            if isinstance(default, dict):
-                next_id = default.get("next")
-                if next_id:
-                    traverse_blocks(next_id, current_payment_method, visited)
-        
-        # 从所有TRIGGER block开始遍历
-        for trigger_block in trigger_blocks:
-            trigger_id = trigger_block.get("id")
-            traverse_blocks(trigger_id)
-        
-        return split_pm_map
-    
     def _parse_split_block(self, split_block: Dict, blocks_dict: Dict) -> Optional[Dict]:
         """解析单个split block"""
         split_id = split_block.get("id")
         split_name = split_block.get("route_splitter_name", "Unknown Split")
         
+        # 查找连接到这个split的条件
+        condition_info = self._find_split_condition(split_id, blocks_dict)
+        
+        # 从条件中提取币种和支付方式信息
+        currency, payment_method = self._extract_currency_and_payment_method(condition_info, split_name)
+        
+        return self._build_split_info(split_block, condition_info, currency, payment_method)
+    
+    def _build_split_info(self, split_block: Dict, condition_info: Optional[Dict], currency: str,
+                          payment_method: str) -> Dict:
+        """由split block的分量和已提取的条件信息组装split信息"""
         # 获取split outcomes（即使为空也要解析）
         outcomes = split_block.get("outcomes", [])
         if not isinstance(outcomes, list):
@@ -908,15 +1085,9 @@ class WorkflowParser:
                 "next": outcome.get("next")
             })
         
-        # 查找连接到这个split的条件
-        condition_info = self._find_split_condition(split_id, blocks_dict)
-        
-        # 从条件中提取币种和支付方式信息
-        currency, payment_method = self._extract_currency_and_payment_method(condition_info, split_name)
-        
         split_info = {
-            "id": split_id,
-            "name": split_name,
+            "id": split_block.get("id"),
+            "name": split_block.get("route_splitter_name", "Unknown Split"),
             "routes": routes,
             "condition": condition_info,
             "total_percentage": sum(r["percentage"] for r in routes),
@@ -929,7 +1100,6 @@ class WorkflowParser:
     
     def _extract_currency_and_payment_method(self, condition_info: Optional[Dict], split_name: str) -> tuple[str, str]:
         """从条件信息中提取币种和支付方式"""
-        import re
         currency = "其他"
         payment_method = "UNKNOWN"
         
@@ -940,11 +1110,7 @@ class WorkflowParser:
                 # 从条件名称中提取币种（如 "Currency in USD/CAD" -> ["USD", "CAD"]）
                 if "currency" in condition_name.lower() or "币种" in condition_name:
                     # 匹配3个大写字母的币种代码，排除常见单词和非币种代码
-                    excluded_words = {'ALL', 'AND', 'THE', 'FOR', 'NOT', 'IN', 'IS', 'TO', 'OF', 'ON', 'AT', 'BY', 
-                                     'BIN', 'NET', 'OUT', 'PAY', 'API', 'URL', 'ID', 'KEY', 'TAG', 'LOG', 'ERR'}
-                    currencies = re.findall(r'\b([A-Z]{3})\b', condition_name.upper())
-                    # 过滤掉排除的单词
-                    currencies = [c for c in currencies if c not in excluded_words]
+                    currencies = tokenize_condition(condition_name).currency_codes
                     if currencies:
                         # 如果有多个币种，用/连接（与CSV格式一致）
                         currency = '/'.join(currencies)
@@ -1033,121 +1199,51 @@ class WorkflowParser:
     
     def _find_split_condition(self, split_id: str, blocks_dict: Dict) -> Optional[Dict]:
         """查找连接到split的条件，并向上查找条件链以获取完整信息"""
-        # 首先找到直接指向split的block
+        # 首先找到直接指向split的block：
+        # default outcome优先（取第一个），否则取最后一个带conditional的block中第一个指向split的条件
         direct_condition = None
-        for block_id, block in blocks_dict.items():
-            outcomes = block.get("outcomes")
-            if not outcomes or not isinstance(outcomes, dict):
-                continue
-            
-            # 检查conditional outcomes
-            conditional = outcomes.get("conditional", [])
-            for cond in conditional:
-                if cond.get("next") == split_id:
-                    # 提取条件信息
-                    condition = cond.get("condition", {})
-                    direct_condition = {
-                        "name": cond.get("name", "Unknown Condition"),
-                        "expression": self._extract_condition_expression(condition),
-                        "condition": condition,
-                        "block_id": block_id,
-                        "block": block
-                    }
-                    break
-            
-            # 也检查default outcome
-            default = outcomes.get("default", {})
-            if isinstance(default, dict) and default.get("next") == split_id:
+        matched_blocks = set()
+        for edge in self._incoming_edges.get(split_id, []):
+            block_id, block, outcome = edge.source, edge.source_block, edge.outcome
+            if edge.is_default:
                 direct_condition = {
-                    "name": default.get("name", "Default"),
+                    "name": outcome.get("name", "Default"),
                     "expression": "",
                     "condition": None,
                     "block_id": block_id,
                     "block": block
                 }
                 break
+            
+            if block_id in matched_blocks:
+                continue
+            matched_blocks.add(block_id)
+            
+            # 提取条件信息
+            condition = outcome.get("condition", {})
+            direct_condition = {
+                "name": outcome.get("name", "Unknown Condition"),
+                "expression": self._extract_condition_expression(condition),
+                "condition": condition,
+                "block_id": block_id,
+                "block": block
+            }
         
         if not direct_condition:
             return None
         
-        # 递归向上查找条件链，寻找支付方式信息
-        def find_parent_conditions(target_block_id, visited=None, max_depth=20, is_default_path=False):
-            """递归查找指向目标block的所有父级条件"""
-            if visited is None:
-                visited = set()
-            if target_block_id in visited or max_depth <= 0:
-                return []
-            visited.add(target_block_id)
-            
-            parent_conditions = []
-            for block_id, block in blocks_dict.items():
-                outcomes = block.get("outcomes")
-                if not outcomes or not isinstance(outcomes, dict):
-                    continue
-                
-                # 检查是否指向目标block
-                conditional = outcomes.get("conditional", [])
-                for cond in conditional:
-                    if cond.get("next") == target_block_id:
-                        condition = cond.get("condition", {})
-                        parent_cond = {
-                            "name": cond.get("name", "Unknown Condition"),
-                            "condition": condition,
-                            "block_id": block_id,
-                            "block_type": block.get("type"),
-                            "is_default": False
-                        }
-                        parent_conditions.append(parent_cond)
-                        # 递归查找指向这个block的条件
-                        grandparents = find_parent_conditions(block_id, visited, max_depth - 1, False)
-                        parent_conditions.extend(grandparents)
-                
-                default = outcomes.get("default", {})
-                if isinstance(default, dict) and default.get("next") == target_block_id:
-                    # 检查这个block是否有Network相关的条件
-                    network_condition_name = None
-                    for cond in conditional:
-                        cond_name = cond.get("name", "")
-                        if "network" in cond_name.lower() and "amex" in cond_name.lower():
-                            # 如果conditional是"Network!=Amex"，那么default就是"Network=Amex"
-                            if "!=" in cond_name or "!=" in cond_name:
-                                network_condition_name = "Network=Amex"
-                            break
-                    
-                    parent_cond = {
-                        "name": network_condition_name if network_condition_name else (default.get("name", "Default")),
-                        "condition": None,
-                        "block_id": block_id,
-                        "block_type": block.get("type"),
-                        "is_default": True,
-                        "parent_block": block  # 保存父级block以便检查条件
-                    }
-                    parent_conditions.append(parent_cond)
-                    grandparents = find_parent_conditions(block_id, visited, max_depth - 1, True)
-                    parent_conditions.extend(grandparents)
-            
-            return parent_conditions
-        
         condition_block_id = direct_condition["block_id"]
         # 检查direct_condition是否来自default outcome
         is_default = direct_condition.get("name") == "Default"
-        parent_conditions = find_parent_conditions(condition_block_id, is_default_path=is_default)
+        parent_conditions = self._find_parent_conditions(condition_block_id)
         
         # 如果direct_condition来自default outcome，检查父级block是否有Network相关的条件
         if is_default:
-            direct_block = direct_condition.get("block")
-            if direct_block:
-                outcomes = direct_block.get("outcomes", {})
-                if isinstance(outcomes, dict):
-                    conditional = outcomes.get("conditional", [])
-                    for cond in conditional:
-                        cond_name = cond.get("name", "")
-                        if "network" in cond_name.lower() and "amex" in cond_name.lower():
-                            # 如果conditional是"Network!=Amex"，那么default就是"Network=Amex"
-                            if "!=" in cond_name or "!=" in cond_name:
-                                # 在条件链的开头添加"Network=Amex"
-                                direct_condition["name"] = "Network=Amex -> " + direct_condition["name"]
-                                break
+            facts = self._traversal.block_facts.get(condition_block_id)
+            # 如果conditional是"Network!=Amex"，那么default就是"Network=Amex"
+            if facts and facts.has_amex_not_equal:
+                # 在条件链的开头添加"Network=Amex"
+                direct_condition["name"] = "Network=Amex -> " + direct_condition["name"]
         
         # 合并所有条件信息（包括父级条件）
         if parent_conditions:
@@ -1242,254 +1338,238 @@ class WorkflowParser:
             'Airwallex': 40
         }, ...]
         """
-        csv_rows = []
-        payment_method_reverse_mapping = {
-            'CARD': 'Card',
-            'AP': 'Apple Pay',
-            'GP': 'Google Pay'
-        }
+        return self.get_csv_columns().rows()
+    
+    def get_csv_rows(self) -> CsvColumns:
+        """
+        按split推导CSV行并按币种拆分（未去重、未排序），每个split只推导一次行属性；
+        CsvColumns.split_indexes为每行对应的split在self.splits中的序号
+        """
+        split_rows = []
+        for index, split in enumerate(self.splits):
+            row = self._split_csv_row(split)
+            if row is not None:
+                split_rows.append((index, row))
+        return expand_csv_rows(split_rows)
+    
+    def get_csv_columns(self, rows: Optional[CsvColumns] = None) -> CsvColumns:
+        """
+        按列构建去重、排序后的CSV数据，
+        可通过rows()转换为get_csv_format_data的行格式，或通过to_dataframe()生成pandas DataFrame
         
-        for split in self.splits:
-            payment_method = split.get("payment_method", "UNKNOWN")
-            currency = split.get("currency", "其他")
-            routes = split.get("routes", [])
-            condition_info = split.get("condition", {})
-            
-            # 从条件名称中提取Network Tokenized？和Adaptive 3DS信息
+        去重基于所有关键字段；排序按Network（非Amex在前，Amex在后）、币种、Network Tokenized（TRUE在前，False在后）
+        
+        Args:
+            rows: 已由get_csv_rows生成的行（与决策表编译共用时传入，避免重复推导）
+        """
+        return build_csv_columns(rows if rows is not None else self.get_csv_rows(), CSV_KEY_FIELDS)
+    
+    def _split_csv_row(self, split: Dict) -> Optional[Dict]:
+        """
+        推导单个split对应的CSV行（币种未拆分），支付方式无法确定时返回None
+        """
+        payment_method = split.get("payment_method", "UNKNOWN")
+        currency = split.get("currency", "其他")
+        routes = split.get("routes", [])
+        condition_info = split.get("condition", {})
+        
+        # 从条件名称中提取Network Tokenized？和Network（即使payment_method是UNKNOWN），添加split时已解析过
+        cached_network = self._split_network.get(id(split))
+        if cached_network is not None:
+            network_value, network_tokenized = cached_network
+        else:
             network_tokenized = self._extract_network_tokenized(condition_info)
-            # 先尝试提取Network（即使payment_method是UNKNOWN）
             network_value = self._extract_network(condition_info, payment_method)
-            
-            # 如果Network提取失败，尝试从条件信息中检查是否有Amex相关线索
-            # 这个方法对所有情况都适用，不仅仅是支付方式未知的情况
-            if not network_value and condition_info:
-                condition_name = condition_info.get("name", "")
-                if condition_name:
-                    condition_name_upper = condition_name.upper()
-                    # 检查条件名称中是否有Amex相关的内容
-                    if "AMEX" in condition_name_upper and "NETWORK" in condition_name_upper:
-                        # 检查是否有"Network=Amex"或"Network=AMEX"
-                        if "Network=Amex" in condition_name or "NETWORK=AMEX" in condition_name_upper:
-                            network_value = "Amex"
-                        elif "!=" in condition_name_upper or "NOT" in condition_name_upper:
-                            # 检查后面是否有"Default"，如果有，说明这是default分支，应该是Amex
-                            segments = [s.strip() for s in condition_name.split("->") if s.strip()]
-                            for i, segment in enumerate(segments):
-                                if "NETWORK" in segment.upper() and "AMEX" in segment.upper() and ("!=" in segment or "NOT" in segment.upper()):
-                                    if i + 1 < len(segments) and "DEFAULT" in segments[i + 1].upper():
-                                        network_value = "Amex"
-                                        break
-                            if not network_value:
-                                network_value = "非Amex"
-                        else:
-                            network_value = "Amex"
-                # 也检查父级条件
-                if not network_value:
-                    parent_conditions = condition_info.get("parent_conditions", [])
-                    for parent in parent_conditions:
-                        parent_name = parent.get("name", "")
-                        if parent_name:
-                            parent_name_upper = parent_name.upper()
-                            if "AMEX" in parent_name_upper and "NETWORK" in parent_name_upper:
-                                # 检查是否有"Network=Amex"
-                                if "Network=Amex" in parent_name or "NETWORK=AMEX" in parent_name_upper:
-                                    network_value = "Amex"
-                                elif "!=" in parent_name_upper or "NOT" in parent_name_upper:
-                                    # 检查后面是否有"Default"
-                                    segments = [s.strip() for s in parent_name.split("->") if s.strip()]
-                                    for i, segment in enumerate(segments):
-                                        if "NETWORK" in segment.upper() and "AMEX" in segment.upper() and ("!=" in segment or "NOT" in segment.upper()):
-                                            if i + 1 < len(segments) and "DEFAULT" in segments[i + 1].upper():
-                                                network_value = "Amex"
-                                                break
-                                    if not network_value:
-                                        network_value = "非Amex"
-                                else:
+        
+        # 如果Network提取失败，尝试从条件信息中检查是否有Amex相关线索
+        # 这个方法对所有情况都适用，不仅仅是支付方式未知的情况
+        if not network_value and condition_info:
+            condition_name = condition_info.get("name", "")
+            if condition_name:
+                condition_name_upper = condition_name.upper()
+                # 检查条件名称中是否有Amex相关的内容
+                if "AMEX" in condition_name_upper and "NETWORK" in condition_name_upper:
+                    # 检查是否有"Network=Amex"或"Network=AMEX"
+                    if "Network=Amex" in condition_name or "NETWORK=AMEX" in condition_name_upper:
+                        network_value = "Amex"
+                    elif "!=" in condition_name_upper or "NOT" in condition_name_upper:
+                        # 检查后面是否有"Default"，如果有，说明这是default分支，应该是Amex
+                        segments = [s.strip() for s in condition_name.split("->") if s.strip()]
+                        for i, segment in enumerate(segments):
+                            if "NETWORK" in segment.upper() and "AMEX" in segment.upper() and ("!=" in segment or "NOT" in segment.upper()):
+                                if i + 1 < len(segments) and "DEFAULT" in segments[i + 1].upper():
                                     network_value = "Amex"
-                                if network_value:
                                     break
-            
-            # 如果支付方式未知，尝试根据Network Tokenized和Network信息推断支付方式
-            # 注意：由于所有split的条件链都以trigger中的GOOGLE_PAY结尾，需要根据其他信息推断
-            if payment_method == "UNKNOWN":
-                # 根据期望输出的规律推断支付方式：
-                # 1. 如果有Network Tokenized信息（TRUE或False），且Network是"非Amex"或"Amex"，通常是Google Pay
-                # 2. 如果有Network信息（Amex或Mastercard Visa JCB）且Network Tokenized为空，通常是Card
-                # 3. 如果没有Network信息，通常是Apple Pay
-                # 但是，由于所有split都有Network Tokenized信息，需要更复杂的规则
-                # 实际上，应该根据条件链中的支付方式条件来推断，而不是根据Network Tokenized
-                # 这里暂时保持UNKNOWN，让后续逻辑处理
-                pass
-            
-            # 判断是否为"无分量"情况：routes为空或所有percentage为0
-            is_no_split = False
-            if not routes or all(r.get("percentage", 0) == 0 for r in routes):
-                is_no_split = True
-            
-            # 如果支付方式未知，根据Network信息推断
-            if payment_method == "UNKNOWN":
-                if network_value == "Amex":
-                    # Network是Amex，推断为Card
-                    payment_method = "CARD"
-                elif network_tokenized:
-                    # 有Network Tokenized信息，推断为Google Pay
-                    payment_method = "GP"
-                elif network_value:
-                    # 有Network信息但没有Network Tokenized，推断为Card
-                    payment_method = "CARD"
-                else:
-                    # 没有Network信息，推断为Apple Pay
-                    payment_method = "AP"
-            
-            # 如果支付方式仍然未知，跳过（这种情况不应该发生）
-            if payment_method == "UNKNOWN":
-                continue
-            
-            # 从routes中提取分量（Adyen, Stripe, Airwallex）
-            adyen = 0
-            stripe = 0
-            airwallex = 0
-            
-            # 尝试从route名称匹配
-            for route in routes:
-                route_name = (route.get("name", "") or "").lower()
-                percentage = route.get("percentage", 0)
-                
-                if "adyen" in route_name or "ady" in route_name:
-                    adyen = percentage
-                elif "stripe" in route_name or "str" in route_name:
-                    stripe = percentage
-                elif "airwallex" in route_name or "awx" in route_name or "air" in route_name:
-                    airwallex = percentage
-            
-            # 如果无法从名称匹配，按顺序分配（假设前三个route分别是Adyen, Stripe, Airwallex）
-            if adyen == 0 and stripe == 0 and airwallex == 0 and len(routes) >= 3:
-                adyen = routes[0].get("percentage", 0)
-                stripe = routes[1].get("percentage", 0)
-                airwallex = routes[2].get("percentage", 0)
-            elif len(routes) == 3:
-                # 如果只有3个routes，按顺序分配
-                adyen = routes[0].get("percentage", 0)
-                stripe = routes[1].get("percentage", 0)
-                airwallex = routes[2].get("percentage", 0)
-            
-            # 从条件名称中提取Adaptive 3DS信息（Network和Network Tokenized已在前面提取）
-            adaptive_3ds = self._extract_adaptive_3ds(condition_info, payment_method, network_tokenized)
-            
-            display_payment_method = payment_method_reverse_mapping.get(payment_method, payment_method)
-            first_currency = currency.split('/')[0] if '/' in currency else currency
-            
-            # 根据是否无分量设置Adyen、Stripe、Airwallex的值
-            if is_no_split:
-                adyen_display = '无分量'
-                stripe_display = '无分量'
-                airwallex_display = '无分量'
+                        if not network_value:
+                            network_value = "非Amex"
+                    else:
+                        network_value = "Amex"
+            # 也检查父级条件
+            if not network_value:
+                parent_conditions = condition_info.get("parent_conditions", [])
+                for parent in parent_conditions:
+                    parent_name = parent.get("name", "")
+                    if parent_name:
+                        parent_name_upper = parent_name.upper()
+                        if "AMEX" in parent_name_upper and "NETWORK" in parent_name_upper:
+                            # 检查是否有"Network=Amex"
+                            if "Network=Amex" in parent_name or "NETWORK=AMEX" in parent_name_upper:
+                                network_value = "Amex"
+                            elif "!=" in parent_name_upper or "NOT" in parent_name_upper:
+                                # 检查后面是否有"Default"
+                                segments = [s.strip() for s in parent_name.split("->") if s.strip()]
+                                for i, segment in enumerate(segments):
+                                    if "NETWORK" in segment.upper() and "AMEX" in segment.upper() and ("!=" in segment or "NOT" in segment.upper()):
+                                        if i + 1 < len(segments) and "DEFAULT" in segments[i + 1].upper():
+                                            network_value = "Amex"
+                                            break
+                                if not network_value:
+                                    network_value = "非Amex"
+                            else:
+                                network_value = "Amex"
+                            if network_value:
+                                break
+        
+        # 如果支付方式未知，尝试根据Network Tokenized和Network信息推断支付方式
+        # 注意：由于所有split的条件链都以trigger中的GOOGLE_PAY结尾，需要根据其他信息推断
+        if payment_method == "UNKNOWN":
+            # 根据期望输出的规律推断支付方式：
+            # 1. 如果有Network Tokenized信息（TRUE或False），且Network是"非Amex"或"Amex"，通常是Google Pay
+            # 2. 如果有Network信息（Amex或Mastercard Visa JCB）且Network Tokenized为空，通常是Card
+            # 3. 如果没有Network信息，通常是Apple Pay
+            # 但是，由于所有split都有Network Tokenized信息，需要更复杂的规则
+            # 实际上，应该根据条件链中的支付方式条件来推断，而不是根据Network Tokenized
+            # 这里暂时保持UNKNOWN，让后续逻辑处理
+            pass
+        
+        # 判断是否为"无分量"情况：routes为空或所有percentage为0
+        is_no_split = False
+        if not routes or all(r.get("percentage", 0) == 0 for r in routes):
+            is_no_split = True
+        
+        # 如果支付方式未知，根据Network信息推断
+        if payment_method == "UNKNOWN":
+            if network_value == "Amex":
+                # Network是Amex，推断为Card
+                payment_method = "CARD"
+            elif network_tokenized:
+                # 有Network Tokenized信息，推断为Google Pay
+                payment_method = "GP"
+            elif network_value:
+                # 有Network信息但没有Network Tokenized，推断为Card
+                payment_method = "CARD"
             else:
-                adyen_display = int(adyen) if adyen > 0 else ''
-                stripe_display = int(stripe) if stripe > 0 else ''
-                airwallex_display = int(airwallex) if airwallex > 0 else ''
-            
-            # 根据支付方式设置默认值（参考write_csv_config的逻辑）
-            if payment_method == 'AP':  # Apple Pay
-                network_display = network_value if network_value else ''
-                row = {
-                    '支付方式': display_payment_method,
-                    'Network': network_display,
-                    '币种': currency,
-                    '开启Affinity': '是' if first_currency != '其他' else '否',
-                    'Adaptive 3DS': adaptive_3ds if adaptive_3ds else '否',
-                    '备注': '',
-                    'Network Tokenized？': network_tokenized if network_tokenized else '',
-                    'Adyen': adyen_display,
-                    'Stripe': stripe_display,
-                    'Airwallex': airwallex_display
-                }
-                csv_rows.extend(self._expand_currency_rows(row))
-                
-            elif payment_method == 'GP':  # Google Pay
-                if not network_value:
-                    # 默认按照CSV逻辑：未指定时使用非Amex
-                    network_value = '非Amex'
-                row = {
-                    '支付方式': display_payment_method,
-                    'Network': network_value,
-                    '币种': currency,
-                    '开启Affinity': '是',
-                    'Adaptive 3DS': adaptive_3ds if adaptive_3ds else '否',
-                    '备注': '',
-                    'Network Tokenized？': network_tokenized if network_tokenized else 'TRUE',
-                    'Adyen': adyen_display,
-                    'Stripe': stripe_display,
-                    'Airwallex': airwallex_display
-                }
-                csv_rows.extend(self._expand_currency_rows(row))
-                
-            elif payment_method == 'CARD':  # Card
-                network_display = network_value if network_value else 'Mastercard Visa JCB'
-                row = {
-                    '支付方式': display_payment_method,
-                    'Network': network_display,
-                    '币种': currency,
-                    '开启Affinity': '是',
-                    'Adaptive 3DS': adaptive_3ds if adaptive_3ds else '部分开启',
-                    '备注': '',
-                    'Network Tokenized？': network_tokenized if network_tokenized else '',
-                    'Adyen': adyen_display,
-                    'Stripe': stripe_display,
-                    'Airwallex': airwallex_display
-                }
-                csv_rows.extend(self._expand_currency_rows(row))
-        
-        # 去重：基于所有关键字段
-        seen = set()
-        unique_rows = []
-        for row in csv_rows:
-            # 创建唯一标识
-            key = (
-                row.get('支付方式', ''),
-                row.get('Network', ''),
-                row.get('币种', ''),
-                row.get('Network Tokenized？', ''),
-                row.get('开启Affinity', ''),
-                row.get('Adaptive 3DS', ''),
-                row.get('Adyen', ''),
-                row.get('Stripe', ''),
-                row.get('Airwallex', '')
-            )
-            if key not in seen:
-                seen.add(key)
-                unique_rows.append(row)
-        
-        # 排序：按照非Amex-Amex的顺序（非Amex在前，Amex在后）
-        def sort_key(row):
-            network = row.get('Network', '')
-            currency = row.get('币种', '')
-            nt = row.get('Network Tokenized？', '')
-            
-            # 第一优先级：Network（非Amex在前，Amex在后）
-            network_order = 0 if network == '非Amex' else 1 if network == 'Amex' else 2
+                # 没有Network信息，推断为Apple Pay
+                payment_method = "AP"
+        
+        # 如果支付方式仍然未知，跳过（这种情况不应该发生）
+        if payment_method == "UNKNOWN":
+            return None
+        
+        # 从routes中提取分量（Adyen, Stripe, Airwallex）
+        adyen = 0
+        stripe = 0
+        airwallex = 0
+        
+        # 尝试从route名称匹配
+        for route in routes:
+            route_name = (route.get("name", "") or "").lower()
+            percentage = route.get("percentage", 0)
             
-            # 第二优先级：币种（按字母顺序）
-            currency_order = currency
+            if "adyen" in route_name or "ady" in route_name:
+                adyen = percentage
+            elif "stripe" in route_name or "str" in route_name:
+                stripe = percentage
+            elif "airwallex" in route_name or "awx" in route_name or "air" in route_name:
+                airwallex = percentage
+        
+        # 如果无法从名称匹配，按顺序分配（假设前三个route分别是Adyen, Stripe, Airwallex）
+        if adyen == 0 and stripe == 0 and airwallex == 0 and len(routes) >= 3:
+            adyen = routes[0].get("percentage", 0)
+            stripe = routes[1].get("percentage", 0)
+            airwallex = routes[2].get("percentage", 0)
+        elif len(routes) == 3:
+            # 如果只有3个routes，按顺序分配
+            adyen = routes[0].get("percentage", 0)
+            stripe = routes[1].get("percentage", 0)
+            airwallex = routes[2].get("percentage", 0)
+        
+        # 从条件名称中提取Adaptive 3DS信息（Network和Network Tokenized已在前面提取）
+        adaptive_3ds = self._extract_adaptive_3ds(condition_info, payment_method, network_tokenized)
+        
+        display_payment_method = PAYMENT_METHOD_DISPLAY_NAMES.get(payment_method, payment_method)
+        first_currency = currency.split('/')[0] if '/' in currency else currency
+        
+        # 根据是否无分量设置Adyen、Stripe、Airwallex的值
+        if is_no_split:
+            adyen_display = '无分量'
+            stripe_display = '无分量'
+            airwallex_display = '无分量'
+        else:
+            adyen_display = int(adyen) if adyen > 0 else ''
+            stripe_display = int(stripe) if stripe > 0 else ''
+            airwallex_display = int(airwallex) if airwallex > 0 else ''
+        
+        # 根据支付方式设置默认值（参考write_csv_config的逻辑）
+        if payment_method == 'AP':  # Apple Pay
+            network_display = network_value if network_value else ''
+            row = {
+                '支付方式': display_payment_method,
+                'Network': network_display,
+                '币种': currency,
+                '开启Affinity': '是' if first_currency != '其他' else '否',
+                'Adaptive 3DS': adaptive_3ds if adaptive_3ds else '否',
+                '备注': '',
+                'Network Tokenized？': network_tokenized if network_tokenized else '',
+                'Adyen': adyen_display,
+                'Stripe': stripe_display,
+                'Airwallex': airwallex_display
+            }
+            return row
             
-            # 第三优先级：Network Tokenized（TRUE在前，False在后）
-            nt_order = 0 if nt == 'TRUE' else 1 if nt == 'False' else 2
+        elif payment_method == 'GP':  # Google Pay
+            if not network_value:
+                # 默认按照CSV逻辑：未指定时使用非Amex
+                network_value = '非Amex'
+            row = {
+                '支付方式': display_payment_method,
+                'Network': network_value,
+                '币种': currency,
+                '开启Affinity': '是',
+                'Adaptive 3DS': adaptive_3ds if adaptive_3ds else '否',
+                '备注': '',
+                'Network Tokenized？': network_tokenized if network_tokenized else 'TRUE',
+                'Adyen': adyen_display,
+                'Stripe': stripe_display,
+                'Airwallex': airwallex_display
+            }
+            return row
             
-            return (network_order, currency_order, nt_order)
-        
-        unique_rows.sort(key=sort_key)
+        elif payment_method == 'CARD':  # Card
+            network_display = network_value if network_value else 'Mastercard Visa JCB'
+            row = {
+                '支付方式': display_payment_method,
+                'Network': network_display,
+                '币种': currency,
+                '开启Affinity': '是',
+                'Adaptive 3DS': adaptive_3ds if adaptive_3ds else '部分开启',
+                '备注': '',
+                'Network Tokenized？': network_tokenized if network_tokenized else '',
+                'Adyen': adyen_display,
+                'Stripe': stripe_display,
+                'Airwallex': airwallex_display
+            }
+            return row
         
-        return unique_rows
+        return None
     
     def _split_split_info_by_currency(self, split_info: Dict) -> List[Dict]:
         """将split信息按币种拆分为多条记录"""
-        import re
         currency_value = split_info.get("currency")
         if not currency_value:
             return [split_info]
         
-        codes = re.findall(r'[A-Z]{3}', str(currency_value).upper())
-        codes = [code for code in codes if code]
+        codes = split_currency_codes(str(currency_value))
         
         if not codes:
             return [split_info]
@@ -1501,26 +1581,6 @@ class WorkflowParser:
             expanded.append(new_info)
         return expanded
     
-    def _expand_currency_rows(self, row: Dict) -> List[Dict]:
-        """将包含多个币种的行拆分为多个单独币种的行"""
-        import re
-        currency_value = row.get('币种')
-        if not currency_value:
-            return [row]
-        
-        codes = re.findall(r'[A-Z]{3}', str(currency_value).upper())
-        codes = [code for code in codes if code]
-        
-        if not codes:
-            return [row]
-        
-        expanded_rows = []
-        for code in codes:
-            new_row = row.copy()
-            new_row['币种'] = code
-            expanded_rows.append(new_row)
-        return expanded_rows
-    
     def _extract_network_tokenized(self, condition_info: Optional[Dict]) -> str:
         """从条件信息中提取Network Tokenized？值"""
         if not condition_info:
@@ -1530,17 +1590,8 @@ class WorkflowParser:
         if not condition_name:
             return ''
         
-        condition_name_upper = condition_name.upper()
-        
         # 检查条件名称中是否包含Network Tokenized信息
-        if "NOT NETWORK TOKENISED" in condition_name_upper or "NOT NETWORK TOKENIZED" in condition_name_upper:
-            return "False"
-        elif "NETWORK TOKENISED" in condition_name_upper or "NETWORK TOKENIZED" in condition_name_upper:
-            # 确保不是"NOT"
-            if "NOT" not in condition_name_upper or condition_name_upper.find("NOT") > condition_name_upper.find("TOKENISED"):
-                return "TRUE"
-        
-        return ''
+        return tokenize_condition(condition_name).network_tokenized
     
     def _extract_adaptive_3ds(self, condition_info: Optional[Dict], payment_method: str, network_tokenized: str) -> str:
         """从条件信息中提取Adaptive 3DS值"""
@@ -1551,18 +1602,10 @@ class WorkflowParser:
         if not condition_name:
             return ''
         
-        condition_name_upper = condition_name.upper()
-        
-        # 检查条件名称中是否包含Adaptive 3DS信息
-        if "ADAPTIVE 3DS" in condition_name_upper or "ADAPTIVE3DS" in condition_name_upper:
-            # 如果有"部分开启"或"部分"相关的词，返回"部分开启"
-            if "部分" in condition_name or "PARTIAL" in condition_name_upper:
-                return "部分开启"
-            # 如果有"否"或"NOT"，返回"否"
-            elif "否" in condition_name or "NOT" in condition_name_upper:
-                return "否"
-            # 默认返回"否"
-            return "否"
+        # 检查条件名称中是否包含Adaptive 3DS信息（"部分开启"或"否"）
+        adaptive_3ds = tokenize_condition(condition_name).adaptive_3ds
+        if adaptive_3ds is not None:
+            return adaptive_3ds
         
         # 根据CSV文件的规律：Google Pay中，Network Tokenized？= False时，Adaptive 3DS = 部分开启
         # Network Tokenized？= TRUE时，Adaptive 3DS = 否
@@ -1596,27 +1639,10 @@ class WorkflowParser:
                 condition_names.append(parent_name)
         
         for name in condition_names:
-            segments = [segment.strip() for segment in name.split("->") if segment.strip()]
-            # 检查是否有"Network!=Amex"后面跟着"Default"的情况
-            # 这种情况应该识别为"Network=Amex"（因为default分支表示Amex）
-            for i, segment in enumerate(segments):
-                segment_upper = segment.upper().replace(" ", "")
-                if "NETWORK" in segment_upper and "AMEX" in segment_upper:
-                    # 判断是否为非Amex
-                    if "!=" in segment_upper or "NOT" in segment_upper:
-                        # 检查后面是否有"Default"或"All other conditions"，如果有，说明这是default分支，应该是Amex
-                        # 但只有当"All other conditions"紧跟在"Network!=Amex"之后时，才识别为Amex
-                        if i + 1 < len(segments):
-                            next_segment = segments[i + 1].upper()
-                            if "DEFAULT" in next_segment or "ALL OTHER" in next_segment:
-                                return "Amex"
-                        return "非Amex"
-                    # 其他情况视为Amex
-                    return "Amex"
-            # 也检查整个条件名称中是否有"Network=Amex"
-            name_upper = name.upper()
-            if "Network=Amex" in name_upper or "NETWORK=AMEX" in name_upper:
-                return "Amex"
+            # "Network!=Amex"后面跟着"Default"时识别为"Network=Amex"（因为default分支表示Amex）
+            network = tokenize_condition(name).network
+            if network:
+                return network
         
         # 如果条件名称中没有，尝试从条件的operands中提取
         # 检查直接条件
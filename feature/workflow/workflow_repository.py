@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务端workflow仓库
+服务启动时在后台线程中加载并解析workflow json目录下的所有导出文件（不阻塞启动），
+之后监听目录变化（inotify，不可用时轮询文件修改时间），只重新解析发生变化的文件；
+接口可以按文件名引用已加载的workflow，不必重复上传
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+    inotify_flags = None
+
+try:
+    from parse_cache import parse_cache
+    from batch_parse import WORKFLOW_JSON_DIR, resolve_workflow_file
+except ImportError:
+    from feature.workflow.parse_cache import parse_cache
+    from feature.workflow.batch_parse import WORKFLOW_JSON_DIR, resolve_workflow_file
+
+logger = logging.getLogger(__name__)
+
+# 轮询模式下检查文件修改时间的间隔（秒）
+POLL_INTERVAL_SECONDS = 2.0
+
+# inotify事件合并等待时间（编辑器保存时通常连续产生多个事件）
+DEBOUNCE_SECONDS = 0.2
+
+
+class WorkflowEntry:
+    """仓库中的单个workflow文件及其解析结果"""
+
+    __slots__ = ("name", "path", "mtime_ns", "size", "key", "result", "loaded_at")
+
+    def __init__(self, path: Path, stat: os.stat_result, key: str, result: Dict[str, Any]):
+        """
+        Args:
+            path: 文件路径（需要原始内容时从文件重新读取，条目不保留文件字节）
+            stat: 读取时的文件状态
+            key: 文件内容的缓存键
+            result: 解析结果
+        """
+        self.name = path.stem
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.key = key
+        self.result = result
+        self.loaded_at = time.time()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "file": self.path.name,
+            "size": self.size,
+            "modified_at": self.mtime_ns / 1e9,
+            "loaded_at": self.loaded_at,
+            "split_count": len(self.result.get("splits", [])),
+            "csv_row_count": len(self.result.get("csv_format", [])),
+            "summary": self.result.get("summary")
+        }
+
+
+class WorkflowRepository:
+    """workflow json目录下导出文件的内存仓库"""
+
+    def __init__(self, directory: Path = WORKFLOW_JSON_DIR, pattern: str = "*.json",
+                 poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self._entries = {}  # 文件名（不含.json）-> WorkflowEntry
+        self._errors = {}  # 文件名 -> 最近一次加载失败的原因
+        self._listeners = []  # 变化回调 callback(文件名, WorkflowEntry或None)
+        self._lock = threading.Lock()
+        self._parse_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.watch_mode = None
+        self.reloads = 0
+        self.parses = 0
+
+    def start(self):
+        """在后台线程中加载目录并开始监听变化（重复调用无副作用）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="workflow-repository", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止监听"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待首次加载完成"""
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def reload(self) -> Dict[str, List[str]]:
+        """
+        扫描目录，只重新解析修改时间或大小发生变化的文件
+
+        Returns:
+            {"added": [...], "updated": [...], "removed": [...]}（文件名，不含.json）
+        """
+        changes = {"added": [], "updated": [], "removed": []}
+        try:
+            paths = {path.stem: path for path in sorted(self.directory.glob(self.pattern)) if path.is_file()}
+        except OSError as exc:
+            logger.warning("扫描workflow目录失败 %s: %s", self.directory, exc)
+            return changes
+
+        for name, path in paths.items():
+            with self._lock:
+                existed = name in self._entries
+            try:
+                entry, changed = self._refresh(path)
+            except FileNotFoundError:
+                continue
+            except Exception as exc:
+                logger.warning("加载workflow失败 %s: %s", path.name, exc)
+                with self._lock:
+                    self._errors[name] = str(exc)
+                continue
+            if changed:
+                changes["updated" if existed else "added"].append(name)
+
+        with self._lock:
+            for name in [name for name in self._entries if name not in paths]:
+                del self._entries[name]
+                changes["removed"].append(name)
+            for name in [name for name in self._errors if name not in paths]:
+                del self._errors[name]
+            self.reloads += 1
+        for name in changes["removed"]:
+            self._notify(name, None)
+
+        if any(changes.values()):
+            logger.info("workflow仓库已更新: 新增 %s，更新 %s，删除 %s",
+                        changes["added"], changes["updated"], changes["removed"])
+        return changes
+
+    def get(self, name: str) -> WorkflowEntry:
+        """
+        按文件名获取workflow（文件在监听到变化前已被修改时同步重新解析）
+
+        Raises:
+            FileNotFoundError: 文件不存在或不在workflow目录下
+        """
+        path = resolve_workflow_file(name, self.directory)
+        entry, _ = self._refresh(path)
+        return entry
+
+    def add_listener(self, callback: Callable[[str, Optional[WorkflowEntry]], None]):
+        """注册变化回调：文件新增或内容变化时传入新的WorkflowEntry，删除时传入None"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _notify(self, name: str, entry: Optional[WorkflowEntry]):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(name, entry)
+            except Exception as exc:
+                logger.warning("workflow仓库变化回调失败 %s: %s", name, exc)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._entries)
+
+    def entries(self) -> List[WorkflowEntry]:
+        with self._lock:
+            return [self._entries[name] for name in sorted(self._entries)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": str(self.directory),
+                "ready": self.ready,
+                "watch_mode": self.watch_mode,
+                "workflows": len(self._entries),
+                "reloads": self.reloads,
+                "parses": self.parses,
+                "errors": dict(self._errors)
+            }
+
+    def _refresh(self, path: Path):
+        """
+        文件未变化时返回已加载的条目，否则读取并解析
+
+        Returns:
+            (WorkflowEntry, 是否重新加载)
+        """
+        stat = path.stat()
+        with self._lock:
+            entry = self._entries.get(path.stem)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry, False
+
+        # 同一时间只解析一个文件，避免后台加载和请求同时解析同一文件；变化回调在释放锁之后调用
+        with self._parse_lock:
+            with self._lock:
+                entry = self._entries.get(path.stem)
+            stat = path.stat()
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry, False
+
+            content = path.read_bytes()
+            key, streaming = parse_cache.content_key(content)
+            if entry is not None and entry.key == key:
+                # 只有修改时间变化（如touch），内容相同时沿用解析结果
+                result = entry.result
+            else:
+                result = parse_cache.get_or_parse(content, streaming=streaming)
+                self.parses += 1
+            new_entry = WorkflowEntry(path, stat, key, result)
+            with self._lock:
+                self._entries[path.stem] = new_entry
+                self._errors.pop(path.stem, None)
+            changed = entry is None or entry.key != key
+
+        if changed:
+            self._notify(path.stem, new_entry)
+        return new_entry, changed
+
+    def _run(self):
+        start_time = time.time()
+        self.reload()
+        self._ready.set()
+        logger.info("workflow仓库加载完成: %d 个workflow，耗时 %.3f秒", len(self.names()), time.time() - start_time)
+
+        if INotify is not None:
+            try:
+                self._watch_inotify()
+                return
+            except OSError as exc:
+                # inotify实例或监听数量达到上限等情况，回退为轮询
+                logger.warning("inotify监听失败，改为轮询: %s", exc)
+        self._watch_polling()
+
+    def _watch_inotify(self):
+        inotify = INotify()
+        try:
+            inotify.add_watch(str(self.directory), inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+                              | inotify_flags.MOVED_FROM | inotify_flags.DELETE | inotify_flags.CREATE)
+            self.watch_mode = "inotify"
+            while not self._stop.is_set():
+                events = inotify.read(timeout=int(self.poll_interval * 1000))
+                if not any(Path(event.name).match(self.pattern) for event in events):
+                    continue
+                # 合并短时间内的连续事件后再扫描
+                time.sleep(DEBOUNCE_SECONDS)
+                inotify.read(timeout=0)
+                self.reload()
+        finally:
+            inotify.close()
+
+    def _watch_polling(self):
+        self.watch_mode = "polling"
+        while not self._stop.wait(self.poll_interval):
+            self.reload()
+
+
+# 进程内共享的workflow仓库（由服务启动时调用start）
+workflow_repository = WorkflowRepository()
+atexit.register(workflow_repository.stop, 0)
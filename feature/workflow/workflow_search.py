@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow block检索
+为workflow仓库中的每个workflow建立倒排索引（block名称、类型、条件名称、操作数路径/取值/运算符、
+币种、支付方式、渠道），渠道分量另建有序数组支持范围查询；
+查询只做集合求交和二分查找，仓库重新加载某个文件时只重建该文件的索引
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from condition_tokens import tokenize_condition, split_currency_codes
+    from decision_table import normalize_payment_method
+except ImportError:
+    from feature.workflow.condition_tokens import tokenize_condition, split_currency_codes
+    from feature.workflow.decision_table import normalize_payment_method
+
+# 可检索的字段（查询参数名与字段名一致）
+TERM_FIELDS = ("type", "name", "condition", "path", "operator", "value", "currency", "payment_method", "processor")
+
+# 全文检索（q）匹配的字段
+TEXT_FIELDS = ("name", "condition", "value")
+
+# 范围查询键："*"为任意单条route的分量，其他为渠道名（按split汇总后的分量）
+ANY_ROUTE = "*"
+
+WORD_PATTERN = re.compile(r"\w+")
+CURRENCY_PATTERN = re.compile(r"^[A-Z]{3}$")
+RANGE_PATTERN = re.compile(r"^\s*(>=|<=|>|<|=)?\s*(-?\d+(?:\.\d+)?)\s*(?:\.\.\s*(-?\d+(?:\.\d+)?)\s*)?$")
+
+
+def text_terms(text: Any) -> List[str]:
+    """文本分词（小写，按单词切分，中文连续字符为一个词）"""
+    if text is None:
+        return []
+    return WORD_PATTERN.findall(str(text).lower())
+
+
+def normalize_term(field: str, value: Any) -> str:
+    """查询值与索引词使用相同的归一化"""
+    text = str(value).strip()
+    if field in ("type", "currency", "operator"):
+        return text.upper()
+    if field == "payment_method":
+        return normalize_payment_method(text) or text.upper()
+    if field == "processor":
+        return text.capitalize()
+    return text.lower()
+
+
+def parse_range(text: str) -> Tuple[Optional[float], bool, Optional[float], bool]:
+    """
+    解析范围表达式：">50"、">=50"、"<50"、"<=50"、"50"（等于）、"50..80"（闭区间）
+
+    Returns:
+        (下界, 是否包含下界, 上界, 是否包含上界)，无界为None
+
+    Raises:
+        ValueError: 表达式无效
+    """
+    match = RANGE_PATTERN.match(str(text))
+    if not match:
+        raise ValueError(f"无效的范围表达式: {text}（示例: >50、>=50、<50、50、50..80）")
+    operator, first, second = match.group(1), float(match.group(2)), match.group(3)
+    if second is not None:
+        if operator:
+            raise ValueError(f"无效的范围表达式: {text}")
+        return first, True, float(second), True
+    if operator == ">":
+        return first, False, None, False
+    if operator == ">=":
+        return first, True, None, False
+    if operator == "<":
+        return None, False, first, False
+    if operator == "<=":
+        return None, False, first, True
+    return first, True, first, True
+
+
+def _walk_operands(condition: Any, sink: Dict[str, Set[str]]):
+    """递归收集条件中的操作数路径、运算符和字面量取值"""
+    if not isinstance(condition, dict):
+        return
+    operator = condition.get("operator")
+    if operator:
+        sink["operator"].add(str(operator).upper())
+    for operand in condition.get("operands") or []:
+        _walk_operands(operand, sink)
+
+    expression = condition.get("expression")
+    path = expression.get("path") if isinstance(expression, dict) else None
+    if path:
+        sink["path"].add(str(path).lower())
+    literals = condition.get("operand")
+    for literal in literals if isinstance(literals, list) else [literals]:
+        if not isinstance(literal, dict) or "value" not in literal:
+            continue
+        value = literal.get("value")
+        sink["value"].add(str(value).lower())
+        # 币种相关路径下的3字母取值视为币种
+        if path and "currency" in str(path).lower() and CURRENCY_PATTERN.match(str(value).upper()):
+            sink["currency"].add(str(value).upper())
+
+
+class WorkflowIndex:
+    """单个workflow的倒排索引"""
+
+    __slots__ = ("name", "docs", "terms", "ranges", "built_at")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.docs = []  # 文档序号 -> {block_id, type, name, ...}
+        self.terms = {field: {} for field in TERM_FIELDS}  # 字段 -> 词 -> 文档序号集合
+        self.ranges = {}  # 范围查询键 -> (有序分量列表, 对应文档序号列表)
+        self.built_at = time.time()
+
+    def _add_terms(self, field: str, terms: Iterable[str], doc_id: int):
+        postings = self.terms[field]
+        for term in terms:
+            postings.setdefault(term, set()).add(doc_id)
+
+    def matching(self, field: str, values: List[str]) -> Set[int]:
+        """字段取任一给定值的文档（name、condition按词匹配，多个词须同时出现）"""
+        postings = self.terms[field]
+        matched = set()
+        for value in values:
+            if field in ("name", "condition"):
+                docs = None
+                for term in text_terms(value):
+                    term_docs = postings.get(term, set())
+                    docs = set(term_docs) if docs is None else docs & term_docs
+                    if not docs:
+                        break
+                matched |= docs or set()
+            else:
+                matched |= postings.get(normalize_term(field, value), set())
+        return matched
+
+    def in_range(self, key: str, bounds: Tuple[Optional[float], bool, Optional[float], bool]) -> Set[int]:
+        values, docs = self.ranges.get(key, ([], []))
+        low, low_inclusive, high, high_inclusive = bounds
+        start = 0 if low is None else (bisect_left if low_inclusive else bisect_right)(values, low)
+        end = len(values) if high is None else (bisect_right if high_inclusive else bisect_left)(values, high)
+        return set(docs[start:end])
+
+    def text(self, query: str) -> Set[int]:
+        """全文检索：每个词须出现在名称、条件名称或取值中"""
+        docs = None
+        for term in text_terms(query):
+            term_docs = set()
+            for field in TEXT_FIELDS:
+                term_docs |= self.terms[field].get(term, set())
+            docs = term_docs if docs is None else docs & term_docs
+            if not docs:
+                return set()
+        return docs if docs is not None else set(range(len(self.docs)))
+
+
+def build_workflow_index(name: str, parsed: Dict[str, Any]) -> WorkflowIndex:
+    """
+    由解析结果建立索引（每个block一个文档）
+
+    Args:
+        name: workflow名称
+        parsed: WorkflowParser/解析缓存的结果（使用nodes、splits、decision_table）
+    """
+    index = WorkflowIndex(name)
+
+    splits = {}
+    for split in parsed.get("splits", []):
+        splits.setdefault(split.get("id"), []).append(split)
+    processors = {}
+    for entry in parsed.get("decision_table", []):
+        if not entry.get("no_split"):
+            processors.setdefault(entry.get("split_id"), entry.get("processors", {}))
+
+    range_points = {}  # 范围查询键 -> [(分量, 文档序号)]
+    for node in parsed.get("nodes", []):
+        block_id = node.get("id")
+        block = node.get("data") or {}
+        doc_id = len(index.docs)
+        doc = {"block_id": block_id, "type": node.get("type"), "name": node.get("name")}
+        index.docs.append(doc)
+
+        sink = {field: set() for field in TERM_FIELDS}
+        sink["type"].add(str(node.get("type") or "").upper())
+        sink["name"].update(text_terms(node.get("name")))
+
+        outcomes = block.get("outcomes")
+        if isinstance(outcomes, dict):
+            for outcome in outcomes.get("conditional") or []:
+                if not isinstance(outcome, dict):
+                    continue
+                outcome_name = outcome.get("name") or ""
+                sink["condition"].update(text_terms(outcome_name))
+                sink["currency"].update(tokenize_condition(outcome_name).currencies)
+                _walk_operands(outcome.get("condition"), sink)
+
+        block_splits = splits.get(block_id, [])
+        for split in block_splits:
+            condition = split.get("condition")
+            condition_name = condition.get("name", "") if isinstance(condition, dict) else ""
+            sink["condition"].update(text_terms(condition_name))
+            currency = split.get("currency") or ""
+            sink["currency"].update(split_currency_codes(currency) if currency != "其他" else ("其他",))
+            payment_method = split.get("payment_method")
+            if payment_method and payment_method != "UNKNOWN":
+                sink["payment_method"].add(normalize_term("payment_method", payment_method))
+        if block_splits:
+            routes = block_splits[0].get("routes", [])
+            doc["routes"] = [{"name": route.get("name"), "percentage": route.get("percentage", 0)} for route in routes]
+            for route in routes:
+                range_points.setdefault(ANY_ROUTE, []).append((float(route.get("percentage") or 0), doc_id))
+            split_processors = processors.get(block_id)
+            if split_processors:
+                doc["processors"] = split_processors
+                for processor, value in split_processors.items():
+                    percentage = float(value) if isinstance(value, (int, float)) else 0.0
+                    if percentage > 0:
+                        sink["processor"].add(normalize_term("processor", processor))
+                    range_points.setdefault(normalize_term("processor", processor), []).append((percentage, doc_id))
+
+        for field, terms in sink.items():
+            index._add_terms(field, terms, doc_id)
+
+    for key, points in range_points.items():
+        points.sort()
+        index.ranges[key] = ([value for value, _ in points], [doc_id for _, doc_id in points])
+    return index
+
+
+class WorkflowSearchIndex:
+    """仓库中所有workflow的索引（按workflow名称分别维护，文件变化时只重建对应的索引）"""
+
+    def __init__(self):
+        self._indexes = {}  # workflow名称 -> (解析缓存键, WorkflowIndex)
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def update(self, name: str, key: str, parsed: Dict[str, Any]) -> bool:
+        """更新单个workflow的索引，内容未变化时跳过；返回是否重建"""
+        with self._lock:
+            current = self._indexes.get(name)
+            if current is not None and current[0] == key:
+                return False
+        index = build_workflow_index(name, parsed)
+        with self._lock:
+            self._indexes[name] = (key, index)
+            self.builds += 1
+        return True
+
+    def remove(self, name: str):
+        with self._lock:
+            self._indexes.pop(name, None)
+
+    def on_repository_change(self, name: str, entry):
+        """workflow仓库的变化回调（entry为None表示文件已删除）"""
+        if entry is None:
+            self.remove(name)
+        else:
+            self.update(name, entry.key, entry.result)
+
+    def attach(self, repository):
+        """为仓库中已加载的workflow建立索引，并在之后的重新加载时增量更新"""
+        repository.add_listener(self.on_repository_change)
+        for entry in repository.entries():
+            self.update(entry.name, entry.key, entry.result)
+
+    def workflows(self) -> List[str]:
+        with self._lock:
+            return sorted(self._indexes)
+
+    def search(self, filters: Optional[Dict[str, List[str]]] = None, percentage: Optional[str] = None,
+               text: Optional[str] = None, workflows: Optional[List[str]] = None,
+               offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """
+        检索block
+
+        Args:
+            filters: 字段 -> 取值列表（同一字段内任一取值匹配，不同字段须同时满足），字段见TERM_FIELDS
+            percentage: 分量范围表达式（见parse_range）；filters中指定processor时按这些渠道的分量筛选，
+                否则按任意单条route的分量筛选
+            text: 全文检索（名称、条件名称、取值）
+            workflows: 限定的workflow名称，None为全部
+            offset: 结果偏移
+            limit: 返回条数上限
+
+        Returns:
+            {"total", "offset", "limit", "items": [{workflow, block_id, type, name, ...}], "took_ms"}
+
+        Raises:
+            ValueError: 不支持的字段、无效的范围表达式或未知的workflow
+        """
+        started = time.perf_counter()
+        filters = {field: values for field, values in (filters or {}).items() if values}
+        unknown = [field for field in filters if field not in TERM_FIELDS]
+        if unknown:
+            raise ValueError(f"不支持的检索字段: {', '.join(unknown)}（可选: {', '.join(TERM_FIELDS)}）")
+        bounds = parse_range(percentage) if percentage else None
+        # 指定分量范围时processor只用于选择按哪个渠道的分量筛选（分量为0的渠道也参与范围比较）
+        range_keys = [ANY_ROUTE]
+        if bounds is not None and "processor" in filters:
+            range_keys = [normalize_term("processor", processor) for processor in filters.pop("processor")]
+
+        with self._lock:
+            if workflows:
+                missing = [name for name in workflows if name not in self._indexes]
+                if missing:
+                    raise ValueError(f"workflow未加载: {', '.join(missing)}")
+                indexes = [self._indexes[name][1] for name in workflows]
+            else:
+                indexes = [self._indexes[name][1] for name in sorted(self._indexes)]
+
+        total = 0
+        items = []
+        for index in indexes:
+            docs = None
+            # 先处理选择性通常更高的字段
+            for field in sorted(filters, key=lambda f: f in ("type", "operator")):
+                matched = index.matching(field, filters[field])
+                docs = matched if docs is None else docs & matched
+                if not docs:
+                    break
+            if bounds is not None and docs != set():
+                matched = set()
+                for key in range_keys:
+                    matched |= index.in_range(key, bounds)
+                docs = matched if docs is None else docs & matched
+            if text and docs != set():
+                matched = index.text(text)
+                docs = matched if docs is None else docs & matched
+            if docs is None:
+                docs = range(len(index.docs))
+
+            for doc_id in sorted(docs):
+                if offset <= total < offset + limit:
+                    items.append(dict(index.docs[doc_id], workflow=index.name))
+                total += 1
+
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "items": items,
+            "took_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workflows": {name: len(index.docs) for name, (_, index) in sorted(self._indexes.items())},
+                "builds": self.builds
+            }
+
+
+# 进程内共享的检索索引（由接口模块关联到workflow仓库）
+search_index = WorkflowSearchIndex()
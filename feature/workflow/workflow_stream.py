@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Workflow JSON流式读取
+逐个解码 workflow_source.workflow.blocks 中的block，只保留解析器需要的字段
+（id、type、name、outcomes、条件操作数、split分量），丢弃input_configuration、
+application_visuals等大字段，避免一次性构建整棵JSON对象树；
+从文件读取时按固定大小的块读入，缓冲区只保留当前正在解码的值
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Union
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# 从文件读取时每次读入的字符数
+READ_CHUNK_SIZE = 64 * 1024
+
+# 解析器使用的block字段
+BLOCK_FIELDS = ("id", "type", "name", "route_splitter_name", "application_instance_name")
+# 解析器使用的trigger字段
+TRIGGER_FIELDS = ("name", "description")
+
+
+class _Scanner:
+    """
+    基于JSONDecoder.raw_decode的增量扫描器，按需逐个解码值
+
+    输入为文件对象时按块读入：当前值在缓冲区内不完整时继续读入（读入量随缓冲区翻倍，
+    大block跨多个块时总解码量仍与其大小成线性），读入前丢弃已消费的部分
+    """
+
+    def __init__(self, source: Union[str, IO]):
+        if isinstance(source, str):
+            self.text = source
+            self._reader = None
+        else:
+            self.text = ""
+            self._reader = source
+            self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.pos = 0
+
+    def _fill(self, size: int = READ_CHUNK_SIZE) -> bool:
+        """读入至少size个字符（文件结束时可能更少），返回是否读到了新内容"""
+        pieces = []
+        remaining = size
+        while remaining > 0 and self._reader is not None:
+            chunk = self._reader.read(max(remaining, READ_CHUNK_SIZE))
+            if not chunk:
+                self._reader = None
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk, final=self._reader is None)
+            if chunk:
+                pieces.append(chunk)
+                remaining -= len(chunk)
+        if not pieces:
+            return False
+        self.text = self.text[self.pos:] + "".join(pieces)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self._fill():
+                return self.text[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.text, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """解码当前位置的一个完整JSON值"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # 值在缓冲区末尾被截断，继续读入后重试
+                if self._fill(len(self.text) - self.pos):
+                    continue
+                raise
+            # 数字、true等可能恰好在缓冲区末尾截断，读入后续内容确认值已结束
+            if end == len(self.text) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_object(self) -> Iterator[str]:
+        """遍历对象的键，调用方需在下一次迭代前消费对应的值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", self.text, self.pos)
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def iter_array(self) -> Iterator[None]:
+        """遍历数组元素，调用方需在下一次迭代前消费当前元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield None
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def _pick(source: Dict, fields) -> Dict:
+    return {field: source[field] for field in fields if field in source}
+
+
+def project_block(block: Dict) -> Dict:
+    """
+    只保留解析器需要的block字段
+
+    Args:
+        block: 完整的block数据
+
+    Returns:
+        精简后的block
+    """
+    projected = _pick(block, BLOCK_FIELDS)
+
+    action = block.get("action")
+    if isinstance(action, dict):
+        projected["action"] = _pick(action, ("name", "description"))
+
+    if "outcomes" not in block:
+        return projected
+
+    outcomes = block["outcomes"]
+    if isinstance(outcomes, dict):
+        projected_outcomes = {}
+        if "conditional" in outcomes:
+            conditional = outcomes["conditional"]
+            if isinstance(conditional, list):
+                conditional = [_pick(cond, ("name", "next", "condition")) for cond in conditional]
+            projected_outcomes["conditional"] = conditional
+        if "default" in outcomes:
+            default = outcomes["default"]
+            if isinstance(default, dict):
+                default = _pick(default, ("name", "next"))
+            projected_outcomes["default"] = default
+        projected["outcomes"] = projected_outcomes
+    elif isinstance(outcomes, list):
+        # ROUTE_SPLITTER的outcomes是分量列表
+        projected["outcomes"] = [
+            _pick(outcome, ("name", "next", "split_evaluation")) if isinstance(outcome, dict) else outcome
+            for outcome in outcomes
+        ]
+    else:
+        projected["outcomes"] = outcomes
+
+    return projected
+
+
+def _read_workflow(scanner: _Scanner, on_block: Optional[Callable[[Dict], None]]) -> Dict:
+    workflow = {}
+    for key in scanner.iter_object():
+        if key == "blocks" and scanner.peek() == '[':
+            blocks = []
+            for _ in scanner.iter_array():
+                block = scanner.value()
+                projected = project_block(block) if isinstance(block, dict) else block
+                del block
+                if on_block:
+                    on_block(projected)
+                blocks.append(projected)
+            workflow["blocks"] = blocks
+        else:
+            workflow[key] = scanner.value()
+    return workflow
+
+
+def _read_workflow_source(scanner: _Scanner, on_block: Optional[Callable[[Dict], None]]) -> Dict:
+    workflow_source = {}
+    for key in scanner.iter_object():
+        if key == "workflow" and scanner.peek() == '{':
+            workflow_source["workflow"] = _read_workflow(scanner, on_block)
+        elif key == "trigger":
+            trigger = scanner.value()
+            workflow_source["trigger"] = _pick(trigger, TRIGGER_FIELDS) if isinstance(trigger, dict) else trigger
+        else:
+            value = scanner.value()
+            # 只保留标量字段（id、version、revision_id、name等）
+            if not isinstance(value, (dict, list)):
+                workflow_source[key] = value
+    return workflow_source
+
+
+def _read_export(scanner: _Scanner, on_block: Optional[Callable[[Dict], None]]) -> Dict:
+    export = {}
+    for key in scanner.iter_object():
+        if key == "workflow_source" and scanner.peek() == '{':
+            export["workflow_source"] = _read_workflow_source(scanner, on_block)
+        else:
+            value = scanner.value()
+            if not isinstance(value, (dict, list)):
+                export[key] = value
+    return export
+
+
+def load_workflow_skeleton(content: Union[str, bytes, IO],
+                           on_block: Optional[Callable[[Dict], None]] = None) -> Union[Dict, List]:
+    """
+    流式读取workflow导出内容，返回与原始导出结构一致、但只包含解析所需字段的精简数据
+
+    Args:
+        content: workflow JSON文本、字节或已打开的文件对象（文本或二进制模式，按块读取；
+                 单个导出对象或导出列表）
+        on_block: 每解码一个block时的回调（参数为精简后的block）
+
+    Returns:
+        精简后的workflow数据，可直接传给WorkflowParser.parse_json
+
+    Raises:
+        json.JSONDecodeError: JSON格式错误
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    scanner = _Scanner(content)
+
+    char = scanner.peek()
+    if char == '[':
+        result = []
+        for _ in scanner.iter_array():
+            if scanner.peek() == '{':
+                result.append(_read_export(scanner, on_block))
+            else:
+                result.append(scanner.value())
+    elif char == '{':
+        result = _read_export(scanner, on_block)
+    else:
+        result = scanner.value()
+
+    if scanner.peek():
+        raise json.JSONDecodeError("Extra data", scanner.text, scanner.pos)
+    return result
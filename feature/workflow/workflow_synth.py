@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成Primer workflow导出生成器
+按目标block数量生成结构与真实导出一致的workflow（TRIGGER -> 支付方式 -> 分组路由 ->
+条件链 -> 币种条件 -> ROUTE_SPLITTER/APPLICATION），用于解析器性能基准测试
+"""
+
+import random
+import uuid
+from typing import Dict, List, Optional
+
+# 合成数据使用的币种代码
+CURRENCY_POOL = ['USD', 'EUR', 'GBP', 'JPY', 'CNY', 'KRW', 'AUD', 'CAD', 'CHF',
+                 'NZD', 'SGD', 'HKD', 'TWD', 'THB', 'AED', 'PHP', 'INR', 'BRL']
+
+# 支付方式 -> paymentMethodType条件值
+PAYMENT_METHOD_VALUES = [
+    ("CARD", "PAYMENT_CARD", "Card payment"),
+    ("AP", "APPLE_PAY", "Apple Pay"),
+    ("GP", "GOOGLE_PAY", "Google Pay"),
+]
+
+PROCESSORS = ["Adyen", "Stripe", "Airwallex"]
+
+# 每个分组路由block的最大分支数
+ROUTER_FANOUT = 8
+
+
+class _WorkflowBuilder:
+    """按参数逐个追加block的构建器（id由种子确定，结果可复现）"""
+
+    def __init__(self, rng: random.Random, trigger_id: str):
+        self.rng = rng
+        self.trigger_id = trigger_id
+        self.blocks = []
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def operand(self, path: str, operator: str, value, label: Optional[str] = None) -> Dict:
+        return {
+            "expression": {
+                "type": "BLOCK_OUTPUT_REFERENCE",
+                "block_id": self.trigger_id,
+                "path": path,
+                "path_root": None,
+                "type_info": {"name": "string"}
+            },
+            "type": "string",
+            "operator": operator,
+            "operand": {"type": "LITERAL", "value": value, "label": label, "icon": None}
+        }
+
+    def outcome(self, name: Optional[str], next_id: Optional[str], operands: Optional[List[Dict]] = None) -> Dict:
+        result = {"entity_id": self.new_id(), "id": self.new_id(), "next": next_id, "name": name}
+        if operands is not None:
+            result["condition"] = {"operator": "AND", "operands": operands}
+        return result
+
+    def condition_block(self, block_id: str, conditional: List[Dict], default_next: Optional[str],
+                        name: Optional[str] = None) -> Dict:
+        block = {
+            "entity_id": self.new_id(),
+            "id": block_id,
+            "type": "CONDITION",
+            "outcomes": {
+                "conditional": conditional,
+                "default": self.outcome("All other conditions", default_next)
+            },
+            "condition_type": "MULTI_IF"
+        }
+        if name:
+            block["name"] = name
+        self.blocks.append(block)
+        return block
+
+    def application_block(self, name: str) -> str:
+        block_id = self.new_id()
+        self.blocks.append({
+            "entity_id": self.new_id(),
+            "id": block_id,
+            "type": "APPLICATION",
+            "outcome": self.outcome(None, None),
+            "name": "Authorize payment",
+            "application_instance_name": name,
+            "application_id": "PAYMENT_APP"
+        })
+        return block_id
+
+    def splitter_block(self, processor_ids: List[str]) -> str:
+        block_id = self.new_id()
+        weights = [self.rng.randint(1, 10) for _ in processor_ids]
+        total = sum(weights)
+        percentages = [round(weight * 100 / total) for weight in weights]
+        percentages[-1] = 100 - sum(percentages[:-1])
+        self.blocks.append({
+            "entity_id": self.new_id(),
+            "id": block_id,
+            "type": "ROUTE_SPLITTER",
+            "outcomes": [
+                {
+                    "entity_id": self.new_id(),
+                    "id": self.new_id(),
+                    "next": processor_id,
+                    "name": processor,
+                    "copy_from": None,
+                    "split_evaluation": {"type": "PERCENTAGE", "value": float(percentage)}
+                }
+                for processor, processor_id, percentage in zip(PROCESSORS, processor_ids, percentages)
+            ],
+            "route_splitter_name": "Split"
+        })
+        return block_id
+
+
+def _segment_count(blocks: int, depth: int, splitter_density: float, currency_fanout: int) -> int:
+    """估算达到目标block数所需的分组数"""
+    per_segment = depth + 1 + currency_fanout * splitter_density
+    # 分组路由block约占分组数的1/(ROUTER_FANOUT-1)
+    per_segment += 1 / (ROUTER_FANOUT - 1)
+    fixed = 1 + len(PROCESSORS) + len(PAYMENT_METHOD_VALUES)
+    return max(len(PAYMENT_METHOD_VALUES), int(round((blocks - fixed) / per_segment)))
+
+
+def generate_workflow(blocks: int = 1000, depth: int = 4, splitter_density: float = 0.5,
+                      currency_fanout: int = 4, seed: int = 0) -> List[Dict]:
+    """
+    生成合成的workflow导出
+
+    Args:
+        blocks: 目标block数量（实际数量接近该值）
+        depth: 每个分组在币种条件之前的条件链长度
+        splitter_density: 币种条件连接到ROUTE_SPLITTER（而不是直接连接APPLICATION）的比例，0~1
+        currency_fanout: 每个币种条件block的币种分支数
+        seed: 随机种子
+
+    Returns:
+        与Primer导出结构一致的workflow列表（可直接传给WorkflowParser.parse_json）
+    """
+    if depth < 1:
+        raise ValueError("depth必须大于等于1")
+    if not 0 <= splitter_density <= 1:
+        raise ValueError("splitter_density必须在0到1之间")
+    if currency_fanout < 1:
+        raise ValueError("currency_fanout必须大于等于1")
+
+    rng = random.Random(seed)
+    trigger_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    builder = _WorkflowBuilder(rng, trigger_id)
+
+    processor_ids = [builder.application_block(f"{processor} Payments") for processor in PROCESSORS]
+    fallback_id = processor_ids[0]
+
+    segments = _segment_count(blocks, depth, splitter_density, currency_fanout)
+    trigger_conditional = []
+
+    for index, (payment_method, value, label) in enumerate(PAYMENT_METHOD_VALUES):
+        method_segments = segments // len(PAYMENT_METHOD_VALUES) + (1 if index < segments % len(PAYMENT_METHOD_VALUES) else 0)
+        heads = []
+
+        for segment in range(method_segments):
+            # 币种条件block
+            currency_block_id = builder.new_id()
+            if currency_fanout <= len(CURRENCY_POOL):
+                currencies = rng.sample(CURRENCY_POOL, currency_fanout)
+            else:
+                currencies = [CURRENCY_POOL[i % len(CURRENCY_POOL)] for i in range(currency_fanout)]
+            currency_conditional = []
+            for currency in currencies:
+                if rng.random() < splitter_density:
+                    next_id = builder.splitter_block(processor_ids)
+                else:
+                    next_id = rng.choice(processor_ids)
+                currency_conditional.append(builder.outcome(
+                    f"Currency in {currency}", next_id, [builder.operand("currencyCode", "IN", currency, currency)]
+                ))
+            builder.condition_block(currency_block_id, currency_conditional, fallback_id, name="Currency routing")
+
+            # 币种条件之前的条件链（从下往上构建），链头按支付方式带Network/Network Tokenised条件
+            next_id = currency_block_id
+            for level in range(depth - 1, -1, -1):
+                block_id = builder.new_id()
+                if level == 0 and payment_method == "CARD":
+                    cond_name = "Network != Amex"
+                    operands = [builder.operand("paymentMethod.paymentMethodData.network", "!=", "AMEX", "Amex")]
+                elif level == 0 and payment_method == "GP":
+                    cond_name = "Network Tokenised" if segment % 2 == 0 else "NOT Network Tokenised"
+                    operands = [builder.operand("paymentMethod.isNetworkTokenized", "=", segment % 2 == 0)]
+                else:
+                    cond_name = f"Segment {segment} level {level}"
+                    operands = [builder.operand("payment.metadata.segment", "=", f"{segment}-{level}")]
+                builder.condition_block(block_id, [builder.outcome(cond_name, next_id, operands)], fallback_id)
+                next_id = block_id
+            heads.append(next_id)
+
+        # 分组路由树：每个路由block最多ROUTER_FANOUT个分支
+        while len(heads) > 1:
+            routers = []
+            for start in range(0, len(heads), ROUTER_FANOUT):
+                router_id = builder.new_id()
+                conditional = [
+                    builder.outcome(f"Group {start + offset}", head_id,
+                                    [builder.operand("payment.metadata.group", "=", str(start + offset))])
+                    for offset, head_id in enumerate(heads[start:start + ROUTER_FANOUT])
+                ]
+                builder.condition_block(router_id, conditional, fallback_id)
+                routers.append(router_id)
+            heads = routers
+
+        trigger_conditional.append(builder.outcome(
+            f"Trigger Condition #{index + 1}", heads[0] if heads else fallback_id,
+            [builder.operand("paymentMethodType", "=", value, label)]
+        ))
+
+    trigger_block = {
+        "entity_id": builder.new_id(),
+        "id": trigger_id,
+        "type": "TRIGGER",
+        "outcomes": {"conditional": trigger_conditional, "default": builder.outcome(None, None)},
+        "schedule_rule": None
+    }
+
+    return [{
+        "export_status": "SUCCESS",
+        "id": builder.new_id(),
+        "version": 1,
+        "workflow_source": {
+            "id": f"synthetic-{blocks}-{seed}",
+            "version": 1,
+            "revision_id": f"d{depth}-s{splitter_density}-c{currency_fanout}",
+            "name": f"Synthetic workflow ({blocks} blocks)",
+            "trigger": {"name": "Payment created", "description": "Synthetic trigger"},
+            "workflow": {"blocks": [trigger_block] + builder.blocks}
+        }
+    }]
+
+
+def count_blocks(workflow_data: List[Dict]) -> int:
+    """统计workflow导出中的block数量"""
+    exports = workflow_data if isinstance(workflow_data, list) else [workflow_data]
+    return sum(
+        len(export.get("workflow_source", {}).get("workflow", {}).get("blocks", []))
+        for export in exports if isinstance(export, dict)
+    )
@@ -155,6 +155,10 @@ class WorkflowVisualizerManager:
                     # 注册蓝图
                     app.register_blueprint(workflow_api, url_prefix='/api')
                     
+                    # 后台加载workflow仓库并监听目录变化
+                    from feature.workflow.workflow_repository import workflow_repository
+                    workflow_repository.start()
+                    
                     # 添加根路由
                     @app.route('/')
                     def index():
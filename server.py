@@ -60,6 +60,9 @@ def create_flask_app():
         # 注册蓝图
         app.register_blueprint(workflow_api, url_prefix='/api')
         
+        # 后台加载workflow仓库并监听目录变化（优先从磁盘存储恢复已解析的workflow，不阻塞启动）
+        _start_workflow_repository()
+        
         # 添加根路由
         @app.route('/')
         def index():
@@ -78,6 +81,17 @@ def create_flask_app():
         raise
 
 
+def _start_workflow_repository():
+    """启动workflow仓库的后台加载和目录监听，失败不影响服务启动"""
+    try:
+        from feature.workflow.workflow_repository import workflow_repository
+        
+        workflow_repository.start()
+        logger.info(f"workflow仓库后台加载中: {workflow_repository.directory}")
+    except Exception as e:
+        logger.warning(f"workflow仓库启动失败: {e}")
+
+
 def run_server(host='0.0.0.0', port=5012, debug=False):
     """运行Flask服务器"""
     max_retries = 5
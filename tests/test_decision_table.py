@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""decision_table回归测试"""
+
+import json
+from pathlib import Path
+
+from feature.workflow.decision_table import DecisionTable, DEFAULT_CURRENCY
+from feature.workflow.parse_cache import parse_workflow_data
+
+WORKFLOW_DIR = Path(__file__).resolve().parent.parent / "feature" / "workflow" / "workflow json"
+
+
+def _entry(split_id, currency, network=None):
+    return {
+        "payment_method": "CARD",
+        "currency": currency,
+        "network": network,
+        "network_tokenized": None,
+        "adaptive_3ds": None,
+        "split_id": split_id,
+        "split_name": split_id,
+        "condition": "",
+        "no_split": False,
+        "routes": [],
+        "processors": {"Adyen": 100, "Stripe": '', "Airwallex": ''},
+    }
+
+
+TABLE = DecisionTable([
+    _entry("usd", "USD"),
+    _entry("other-amex", DEFAULT_CURRENCY, network="Amex"),
+    _entry("other-non-amex", DEFAULT_CURRENCY, network="非Amex"),
+])
+
+
+def test_configured_currency_matches_its_own_bucket():
+    result = TABLE.lookup("Card", "usd")
+
+    assert result["matched_currency"] == "USD"
+    assert [entry["split_id"] for entry in result["matches"]] == ["usd"]
+
+
+def test_unconfigured_currency_falls_back_to_default():
+    """没有单独配置的币种走"其他"分支，并继续按Network过滤"""
+    result = TABLE.lookup("CARD", "XYZ", network="Amex")
+
+    assert result["query"]["currency"] == "XYZ"
+    assert result["matched_currency"] == DEFAULT_CURRENCY
+    assert [entry["split_id"] for entry in result["matches"]] == ["other-amex"]
+
+
+def test_default_currency_is_not_used_for_other_payment_methods():
+    result = TABLE.lookup("GP", "XYZ")
+
+    assert result["matched_currency"] is None
+    assert result["matches"] == []
+
+
+def test_lookup_many_reports_invalid_queries():
+    results = TABLE.lookup_many([{"payment_method": "CARD", "currency": "EUR"}, {"currency": "EUR"}])
+
+    assert results[0]["matched_currency"] == DEFAULT_CURRENCY
+    assert [entry["split_id"] for entry in results[0]["matches"]] == ["other-amex", "other-non-amex"]
+    assert "error" in results[1]
+
+
+def test_parsed_workflow_falls_back_to_default_branch():
+    """解析出的决策表中，未单独配置的币种命中"其他"分支的split"""
+    with open(WORKFLOW_DIR / "Card.json", encoding="utf-8") as f:
+        parsed = parse_workflow_data(json.load(f))
+    table = DecisionTable(parsed["decision_table"])
+
+    result = table.lookup("CARD", "XYZ", network="Visa")
+
+    assert result["matched_currency"] == DEFAULT_CURRENCY
+    assert result["matches"]
+    assert all(entry["currency"] == DEFAULT_CURRENCY for entry in result["matches"])
+    assert table.lookup("CARD", "USD", network="Visa")["matched_currency"] == "USD"
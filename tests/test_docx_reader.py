@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""docx_reader缓存回归测试"""
+
+import os
+
+from feature.workflow.docx_reader import DocxConfigCache
+
+
+class _CountingParser:
+    """记录解析次数，返回固定的分量配置"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return {"CARD": {"USD": [20, 40, 40]}}
+
+
+def test_unchanged_file_is_parsed_once(tmp_path):
+    path = tmp_path / "workflow.docx"
+    path.write_bytes(b"v1")
+    cache, parse = DocxConfigCache(), _CountingParser()
+
+    first = cache.get(str(path), parse)
+    second = cache.get(str(path), parse)
+
+    assert second is first
+    assert parse.calls == 1
+    assert cache.stats() == {"files": 1, "hits": 1, "misses": 1}
+    assert first.formatted["CARD"]["USD"] == {"percentages": [20, 40, 40], "routes": ["Adyen", "Stripe", "AWX"],
+                                              "split_id": None}
+
+
+def test_modification_time_change_invalidates(tmp_path):
+    path = tmp_path / "workflow.docx"
+    path.write_bytes(b"v1")
+    cache, parse = DocxConfigCache(), _CountingParser()
+    cache.get(str(path), parse)
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cache.get(str(path), parse)
+
+    assert parse.calls == 2
+
+
+def test_size_change_with_same_modification_time_invalidates(tmp_path):
+    path = tmp_path / "workflow.docx"
+    path.write_bytes(b"v1")
+    cache, parse = DocxConfigCache(), _CountingParser()
+    cache.get(str(path), parse)
+
+    stat = path.stat()
+    path.write_bytes(b"version 2")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    cache.get(str(path), parse)
+
+    assert parse.calls == 2
+
+
+def test_relative_and_absolute_paths_share_an_entry(tmp_path, monkeypatch):
+    path = tmp_path / "workflow.docx"
+    path.write_bytes(b"v1")
+    monkeypatch.chdir(tmp_path)
+    cache, parse = DocxConfigCache(), _CountingParser()
+
+    cache.get("workflow.docx", parse)
+    cache.get(str(path), parse)
+
+    assert parse.calls == 1
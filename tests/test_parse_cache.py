@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""parse_cache回归测试"""
+
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from feature.workflow.parse_cache import ParseCache, parse_workflow_data
+
+WORKFLOW_DIR = Path(__file__).resolve().parent.parent / "feature" / "workflow" / "workflow json"
+
+
+def _workflow_source(data):
+    return (data[0] if isinstance(data, list) else data)["workflow_source"]
+
+
+def _change_first_split(data):
+    for block in _workflow_source(data)["workflow"]["blocks"]:
+        if block["type"] == "ROUTE_SPLITTER":
+            block["outcomes"][0]["split_evaluation"]["value"] = 33.0
+            return
+
+
+def _rename_first_condition(data):
+    for block in _workflow_source(data)["workflow"]["blocks"]:
+        if block["type"] == "CONDITION" and (block.get("outcomes") or {}).get("conditional"):
+            block["outcomes"]["conditional"][0]["name"] += " X"
+            return
+
+
+@pytest.mark.parametrize("name", ["Card", "Apple", "Google"])
+@pytest.mark.parametrize("mutate", [_change_first_split, _rename_first_condition, lambda data: None])
+def test_incremental_revision_equals_full_parse(name, mutate):
+    """同一workflow的新revision基于上一个revision增量解析，结果与完整解析一致"""
+    with open(WORKFLOW_DIR / f"{name}.json", encoding="utf-8") as f:
+        data = json.load(f)
+    cache = ParseCache(store=None, parallel=False)
+    cache.load_or_parse(json.dumps(data).encode("utf-8"))
+
+    revision = copy.deepcopy(data)
+    _workflow_source(revision)["revision_id"] = "next-revision"
+    mutate(revision)
+    incremental = cache.load_or_parse(json.dumps(revision).encode("utf-8"))
+
+    assert cache.incremental_parses == 1
+    assert incremental == parse_workflow_data(revision)
+
+
+def test_different_workflow_is_not_parsed_incrementally():
+    cache = ParseCache(store=None, parallel=False)
+    for name in ("Card", "Apple"):
+        cache.load_or_parse((WORKFLOW_DIR / f"{name}.json").read_bytes())
+
+    assert cache.incremental_parses == 0
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""parse_store回归测试"""
+
+import feature.workflow.parse_store as parse_store_module
+from feature.workflow.parse_store import ParseStore, workflow_store_key
+
+KEY = (("wf", "1", "r1"),)
+
+
+def test_round_trip(tmp_path):
+    store = ParseStore(tmp_path)
+    store.save(KEY, {"splits": [1, 2]})
+
+    assert store.load(KEY) == {"splits": [1, 2]}
+    assert store.stats()["hits"] == 1
+
+
+def test_schema_version_change_invalidates_entries(tmp_path, monkeypatch):
+    """解析器schema版本变化后旧条目按未命中处理并删除"""
+    store = ParseStore(tmp_path)
+    store.save(KEY, {"splits": []})
+
+    monkeypatch.setattr(parse_store_module, "PARSER_SCHEMA_VERSION", parse_store_module.PARSER_SCHEMA_VERSION + 1)
+
+    assert store.load(KEY) is None
+    assert store.stats()["stale"] == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_corrupt_file_is_discarded(tmp_path):
+    store = ParseStore(tmp_path)
+    store.save(KEY, {"splits": []})
+    path, = tmp_path.iterdir()
+    path.write_bytes(b"not a pickle")
+
+    assert store.load(KEY) is None
+    assert not path.exists()
+
+
+def test_store_key_requires_revision_identity():
+    export = {"workflow_source": {"id": "wf", "version": 1, "revision_id": "r1"}}
+
+    assert workflow_store_key(export) == KEY
+    assert workflow_store_key([export, {"workflow_source": {"id": "wf", "version": 1}}]) is None
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""share_simulator回归测试"""
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from feature.workflow.share_simulator import ShareSimulator
+
+
+def _entry(split_id, currency, processors, condition, network=None, routes=None):
+    return {
+        "payment_method": "CARD",
+        "currency": currency,
+        "network": network,
+        "network_tokenized": None,
+        "adaptive_3ds": None,
+        "split_id": split_id,
+        "split_name": split_id,
+        "condition": condition,
+        "no_split": False,
+        "routes": routes or [{"name": "route", "percentage": 100, "next": None}],
+        "processors": dict(zip(("Adyen", "Stripe", "Airwallex"), processors)),
+    }
+
+
+# USD单独配置；其他币种走"其他"分支，分支上还有不分流的Adaptive 3DS split和更上层的渠道split
+ENTRIES = [
+    _entry("usd", "USD", (20, 40, 40), "Trigger -> USD"),
+    _entry("3ds", "其他", ('', '', ''), "Trigger -> All other conditions",
+           routes=[{"name": "adaptive 3ds", "percentage": 50, "next": None},
+                   {"name": "always 3ds", "percentage": 50, "next": None}]),
+    _entry("outer", "其他", (50, '', 50), "Trigger -> All other conditions -> No Affinity"),
+    _entry("inner", "其他", (30, 30, 40), "Trigger -> All other conditions -> Network Check -> Visa"),
+]
+
+TRAFFIC = [
+    {"payment_method": "CARD", "currency": "XYZ", "network": "Visa", "volume": 100},
+    {"payment_method": "CARD", "currency": "USD", "network": "Visa", "volume": 100},
+]
+
+
+def test_current_shares_use_most_specific_routing_split():
+    """不分流的3DS split不计入未分配，只取条件链最深的渠道split"""
+    expected = ShareSimulator(ENTRIES).simulate(TRAFFIC)["expected"].loc["当前配置"]
+
+    assert expected.to_dict() == {"Adyen": 50.0, "Stripe": 70.0, "Airwallex": 80.0, "未分配": 0.0}
+
+
+def test_update_mode_applies_default_currency_to_unlisted_currencies():
+    """调整"其他"时，走默认分支的币种随之调整，单独配置的币种保持不变"""
+    result = ShareSimulator(ENTRIES).simulate(TRAFFIC, ["CARD\n其他 - 100%：0%：0%"], mode="update")
+
+    assert result["expected"].loc["方案1"].to_dict() == {"Adyen": 120.0, "Stripe": 40.0, "Airwallex": 40.0,
+                                                         "未分配": 0.0}
+
+
+def test_override_mode_routes_unlisted_currencies_to_default():
+    """覆盖模式下方案中未列出的币种（包括单独配置的USD）都走方案中的"其他"配置"""
+    result = ShareSimulator(ENTRIES).simulate(TRAFFIC, ["CARD\n其他 - 100%：0%：0%"], mode="override")
+
+    assert result["expected"].loc["方案1"].to_dict() == {"Adyen": 200.0, "Stripe": 0.0, "Airwallex": 0.0,
+                                                         "未分配": 0.0}
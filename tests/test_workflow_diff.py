@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""workflow_diff回归测试"""
+
+from feature.workflow.workflow_diff import WorkflowHashes, diff_workflows
+
+
+def _block(block_id, next_id=None, name=None, block_type="ACTION"):
+    block = {"id": block_id, "type": block_type, "name": name or block_id}
+    if next_id:
+        block["outcome"] = {"next": next_id}
+    return block
+
+
+def _workflow(blocks, revision_id):
+    return {"workflow_source": {"id": "wf", "revision_id": revision_id, "workflow": {"blocks": blocks}}}
+
+
+def test_changes_below_inserted_block_are_reported():
+    """A->B->C 在A和B之间插入X并修改C，C的变化不能因为遍历停在新增block而丢失"""
+    old = WorkflowHashes(_workflow([_block("A", "B", block_type="TRIGGER"), _block("B", "C"), _block("C")], "r1"))
+    new = WorkflowHashes(_workflow([_block("A", "X", block_type="TRIGGER"), _block("X", "B"), _block("B", "C"),
+                                    _block("C", name="C renamed")], "r2"), old)
+
+    diff = diff_workflows(old, new)
+
+    assert [block["id"] for block in diff["added_blocks"]] == ["X"]
+    assert [block["id"] for block in diff["modified_blocks"]] == ["A", "C"]
+    assert diff["summary"]["compared_blocks"] == 3
+
+
+def test_unreachable_shared_block_is_compared():
+    """新revision中不可达（只在环中）的共有block仍按内容哈希对比"""
+    old = WorkflowHashes(_workflow([_block("A", block_type="TRIGGER"), _block("L1", "L2"), _block("L2", "L1")], "r1"))
+    new = WorkflowHashes(_workflow([_block("A", block_type="TRIGGER"), _block("L1", "L2"),
+                                    _block("L2", "L1", name="L2 renamed")], "r2"), old)
+
+    diff = diff_workflows(old, new)
+
+    assert [block["id"] for block in diff["modified_blocks"]] == ["L2"]
+
+
+class _CountingDict(dict):
+    """记录被读取的键"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.read = set()
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        return super().__getitem__(key)
+
+
+def test_unchanged_subtree_is_not_visited():
+    """子树哈希相同的分支整体跳过，其中的block不逐个对比内容"""
+    chain = [_block(f"S{i}", f"S{i + 1}" if i < 49 else None) for i in range(50)]
+    trigger = {"id": "T", "type": "TRIGGER", "name": "T",
+               "outcomes": {"conditional": [{"id": "c", "name": "c", "next": "S0"}],
+                            "default": {"name": "default", "next": "M"}}}
+    old = WorkflowHashes(_workflow([trigger] + chain + [_block("M")], "r1"))
+    new = WorkflowHashes(_workflow([trigger] + chain + [_block("M", name="M renamed")], "r2"), old)
+    old.content = _CountingDict(old.content)
+
+    diff = diff_workflows(old, new)
+
+    assert [block["id"] for block in diff["modified_blocks"]] == ["M"]
+    assert diff["summary"]["unchanged_subtrees"] == 1
+    assert old.content.read == {"T", "M"}
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""workflow_search回归测试"""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import feature.workflow.workflow_repository as workflow_repository_module
+from feature.workflow.parse_cache import ParseCache
+from feature.workflow.workflow_repository import WorkflowRepository
+from feature.workflow.workflow_search import WorkflowSearchIndex
+
+WORKFLOW_DIR = Path(__file__).resolve().parent.parent / "feature" / "workflow" / "workflow json"
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    # 不写入磁盘解析存储
+    monkeypatch.setattr(workflow_repository_module, "parse_cache", ParseCache(store=None))
+    shutil.copy(WORKFLOW_DIR / "Card.json", tmp_path / "card.json")
+    shutil.copy(WORKFLOW_DIR / "Google.json", tmp_path / "google.json")
+    repository = WorkflowRepository(tmp_path)
+    repository.reload()
+    return repository
+
+
+def _split_processors(parsed):
+    """每个split block的渠道分量（与索引相同：取该split第一个有分量的决策表条目）"""
+    processors = {}
+    for entry in parsed["decision_table"]:
+        if not entry["no_split"]:
+            processors.setdefault(entry["split_id"], entry["processors"])
+    return processors
+
+
+def test_filters_match_parsed_splits(repository):
+    """类型、币种、支付方式过滤与解析结果一致"""
+    index = WorkflowSearchIndex()
+    index.attach(repository)
+
+    result = index.search(filters={"type": ["ROUTE_SPLITTER"], "currency": ["usd"], "payment_method": ["Card"]},
+                          limit=1000)
+
+    parsed = repository.get("card").result
+    expected = {split["id"] for split in parsed["splits"]
+                if split["currency"] and "USD" in split["currency"] and split["payment_method"] == "CARD"}
+    assert expected
+    assert {item["block_id"] for item in result["items"]} == expected
+    assert {item["workflow"] for item in result["items"]} == {"card"}
+    assert all(item["type"] == "ROUTE_SPLITTER" for item in result["items"])
+
+
+@pytest.mark.parametrize("expression, accept", [
+    (">40", lambda value: value > 40),
+    (">=40", lambda value: value >= 40),
+    ("20..30", lambda value: 20 <= value <= 30),
+    ("60", lambda value: value == 60),
+])
+def test_processor_percentage_range(repository, expression, accept):
+    """指定processor时按该渠道的分量做范围筛选"""
+    index = WorkflowSearchIndex()
+    index.attach(repository)
+
+    result = index.search(filters={"processor": ["stripe"]}, percentage=expression, workflows=["google"], limit=1000)
+
+    processors = _split_processors(repository.get("google").result)
+    expected = {split_id for split_id, values in processors.items()
+                if accept(float(values["Stripe"]) if isinstance(values["Stripe"], (int, float)) else 0.0)}
+    assert expected
+    assert {item["block_id"] for item in result["items"]} == expected
+
+
+def test_invalid_percentage_expression_is_rejected(repository):
+    index = WorkflowSearchIndex()
+    index.attach(repository)
+
+    with pytest.raises(ValueError):
+        index.search(percentage="abc")
+
+
+def test_repository_change_rebuilds_only_changed_workflow(repository, tmp_path):
+    """仓库重新加载时只重建内容变化的workflow索引，删除的workflow同时移出索引"""
+    index = WorkflowSearchIndex()
+    index.attach(repository)
+    builds = index.builds
+    google_index = index._indexes["google"][1]
+
+    # 用Apple Pay的导出替换card.json（修改时间须变化才会被重新加载）
+    card_path = tmp_path / "card.json"
+    shutil.copy(WORKFLOW_DIR / "Apple.json", card_path)
+    stat = card_path.stat()
+    os.utime(card_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    changes = repository.reload()
+
+    assert changes["updated"] == ["card"]
+    assert index.builds == builds + 1
+    assert index._indexes["google"][1] is google_index
+    assert index.search(filters={"payment_method": ["CARD"]}, workflows=["card"])["total"] == 0
+    assert index.search(filters={"payment_method": ["AP"]}, workflows=["card"])["total"] > 0
+
+    (tmp_path / "google.json").unlink()
+    repository.reload()
+
+    assert index.workflows() == ["card"]